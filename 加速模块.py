@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Numba 可选加速
+
+安装了 numba 时导出真实的 njit / prange；未安装时 njit 退化为原样返回函数的装饰器，
+prange 退化为内置 range，被装饰的函数按普通 Python 执行 (结果一致，只是更慢)。
+
+nb_types 为 numba.types (未安装时为 None)，用于构造显式签名，使内核在导入时即完成编译。
+编译结果随 cache=True 写入磁盘缓存；容器/CI 部署时可将环境变量 NUMBA_CACHE_DIR 指向持久目录，
+在镜像构建阶段预先生成缓存，运行时直接加载。
+"""
+
+try:
+    from numba import njit, prange
+    from numba import types as nb_types
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+    nb_types = None
+
+    def njit(*args, **kwargs):
+        """兼容 @njit、@njit(cache=True) 和 @njit('signature', ...) 三种写法的空装饰器。"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
@@ -8,6 +8,7 @@
 import logging
 import json
 import pandas as pd
+import numpy as np
 import math
 from datetime import datetime, timedelta
 
@@ -15,6 +16,12 @@ from datetime import datetime, timedelta
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# TA-Lib (C 实现) 可选，未安装时回退到 pandas_ta
+try:
+    import talib
+except ImportError:
+    talib = None
+
 # 假设 策略模块 和 数据获取模块 在同一目录
 try:
     from 数据获取模块 import 获取K线数据
@@ -24,6 +31,75 @@ except ImportError as e:
     logger.error(f"无法导入模块: {e}。请确保 '数据获取模块.py' 和 '策略_5分钟.py' 文件存在且路径正确。")
     exit()
 
+# --- 交易记录缓冲区 ---
+class _TradeBuffer:
+    """按列预分配的交易记录 (struct-of-arrays)，容量不足时翻倍扩容，避免逐笔构造字典。"""
+
+    ACTIONS = ('OPEN_LONG', 'OPEN_SHORT', 'CLOSE_LONG', 'CLOSE_SHORT')
+    _ACTION_CODES = {name: code for code, name in enumerate(ACTIONS)}
+    _FLOAT_COLS = ('price', 'size', 'commission', 'margin_required', 'pnl', 'equity_after')
+
+    def __init__(self, capacity=1024):
+        self._cap = capacity
+        self._ct = 0
+        self._ts = np.empty(capacity, dtype='datetime64[ns]')
+        self._action = np.empty(capacity, dtype=np.int8)
+        self._reason = np.empty(capacity, dtype=np.int8)
+        self._floats = {col: np.empty(capacity, dtype=np.float64) for col in self._FLOAT_COLS}
+        self._reason_names = [] # reason 编码 -> 字符串，-1 表示无
+        self._reason_codes = {}
+
+    def __len__(self):
+        return self._ct
+
+    def _grow(self):
+        self._cap *= 2
+        self._ts = np.resize(self._ts, self._cap)
+        self._action = np.resize(self._action, self._cap)
+        self._reason = np.resize(self._reason, self._cap)
+        for col, arr in self._floats.items():
+            self._floats[col] = np.resize(arr, self._cap)
+
+    def append(self, timestamp, action, price, size, commission, equity_after,
+               margin_required=np.nan, pnl=np.nan, reason=None):
+        if self._ct == self._cap:
+            self._grow()
+        i = self._ct
+        self._ts[i] = np.datetime64(timestamp, 'ns')
+        self._action[i] = self._ACTION_CODES[action]
+        if reason is None:
+            self._reason[i] = -1
+        else:
+            code = self._reason_codes.get(reason)
+            if code is None:
+                code = self._reason_codes[reason] = len(self._reason_names)
+                self._reason_names.append(reason)
+            self._reason[i] = code
+        f = self._floats
+        f['price'][i] = price
+        f['size'][i] = size
+        f['commission'][i] = commission
+        f['margin_required'][i] = margin_required
+        f['pnl'][i] = pnl
+        f['equity_after'][i] = equity_after
+        self._ct += 1
+
+    def closed_pnl(self):
+        """已平仓交易的净 PnL 数组。"""
+        n = self._ct
+        return self._floats['pnl'][:n][self._action[:n] >= self._ACTION_CODES['CLOSE_LONG']]
+
+    def to_frame(self):
+        n = self._ct
+        data = {
+            'timestamp': self._ts[:n],
+            'action': pd.Categorical.from_codes(self._action[:n], categories=self.ACTIONS),
+        }
+        data.update({col: arr[:n] for col, arr in self._floats.items()})
+        data['reason'] = pd.Categorical.from_codes(self._reason[:n], categories=self._reason_names)
+        return pd.DataFrame(data)
+
+
 # --- 回测引擎类 ---
 class BacktestEngine:
     def __init__(self, symbol, market_type, interval, start_time, end_time,
@@ -43,10 +119,12 @@ class BacktestEngine:
         self.stop_loss_percentage = float(stop_loss_percentage)
         self.reward_ratio = float(reward_ratio)
         self.leverage = float(leverage)
+        if self.stop_loss_percentage <= 0:
+            raise ValueError(f"stop_loss_percentage 必须为正数，当前为 {stop_loss_percentage}")
 
         self.equity = self.initial_capital
         self.position = None # 持仓状态: {'direction': 'LONG'/'SHORT', 'entry_price': float, 'size': float, 'stop_loss_price': float, 'take_profit_price': float, 'entry_timestamp': datetime}
-        self.trades = [] # 交易记录
+        self.trades = _TradeBuffer() # 交易记录
         self.portfolio_history = [] # 资产净值历史
 
         self.historical_data = None
@@ -133,44 +211,33 @@ class BacktestEngine:
         # logger.info(f"预计算 RSI({self.rsi_period})...") # 移除
         # ... (RSI calculation removed) ...
 
-        # 预计算长期 EMA (保留)
-        logger.info(f"预计算 EMA({self.long_ema_period})...")
+        # 预计算长期 EMA 与 MACD (一次完成；优先 TA-Lib，缺失时回退 pandas_ta)
+        logger.info(f"预计算 EMA({self.long_ema_period}) 和 MACD({self.macd_fast},{self.macd_slow},{self.macd_signal})...")
         try:
-            import pandas_ta as ta # 确保导入
-            self.historical_data.ta.ema(length=self.long_ema_period, append=True)
-            ema_col_name = f'EMA_{self.long_ema_period}'
-            self.historical_data.rename(columns={ema_col_name: 'long_ema'}, inplace=True)
-            logger.info("长期 EMA 计算完成。")
-        except ImportError:
-            logger.error("无法导入 'pandas_ta' 库。长期 EMA 指标将不可用。请运行 'pip install pandas_ta'")
-            self.historical_data['long_ema'] = pd.NA
-        except Exception as e:
-            logger.error(f"计算长期 EMA 时出错: {e}", exc_info=True)
-            self.historical_data['long_ema'] = pd.NA
-
-        # 预计算 MACD
-        logger.info(f"预计算 MACD({self.macd_fast},{self.macd_slow},{self.macd_signal})...")
-        try:
-            import pandas_ta as ta # 确保导入
-            self.historical_data.ta.macd(fast=self.macd_fast, slow=self.macd_slow, signal=self.macd_signal, append=True)
-            # pandas_ta 会生成如 MACD_12_26_9, MACDh_12_26_9, MACDs_12_26_9
-            macd_suffix = f'_{self.macd_fast}_{self.macd_slow}_{self.macd_signal}'
-            self.historical_data.rename(columns={
-                f'MACD{macd_suffix}': 'macd',
-                f'MACDh{macd_suffix}': 'macd_hist',
-                f'MACDs{macd_suffix}': 'macd_signal'
-            }, inplace=True)
-            logger.info("MACD 计算完成。")
+            if talib is not None:
+                close = self.historical_data['close'].to_numpy(dtype=np.float64)
+                long_ema = talib.EMA(close, timeperiod=self.long_ema_period)
+                macd, macd_signal, macd_hist = talib.MACD(close, fastperiod=self.macd_fast,
+                                                          slowperiod=self.macd_slow, signalperiod=self.macd_signal)
+            else:
+                import pandas_ta as ta # 确保导入
+                long_ema = self.historical_data.ta.ema(length=self.long_ema_period)
+                # pandas_ta 的 MACD 列顺序固定为 MACD, MACDh, MACDs，按位置取值，无需按列名重命名
+                macd_df = self.historical_data.ta.macd(fast=self.macd_fast, slow=self.macd_slow, signal=self.macd_signal)
+                macd, macd_hist, macd_signal = (macd_df.iloc[:, k] for k in range(3))
+            self.historical_data['long_ema'] = long_ema
+            self.historical_data['macd'] = macd
+            self.historical_data['macd_hist'] = macd_hist
+            self.historical_data['macd_signal'] = macd_signal
+            logger.info(f"长期 EMA 与 MACD 计算完成 ({'TA-Lib' if talib is not None else 'pandas_ta'})。")
         except ImportError:
-            logger.error("无法导入 'pandas_ta' 库。MACD 指标将不可用。请运行 'pip install pandas_ta'")
-            self.historical_data['macd'] = pd.NA
-            self.historical_data['macd_hist'] = pd.NA
-            self.historical_data['macd_signal'] = pd.NA
+            logger.error("未安装 'TA-Lib' 且无法导入 'pandas_ta' 库。EMA/MACD 指标将不可用。请运行 'pip install TA-Lib' 或 'pip install pandas_ta'")
+            for col in ('long_ema', 'macd', 'macd_hist', 'macd_signal'):
+                self.historical_data[col] = pd.NA
         except Exception as e:
-            logger.error(f"计算 MACD 时出错: {e}", exc_info=True)
-            self.historical_data['macd'] = pd.NA
-            self.historical_data['macd_hist'] = pd.NA
-            self.historical_data['macd_signal'] = pd.NA
+            logger.error(f"计算长期 EMA / MACD 时出错: {e}", exc_info=True)
+            for col in ('long_ema', 'macd', 'macd_hist', 'macd_signal'):
+                self.historical_data[col] = pd.NA
 
         # logger.info(f"预计算 ATR({self.atr_period})...") # 移除
         # ... (ATR calculation removed) ...
@@ -234,15 +301,8 @@ class BacktestEngine:
                     'margin_used': margin_required, # <--- 记录使用的保证金
                     'open_commission': commission # <--- 记录开仓手续费
                 }
-                self.trades.append({
-                    'timestamp': timestamp,
-                    'action': action,
-                    'price': price,
-                    'size': size,
-                    'commission': commission,
-                    'margin_required': margin_required,
-                    'equity_after': self.equity
-                })
+                self.trades.append(timestamp, action, price, size, commission, self.equity,
+                                   margin_required=margin_required)
                 sl_str = f"{stop_loss_price:.2f}" if stop_loss_price is not None else '无'
                 tp_str = f"{take_profit_price:.2f}" if take_profit_price is not None else '无'
                 logger.debug(f"{timestamp}: 开多仓 {size:.4f} @ {price:.2f}, 止损: {sl_str}, 止盈: {tp_str}, 保证金: {margin_required:.2f}, 佣金: {commission:.2f}")
@@ -264,15 +324,8 @@ class BacktestEngine:
                     'margin_used': margin_required,
                     'open_commission': commission
                 }
-                self.trades.append({
-                    'timestamp': timestamp,
-                    'action': action,
-                    'price': price,
-                    'size': size,
-                    'commission': commission,
-                    'margin_required': margin_required,
-                    'equity_after': self.equity
-                })
+                self.trades.append(timestamp, action, price, size, commission, self.equity,
+                                   margin_required=margin_required)
                 sl_str = f"{stop_loss_price:.2f}" if stop_loss_price is not None else '无'
                 tp_str = f"{take_profit_price:.2f}" if take_profit_price is not None else '无'
                 logger.debug(f"{timestamp}: 开空仓 {size:.4f} @ {price:.2f}, 止损: {sl_str}, 止盈: {tp_str}, 保证金: {margin_required:.2f}, 佣金: {commission:.2f}")
@@ -317,19 +370,10 @@ class BacktestEngine:
         elif direction == 'SHORT':
              logger.debug(f"{timestamp}: 平空仓 {close_size:.4f}. {log_msg_detail}")
 
-        self.trades.append({
-            'timestamp': timestamp,
-            'action': action,
-            'price': price,
-            'size': close_size,
-            'pnl': pnl_net, # 记录净 PnL
-            'commission': total_commission, # 记录总佣金
-            'equity_after': self.equity,
-            'reason': reason
-        })
-
-        # 记录已实现 PnL 和相关统计 (使用净 PnL)
-        self.closed_trade_pnl.append(pnl_net)
+        self.trades.append(timestamp, action, price, close_size, total_commission, self.equity, # 记录总佣金
+                           pnl=pnl_net, reason=reason) # 记录净 PnL
+
+        # 记录已实现 PnL 相关统计 (使用净 PnL)
         if pnl_net > 0:
             self.total_profit += pnl_net
             self.winning_trades += 1
@@ -346,7 +390,6 @@ class BacktestEngine:
             return
 
         # 初始化统计变量
-        self.closed_trade_pnl = []
         self.total_profit = 0.0
         self.total_loss = 0.0
         self.winning_trades = 0
@@ -354,87 +397,68 @@ class BacktestEngine:
 
         logger.info(f"开始回测: {self.symbol}, 时间范围: {self.historical_data.index.min()} - {self.historical_data.index.max()}")
 
-        for bar in self.historical_data.itertuples():
-            timestamp = bar.Index
-            current_price = bar.close
-            current_high = bar.high
-            current_low = bar.low
-            current_sma = bar.sma
-
-            if pd.isna(current_price) or current_price <= 0 or pd.isna(current_sma):
+        # 预先提取各列为 numpy 数组，循环内按位置索引 (避免 itertuples 每根 K 线构造 namedtuple)
+        timestamps = self.historical_data.index.tolist()
+        closes = self.historical_data['close'].to_numpy()
+        highs = self.historical_data['high'].to_numpy()
+        lows = self.historical_data['low'].to_numpy()
+        long_emas = self.historical_data['long_ema'].to_numpy()
+        macd_hists = self.historical_data['macd_hist'].to_numpy()
+        prev_macd_hists = self.historical_data['prev_macd_hist'].to_numpy()
+
+        for i in range(len(closes)):
+            timestamp = timestamps[i]
+            current_price = closes[i]
+            current_high = highs[i]
+            current_low = lows[i]
+
+            # _prepare_data 已按所需列 dropna，这里不会再出现 NaN，只需防御非正价格
+            if current_price <= 0.0:
                 self.portfolio_history.append({'timestamp': timestamp, 'equity': self.equity})
                 continue
 
-            # --- 0. 检查止损 ---
-            if self.position:
+            # --- 0. 检查止损 / 止盈 (同一 K 线两者都触及时按止损处理，保守假设) ---
+            if self.position is not None:
+                direction = self.position['direction']
                 sl_price = self.position['stop_loss_price']
-
-                # === 安全检查和日志 ===
-                high_is_numeric = isinstance(current_high, (int, float))
-                low_is_numeric = isinstance(current_low, (int, float))
-                sl_is_numeric = isinstance(sl_price, (int, float))
-
-                if not (high_is_numeric and low_is_numeric and sl_is_numeric):
-                    logger.error(f"时间: {timestamp}, 止损检查跳过：无效数据类型。 "
-                                 f"High: {current_high} ({type(current_high)}), "
-                                 f"Low: {current_low} ({type(current_low)}), "
-                                 f"SL: {sl_price} ({type(sl_price)})" )
-                else:
-                    # === 实际止损逻辑 (现在可以安全比较) ===
-                    triggered_sl = False
-                    trigger_price = sl_price # 假设止损价成交
-
-                    if self.position['direction'] == 'LONG' and current_low <= sl_price:
-                        triggered_sl = True
-                        logger.info(f"{timestamp}: 多单止损触发 @ {sl_price:.2f} (当前 Low: {current_low:.2f})")
-                    elif self.position['direction'] == 'SHORT' and current_high >= sl_price:
-                        triggered_sl = True
-                        logger.info(f"{timestamp}: 空单止损触发 @ {sl_price:.2f} (当前 High: {current_high:.2f})")
-
-                    if triggered_sl:
-                        self._close_trade(price=trigger_price, timestamp=timestamp, reason="StopLoss")
-                        # 止损后，本 K 线不再进行其他操作
-                        self.portfolio_history.append({'timestamp': timestamp, 'equity': self.equity})
-                        continue # Move to next bar
-
-            # --- 0.5 检查止盈 (在检查止损之后) ---
-            if self.position: # 再次检查，因为可能已被止损平仓
                 tp_price = self.position.get('take_profit_price') # 使用 get 以防旧数据没有此键
 
-                if tp_price is not None:
-                    # === 安全检查和日志 ===
-                    high_is_numeric = isinstance(current_high, (int, float))
-                    low_is_numeric = isinstance(current_low, (int, float))
-                    tp_is_numeric = isinstance(tp_price, (int, float))
-
-                    if not (high_is_numeric and low_is_numeric and tp_is_numeric):
-                        logger.error(f"时间: {timestamp}, 止盈检查跳过：无效数据类型。 "
-                                     f"High: {current_high} ({type(current_high)}), "
-                                     f"Low: {current_low} ({type(current_low)}), "
-                                     f"TP: {tp_price} ({type(tp_price)})" )
-                    else:
-                        # === 实际止盈逻辑 ===
-                        triggered_tp = False
-                        trigger_price = tp_price # 假设止盈价成交
-
-                        if self.position['direction'] == 'LONG' and current_high >= tp_price:
-                            triggered_tp = True
-                            logger.info(f"{timestamp}: 多单止盈触发 @ {tp_price:.2f} (当前 High: {current_high:.2f})")
-                        elif self.position['direction'] == 'SHORT' and current_low <= tp_price:
-                            triggered_tp = True
-                            logger.info(f"{timestamp}: 空单止盈触发 @ {tp_price:.2f} (当前 Low: {current_low:.2f})")
-
-                        if triggered_tp:
-                            self._close_trade(price=trigger_price, timestamp=timestamp, reason="TakeProfit")
-                            # 止盈后，本 K 线不再进行其他操作
-                            self.portfolio_history.append({'timestamp': timestamp, 'equity': self.equity})
-                            continue # Move to next bar
+                if direction == 'LONG':
+                    side_cn, sl_ref, tp_ref = '多', ('Low', current_low), ('High', current_high)
+                    sl_hit = sl_price is not None and current_low <= sl_price
+                    tp_hit = tp_price is not None and current_high >= tp_price
+                else: # SHORT
+                    side_cn, sl_ref, tp_ref = '空', ('High', current_high), ('Low', current_low)
+                    sl_hit = sl_price is not None and current_high >= sl_price
+                    tp_hit = tp_price is not None and current_low <= tp_price
+
+                exit_reason = None
+                if sl_hit:
+                    exit_reason, trigger_price = "StopLoss", sl_price # 假设止损价成交
+                    logger.info(f"{timestamp}: {side_cn}单止损触发 @ {sl_price:.2f} (当前 {sl_ref[0]}: {sl_ref[1]:.2f})")
+                elif tp_hit:
+                    exit_reason, trigger_price = "TakeProfit", tp_price # 假设止盈价成交
+                    logger.info(f"{timestamp}: {side_cn}单止盈触发 @ {tp_price:.2f} (当前 {tp_ref[0]}: {tp_ref[1]:.2f})")
+
+                if exit_reason is not None:
+                    self._close_trade(price=trigger_price, timestamp=timestamp, reason=exit_reason)
+                    # 止损/止盈后，本 K 线不再进行其他操作
+                    self.portfolio_history.append({'timestamp': timestamp, 'equity': self.equity})
+                    continue # Move to next bar
 
             # --- 1. 调用策略生成信号 (如果未被止损或止盈) ---
             signal = 'HOLD' # 默认信号
             signal_reason = 'No signal'
             if self.position is None: # 仅在没有持仓时才生成开仓信号
-                current_bar_data = pd.Series(bar._asdict()).drop('Index')
+                # 策略函数只按列名取值，传入普通字典即可，无需每根 K 线构造 pd.Series
+                current_bar_data = {
+                    'close': current_price,
+                    'high': current_high,
+                    'low': current_low,
+                    'long_ema': long_emas[i],
+                    'macd_hist': macd_hists[i],
+                    'prev_macd_hist': prev_macd_hists[i],
+                }
                 try:
                     # 调用新的 MACD 策略函数
                     strategy_signal_info = macd_ema_strategy(
@@ -456,47 +480,17 @@ class BacktestEngine:
             # --- 2. 执行交易 (基于策略信号) ---
             execution_price = current_price # 简化成交价
 
-            # 开仓逻辑不变，根据 signal 执行
-            if signal == 'LONG' and self.position is None:
-                stop_loss_price = execution_price * (1 - self.stop_loss_percentage)
-                # 计算仓位大小
-                potential_loss_per_contract = execution_price - stop_loss_price
-                if potential_loss_per_contract <= 0:
-                    logger.warning(f"{timestamp}: 潜在损失计算错误 ({potential_loss_per_contract:.4f}), 无法开多仓。SL: {stop_loss_price:.2f}")
-                else:
-                    risk_amount = self.equity * self.risk_per_trade
-                    size = risk_amount / potential_loss_per_contract
-                    notional_value = size * execution_price
-                    margin_required = notional_value / self.leverage
-                    # 检查名义价值是否超过总资金 (粗略杠杆检查) - 这个检查在杠杆下意义不大，保证金检查更重要
-                    # if notional_value > self.equity:
-                    #     logger.warning(f"计算出的仓位名义价值 ({notional_value:.2f}) 超过总权益 ({self.equity:.2f})，减小仓位。")
-                    #     size = self.equity / execution_price * 0.95 # 使用 95% 资金作为最大名义价值
-                    #     notional_value = size * execution_price
-                    #     margin_required = notional_value / self.leverage
-
-                    if size > 0:
-                        # 传递 margin_required 给 _execute_trade
-                        self._execute_trade('OPEN_LONG', execution_price, size, timestamp, stop_loss_price, margin_required)
-
-            elif signal == 'SHORT' and self.position is None:
-                 stop_loss_price = execution_price * (1 + self.stop_loss_percentage)
-                 potential_loss_per_contract = stop_loss_price - execution_price
-                 if potential_loss_per_contract <= 0:
-                      logger.warning(f"{timestamp}: 潜在损失计算错误 ({potential_loss_per_contract:.4f}), 无法开空仓。SL: {stop_loss_price:.2f}")
-                 else:
-                      risk_amount = self.equity * self.risk_per_trade
-                      size = risk_amount / potential_loss_per_contract
-                      notional_value = size * execution_price
-                      margin_required = notional_value / self.leverage
-                      # if notional_value > self.equity:
-                      #      logger.warning(f"计算出的仓位名义价值 ({notional_value:.2f}) 超过总权益 ({self.equity:.2f})，减小仓位。")
-                      #      size = self.equity / execution_price * 0.95
-                      #      notional_value = size * execution_price
-                      #      margin_required = notional_value / self.leverage
-
-                      if size > 0:
-                           self._execute_trade('OPEN_SHORT', execution_price, size, timestamp, stop_loss_price, margin_required)
+            # 开仓：多/空共用同一套公式，side=+1 为多，-1 为空
+            if self.position is None and (signal == 'LONG' or signal == 'SHORT'):
+                side = 1 if signal == 'LONG' else -1
+                stop_loss_price = execution_price * (1 - side * self.stop_loss_percentage)
+                # 每单位潜在损失 = execution_price * stop_loss_percentage (恒为正)
+                size = self.equity * self.risk_per_trade / (execution_price * self.stop_loss_percentage)
+                margin_required = size * execution_price / self.leverage
+                if size > 0:
+                    # 传递 margin_required 给 _execute_trade
+                    self._execute_trade('OPEN_LONG' if side > 0 else 'OPEN_SHORT',
+                                        execution_price, size, timestamp, stop_loss_price, margin_required)
 
             # 记录每个时间点的资产净值
             current_portfolio_value = self.equity
@@ -549,7 +543,7 @@ class BacktestEngine:
                  sharpe_ratio = 0 # 无法计算或标准差为 0
 
         # 4. 交易统计 (基于已关闭的交易)
-        num_trades = len(self.closed_trade_pnl)
+        num_trades = len(self.trades.closed_pnl())
         num_winning = self.winning_trades
         num_losing = self.losing_trades
 
@@ -585,12 +579,22 @@ class BacktestEngine:
         # 可以选择保存结果
         # self.save_results(portfolio_df)
 
-    def save_results(self, portfolio_df):
+    def save_results(self, portfolio_df, fmt='parquet'):
+        """保存交易记录和资产组合历史。fmt: 'parquet' (默认，zstd 压缩) 或 'csv'。
+        未安装 Parquet 引擎 (pyarrow/fastparquet，不在 requirements.txt 中) 时自动改存为 CSV。"""
         try:
-            trades_df = pd.DataFrame(self.trades)
-            trades_df.to_csv(f"{self.symbol}_trades.csv", index=False)
-            portfolio_df.to_csv(f"{self.symbol}_portfolio.csv")
-            logger.info("交易记录和资产组合历史已保存到 CSV 文件。")
+            trades_df = self.trades.to_frame()
+            if fmt != 'csv':
+                try:
+                    trades_df.to_parquet(f"{self.symbol}_trades.parquet", compression='zstd')
+                    portfolio_df.to_parquet(f"{self.symbol}_portfolio.parquet", compression='zstd')
+                except ImportError as e:
+                    logger.warning(f"无法保存为 Parquet ({e})，改为保存 CSV 文件。")
+                    fmt = 'csv'
+            if fmt == 'csv':
+                trades_df.to_csv(f"{self.symbol}_trades.csv", index=False)
+                portfolio_df.to_csv(f"{self.symbol}_portfolio.csv")
+            logger.info(f"交易记录和资产组合历史已保存到 {fmt.upper()} 文件。")
         except Exception as e:
             logger.error(f"保存结果时出错: {e}")
 
@@ -1,367 +1,781 @@
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
+import importlib
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import Union, Tuple, Dict, List
+from functools import lru_cache
+from types import ModuleType
+from typing import Union, Tuple, Dict, List, NamedTuple, Optional
 
-# 配置日志 (移动到最前面)
-# 将日志级别改为 DEBUG 以查看详细信息
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - [%(module)s:%(funcName)s:%(lineno)d] - %(message)s')
+# 日志: 导入时只设置本模块 logger 的级别，不修改 root logger (避免拖慢其他库)；
+# 需要控制台输出时由应用调用 configure_logging
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
 
-# 假设数据获取模块的文件名为 数据获取模块.py
+
+def configure_logging(level: int = logging.INFO) -> None:
+    """为本模块配置控制台日志输出 (例如调试时传入 logging.DEBUG)。"""
+    logging.basicConfig(level=level, format='%(asctime)s - %(levelname)s - [%(module)s:%(funcName)s:%(lineno)d] - %(message)s')
+    logger.setLevel(level)
+
+# 指标计算优先使用 TA-Lib (C 实现)，未安装时回退到 pandas_ta
 try:
-    import 数据获取模块
+    import talib
 except ImportError:
-    # 现在可以使用 logger 了
-    logger.error("无法导入 '数据获取模块.py'，请确保该文件存在且路径正确。")
-    # 可以选择抛出异常或设置一个标志位
-    数据获取模块 = None 
-
-# 导入配置模块
+    talib = None
 try:
-    import 配置
-    # 尝试导入配置字典，如果失败则提供更具体的错误
+    import pandas_ta as ta
+except ImportError:
+    ta = None
+if talib is None and ta is None:
+    logger.error("未安装 TA-Lib 或 pandas_ta，指标计算将不可用。请运行 'pip install TA-Lib'。")
+
+from 加速模块 import njit, prange, nb_types, NUMBA_AVAILABLE
+
+def _safe_import(name: str, attrs: Tuple[str, ...] = ()) -> Tuple[Optional[ModuleType], Dict[str, object]]:
+    """
+    导入项目内的依赖模块，失败时记录错误并返回 (None, {})，不向上抛出。
+    attrs 为需要从模块中取出的变量名；缺失的变量记录错误且不出现在返回的字典中。
+    """
     try:
-        from 配置 import MICRO_TREND_CONFIG
-    except ImportError:
-        logger.error("成功导入 配置.py 但未找到 MICRO_TREND_CONFIG 变量。请检查该文件。")
-        MICRO_TREND_CONFIG = {} # 设置默认空字典
-        if 配置 is None: # 如果配置模块也未加载 (虽然理论上不应发生在此处)
-            配置 = type('obj', (object,), {})() # 创建一个空对象以防 AttributeError
-           
-except SyntaxError as e:
-    logger.error(f"导入 配置.py 时发生语法错误: {e}", exc_info=True)
-    配置 = None
-    MICRO_TREND_CONFIG = {}
-except ImportError as e:
-    logger.error(f"导入 配置.py 时发生 ImportError (可能文件不存在或路径问题): {e}", exc_info=True)
-    配置 = None
-    MICRO_TREND_CONFIG = {}
-except Exception as e: # 捕获其他可能的导入错误
-    logger.error(f"导入 配置.py 时发生未知错误: {e}", exc_info=True)
-    配置 = None
-    MICRO_TREND_CONFIG = {}
-
-# 日志配置代码块已移动到前面
-# logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - [%(module)s:%(funcName)s:%(lineno)d] - %(message)s')
-# logger = logging.getLogger(__name__)
+        module = importlib.import_module(name)
+    except SyntaxError as e:
+        logger.error(f"导入 {name}.py 时发生语法错误: {e}", exc_info=True)
+        return None, {}
+    except ImportError as e:
+        logger.error(f"无法导入 '{name}.py'，请确保该文件存在且路径正确: {e}")
+        return None, {}
+    except Exception as e: # 捕获其他可能的导入错误
+        logger.error(f"导入 {name}.py 时发生未知错误: {e}", exc_info=True)
+        return None, {}
+    found = {}
+    for attr in attrs:
+        if hasattr(module, attr):
+            found[attr] = getattr(module, attr)
+        else:
+            logger.error(f"成功导入 {name}.py 但未找到 {attr} 变量。请检查该文件。")
+    return module, found
+
+# 数据获取模块 / 配置 缺失时模块仍可导入，调用方通过 `is None` 判断是否可用
+数据获取模块, _ = _safe_import('数据获取模块')
+配置, _config_attrs = _safe_import('配置', ('MICRO_TREND_CONFIG',))
+MICRO_TREND_CONFIG = _config_attrs.get('MICRO_TREND_CONFIG', {})
+
+# --- 评分内核 ---
+# 行向量字段顺序 (与 分析单周期趋势 中 required_cols_for_interpret 一致，前置 close)
+(_F_CLOSE, _F_EMA_S, _F_EMA_L, _F_ROC, _F_RSI, _F_BB_U, _F_BB_L, _F_BB_M, _F_MACD_H, _F_VOL, _F_VOL_MA,
+ _F_K, _F_D, _F_J, _F_TENKAN, _F_KIJUN, _F_SENKOU_A, _F_SENKOU_B, _F_CHIKOU, _F_ADX, _F_DIP, _F_DIN) = range(22)
+
+# 评分权重的固定顺序及默认值 (对应 config['SCORING']['WEIGHTS'])
+_WEIGHT_DEFAULTS = (
+    ('strong_bull_trend', 3), ('bull_trend', 1), ('strong_bear_trend', -3), ('bear_trend', -1),
+    ('strong_pos_mom', 2), ('pos_mom', 1), ('strong_neg_mom', -2), ('neg_mom', -1),
+    ('rsi_overbought', -2), ('rsi_oversold', 2), ('kdj_overbought', -1), ('kdj_oversold', 1),
+    ('macd_gold_cross', 3), ('macd_dead_cross', -3), ('kdj_gold_cross', 2), ('kdj_dead_cross', -2),
+    ('macd_hist_pos', 1), ('macd_hist_neg', -1), ('kdj_k_above_d', 0.5), ('kdj_d_above_k', -0.5),
+    ('price_above_cloud', 2), ('price_below_cloud', -2), ('tenkan_above_kijun', 1), ('kijun_above_tenkan', -1),
+    ('adx_strong_pos', 2), ('adx_medium_pos', 1), ('adx_strong_neg', -2), ('adx_medium_neg', -1),
+)
+(_W_STRONG_BULL_TREND, _W_BULL_TREND, _W_STRONG_BEAR_TREND, _W_BEAR_TREND,
+ _W_STRONG_POS_MOM, _W_POS_MOM, _W_STRONG_NEG_MOM, _W_NEG_MOM,
+ _W_RSI_OB, _W_RSI_OS, _W_KDJ_OB, _W_KDJ_OS,
+ _W_MACD_GOLD, _W_MACD_DEAD, _W_KDJ_GOLD, _W_KDJ_DEAD,
+ _W_MACD_POS, _W_MACD_NEG, _W_K_ABOVE_D, _W_D_ABOVE_K,
+ _W_ABOVE_CLOUD, _W_BELOW_CLOUD, _W_TENKAN_ABOVE, _W_KIJUN_ABOVE,
+ _W_ADX_STRONG_POS, _W_ADX_MEDIUM_POS, _W_ADX_STRONG_NEG, _W_ADX_MEDIUM_NEG) = range(len(_WEIGHT_DEFAULTS))
+
+# 解读/评分阈值的固定顺序及默认值: (配置分组, 键, 默认值)
+_THRESHOLD_DEFAULTS = (
+    ('THRESHOLDS', 'trend_strength_threshold', 0.001), ('THRESHOLDS', 'momentum_strength_threshold', 0.1),
+    ('THRESHOLDS', 'rsi_oversold', 30), ('THRESHOLDS', 'rsi_overbought', 70),
+    ('THRESHOLDS', 'kdj_overbought', 80), ('THRESHOLDS', 'kdj_oversold', 20),
+    ('THRESHOLDS', 'adx_trend_threshold', 25), ('THRESHOLDS', 'adx_weak_threshold', 20),
+    ('THRESHOLDS', 'volume_increase_threshold', 1.2),
+    ('SCORING', 'strong_bullish', 8), ('SCORING', 'bullish', 3), ('SCORING', 'strong_bearish', -8), ('SCORING', 'bearish', -3),
+    ('SCORING', 'adx_weak_override_enabled', True), ('SCORING', 'adx_weak_max_signal', 1),
+)
+(_T_TREND, _T_MOM, _T_RSI_OS, _T_RSI_OB, _T_KDJ_OB, _T_KDJ_OS, _T_ADX_TREND, _T_ADX_WEAK, _T_VOL_INC,
+ _T_STRONG_BULL, _T_BULL, _T_STRONG_BEAR, _T_BEAR, _T_ADX_OVERRIDE, _T_ADX_MAX_SIGNAL) = range(len(_THRESHOLD_DEFAULTS))
+
+# 信号等级 -> 组合信号字符串 (0: 中性, 1: 看跌, 2: 强看跌, 3: 看涨, 4: 强看涨)
+_SIGNAL_LABELS = ("盘整/不明(↔️)", "看跌(-)", "强看跌(💥)", "看涨(+)", "强看涨(🚀)")
+
+
+class InterpretationDetails(NamedTuple):
+    """单个时间点的各项指标解读字符串 (对外以 dict 形式放在结果的 'details' 中)。"""
+    ema_trend: str
+    roc_momentum: str
+    rsi_state: str
+    bb_pos: str
+    macd_state: str
+    macd_cross: str
+    macd_hist_state: str
+    volume_state: str
+    kdj_signal: str
+    ichi_signal: str
+    adx_signal: str
+
+
+class IntervalResult(NamedTuple):
+    """
+    单个周期的分析结果。模块内部以该记录传递 (无逐对象 dict 开销)，
+    只在对外返回时经 to_dict() 转换为原有的字典结构。
+    """
+    interval: str
+    combined_signal: Optional[str] = None
+    score: Optional[float] = None
+    details: Optional[Dict[str, str]] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Union[str, float, Dict[str, str], None]]:
+        """转换为字典；'error' 键仅在出错时出现。"""
+        result = {"interval": self.interval, "combined_signal": self.combined_signal,
+                  "score": self.score, "details": self.details}
+        if self.error is not None:
+            result["error"] = self.error
+        return result
+
+
+def _detail_labels(thresholds_interpret: dict) -> Tuple[Tuple[str, ...], ...]:
+    """
+    预先生成各指标状态码对应的解读字符串 (阈值已代入)，按 InterpretationDetails 字段顺序返回，
+    解读时按状态码直接取用。组合状态码的编码方式见 _interpret_states。
+    """
+    overbought = thresholds_interpret.get('rsi_overbought', 70)
+    oversold = thresholds_interpret.get('rsi_oversold', 30)
+    kdj_overbought = thresholds_interpret.get('kdj_overbought', 80)
+    kdj_oversold = thresholds_interpret.get('kdj_oversold', 20)
+    adx_trend_threshold = thresholds_interpret.get('adx_trend_threshold', 25)
+    adx_weak_threshold = thresholds_interpret.get('adx_weak_threshold', 20)
+
+    macd_hist = ("", "柱>0", "柱<0", "柱=0")
+    macd_cross = ("", ",金叉(🔼)", ",死叉(🔽)")
+    kdj_kd = ("KDJ: K>D", "KDJ: K<D")
+    kdj_level = ("", f",J超买(>{kdj_overbought})", f",J超卖(<{kdj_oversold})")
+    ichi_cloud = (None, "价在云上", "价在云下", "价在云中")
+    ichi_tk = (None, "转>基", "转<基", "转=基")
+    ichi_chikou = (None, "迟>价", "迟<价")
+    adx_strength = (None, f"强趋(>{adx_trend_threshold:.0f})", f"弱趋(<{adx_weak_threshold:.0f})", "趋中")
+    adx_di = (None, "+DI>-DI", "-DI>+DI", "+DI=-DI")
+
+    def _joined(prefix, *parts):
+        parts = [p for p in parts if p is not None]
+        return prefix + (", ".join(parts) if parts else "未知")
+
+    return (
+        ("趋势: 未知", "趋势: 强升(↑↑)", "趋势: 上升(↑)", "趋势: 强降(↓↓)", "趋势: 下降(↓)", "趋势: 盘整(↔)"),
+        ("动量: 未知", "动量: 强正(++)", "动量: 正向(+)", "动量: 强负(--)", "动量: 负向(-)", "动量: 趋平(0)"),
+        ("RSI: 未知", f"RSI: 超买(>{overbought})", f"RSI: 超卖(<{oversold})", "RSI: 中性"),
+        ("BB: 未知", "BB: 穿上轨(↗↗)", "BB: 穿下轨(↘↘)", "BB: 触上轨(↗)", "BB: 触下轨(↘)",
+         "BB: 中轨上方", "BB: 中轨下方", "BB: 在中轨"),
+        tuple(f"MACD:{h}{c}" for h in macd_hist for c in macd_cross),
+        macd_cross,
+        macd_hist,
+        ("Vol: 未知", "Vol: 放量(📈)", "Vol: 缩量(📉)", "Vol: 平量"),
+        ("KDJ: 未知",) * 9 + tuple(kd + c + lv for kd in kdj_kd for c in macd_cross for lv in kdj_level),
+        tuple(_joined("Ichi: ", a, b, c) for a in ichi_cloud for b in ichi_tk for c in ichi_chikou),
+        tuple(_joined("ADX: ", a, b) for a in adx_strength for b in adx_di),
+    )
+
+
+class _CompiledConfig(NamedTuple):
+    """配置字典展开后的定长数组，供评分内核直接按下标读取。"""
+    weights: np.ndarray          # 按 _W_* 顺序
+    thresholds: np.ndarray       # 按 _T_* 顺序
+    columns: Tuple[str, ...]     # 按 _F_* 顺序 (含首位 close)
+    labels: Tuple[Tuple[str, ...], ...]  # 按 InterpretationDetails 字段顺序: 状态码 -> 解读字符串
+
+
+class _ConfigKey:
+    """以对象身份作为 lru_cache 键 (配置字典不可哈希)；持有引用以保证 id 在缓存期间不被复用。"""
+    __slots__ = ('config',)
+
+    def __init__(self, config: dict):
+        self.config = config
+
+    def __hash__(self):
+        return id(self.config)
+
+    def __eq__(self, other):
+        return isinstance(other, _ConfigKey) and other.config is self.config
+
+
+def _compile_config(config: dict) -> _CompiledConfig:
+    """
+    返回配置的编译结果，同一个配置对象只展开一次。
+    配置按只读处理：运行期修改同一个字典后不会重新编译，需传入新的字典对象。
+    """
+    return _compile_config_cached(_ConfigKey(config))
+
+
+@lru_cache(maxsize=32)
+def _compile_config_cached(key: _ConfigKey) -> _CompiledConfig:
+    config = key.config
+    scoring_config = config.get('SCORING', {})
+    weights = scoring_config.get('WEIGHTS', {})
+    if weights:
+        weights_arr = np.array([weights.get(k, d) for k, d in _WEIGHT_DEFAULTS], dtype=np.float64)
+    else:
+        logger.warning("评分权重未在配置中定义，无法计算分数。")
+        weights_arr = np.zeros(len(_WEIGHT_DEFAULTS), dtype=np.float64)
+    groups = {'THRESHOLDS': config.get('THRESHOLDS', {}), 'SCORING': scoring_config.get('THRESHOLDS', {})}
+    thresh_arr = np.array([groups[g].get(k, d) for g, k, d in _THRESHOLD_DEFAULTS], dtype=np.float64)
+    # 编译结果在调用间共享，设为只读防止被意外修改
+    weights_arr.flags.writeable = False
+    thresh_arr.flags.writeable = False
+    return _CompiledConfig(weights_arr, thresh_arr, ('close',) + _indicator_spec(config).interpret_cols,
+                           _detail_labels(config.get('THRESHOLDS', {})))
+
+
+# --- Numba 内核的显式签名: 导入时即编译 (或从磁盘缓存加载)，避免首次调用的 JIT 延迟 ---
+# 数组参数统一声明为只读 C 连续数组 (可写数组也能传入；编译后的配置数组与 pandas 3 返回的列视图均为只读)
+if NUMBA_AVAILABLE:
+    _F8_1D_RO = nb_types.Array(nb_types.float64, 1, 'C', readonly=True)
+    _SCORE_ROW_SIG = nb_types.Tuple((nb_types.float64, nb_types.int64))(_F8_1D_RO, _F8_1D_RO, _F8_1D_RO, _F8_1D_RO)
+    _FUSED_CLOSE_SIG = nb_types.float64[:, ::1](
+        _F8_1D_RO, nb_types.int64, nb_types.int64, nb_types.int64, nb_types.int64, nb_types.int64,
+        nb_types.float64, nb_types.int64, nb_types.int64, nb_types.int64,
+    )
+    _F8_3D_RO = nb_types.Array(nb_types.float64, 3, 'C', readonly=True)
+    _SCORE_BATCH_SIG = nb_types.Tuple((nb_types.float64[:, ::1], nb_types.int64[:, ::1]))(_F8_3D_RO, _F8_1D_RO, _F8_1D_RO)
+    _AGGREGATE_SIG = nb_types.Tuple((nb_types.float64,) * 4 + (nb_types.int64,) * 2)(
+        _F8_1D_RO, _F8_1D_RO, nb_types.float64, nb_types.float64,
+    )
+    _INTERPRET_STATES_SIG = nb_types.UniTuple(nb_types.int64, 11)(_F8_1D_RO, _F8_1D_RO, _F8_1D_RO)
+else:
+    _SCORE_ROW_SIG = _FUSED_CLOSE_SIG = _SCORE_BATCH_SIG = _AGGREGATE_SIG = _INTERPRET_STATES_SIG = None
+
+
+@njit(_SCORE_ROW_SIG, cache=True)
+def _score_row(cur, prev, w, t):
+    """
+    对单根 K 线的指标行计算总分和信号等级 (纯数值，无字符串)。
+
+    cur/prev 按 _F_* 顺序存放当前/前一行指标值 (NaN 表示缺失)，w 按 _W_* 顺序存放权重，
+    t 按 _T_* 顺序存放阈值。返回 (score, signal_level)。
+    """
+    score = 0.0
+    close = cur[_F_CLOSE]
+
+    # 1. EMA 趋势
+    ema_s = cur[_F_EMA_S]
+    ema_l = cur[_F_EMA_L]
+    if not (np.isnan(ema_s) or np.isnan(ema_l)):
+        diff_pct = (ema_s - ema_l) / ema_l if ema_l != 0.0 else 0.0
+        if diff_pct > t[_T_TREND] * 2: score += w[_W_STRONG_BULL_TREND]
+        elif diff_pct > 0: score += w[_W_BULL_TREND]
+        elif diff_pct < -t[_T_TREND] * 2: score += w[_W_STRONG_BEAR_TREND]
+        elif diff_pct < 0: score += w[_W_BEAR_TREND]
+
+    # 2. ROC 动量
+    roc = cur[_F_ROC]
+    if not np.isnan(roc):
+        if roc > t[_T_MOM] * 2: score += w[_W_STRONG_POS_MOM]
+        elif roc > 0: score += w[_W_POS_MOM]
+        elif roc < -t[_T_MOM] * 2: score += w[_W_STRONG_NEG_MOM]
+        elif roc < 0: score += w[_W_NEG_MOM]
+
+    # 3. RSI
+    rsi = cur[_F_RSI]
+    if not np.isnan(rsi):
+        if rsi > t[_T_RSI_OB]: score += w[_W_RSI_OB]
+        elif rsi < t[_T_RSI_OS]: score += w[_W_RSI_OS]
+
+    # 5. MACD 柱及交叉
+    macd_h = cur[_F_MACD_H]
+    prev_macd_h = prev[_F_MACD_H]
+    if not np.isnan(macd_h):
+        if macd_h > 0:
+            score += w[_W_MACD_POS]
+            if not np.isnan(prev_macd_h) and prev_macd_h <= 0: score += w[_W_MACD_GOLD]
+        elif macd_h < 0:
+            score += w[_W_MACD_NEG]
+            if not np.isnan(prev_macd_h) and prev_macd_h >= 0: score += w[_W_MACD_DEAD]
+
+    # 7. KDJ (K==D 时按 K<D 处理，与解读字符串一致)
+    k = cur[_F_K]
+    d = cur[_F_D]
+    j = cur[_F_J]
+    prev_k = prev[_F_K]
+    prev_d = prev[_F_D]
+    if not (np.isnan(k) or np.isnan(d)):
+        score += w[_W_K_ABOVE_D] if k > d else w[_W_D_ABOVE_K]
+        if not np.isnan(j):
+            if j > t[_T_KDJ_OB]: score += w[_W_KDJ_OB]
+            elif j < t[_T_KDJ_OS]: score += w[_W_KDJ_OS]
+            if not (np.isnan(prev_k) or np.isnan(prev_d)):
+                if k > d and prev_k <= prev_d: score += w[_W_KDJ_GOLD]
+                elif k < d and prev_k >= prev_d: score += w[_W_KDJ_DEAD]
+
+    # 8. Ichimoku (迟行线不参与评分)
+    senkou_a = cur[_F_SENKOU_A]
+    senkou_b = cur[_F_SENKOU_B]
+    if not (np.isnan(close) or np.isnan(senkou_a) or np.isnan(senkou_b)):
+        if close > senkou_a and close > senkou_b: score += w[_W_ABOVE_CLOUD]
+        elif close < senkou_a and close < senkou_b: score += w[_W_BELOW_CLOUD]
+    tenkan = cur[_F_TENKAN]
+    kijun = cur[_F_KIJUN]
+    if not (np.isnan(tenkan) or np.isnan(kijun)):
+        if tenkan > kijun: score += w[_W_TENKAN_ABOVE]
+        elif tenkan < kijun: score += w[_W_KIJUN_ABOVE]
+
+    # 9. ADX 确认
+    adx = cur[_F_ADX]
+    dip = cur[_F_DIP]
+    din = cur[_F_DIN]
+    adx_state = 0 # 0: 未知, 1: 强趋势, 2: 中等, 3: 弱趋势
+    if not np.isnan(adx):
+        if adx > t[_T_ADX_TREND]: adx_state = 1
+        elif adx < t[_T_ADX_WEAK]: adx_state = 3
+        else: adx_state = 2
+    if not (np.isnan(dip) or np.isnan(din)):
+        if dip > din:
+            if adx_state == 1: score += w[_W_ADX_STRONG_POS]
+            elif adx_state == 2: score += w[_W_ADX_MEDIUM_POS]
+        elif din > dip:
+            if adx_state == 1: score += w[_W_ADX_STRONG_NEG]
+            elif adx_state == 2: score += w[_W_ADX_MEDIUM_NEG]
+
+    # --- 映射分数到信号等级 ---
+    if score >= t[_T_STRONG_BULL]: level = 4
+    elif score >= t[_T_BULL]: level = 3
+    elif score <= t[_T_STRONG_BEAR]: level = 2
+    elif score <= t[_T_BEAR]: level = 1
+    else: level = 0
+
+    # ADX 弱趋势覆盖: 0 强制中性，1 将强信号降为普通信号
+    if t[_T_ADX_OVERRIDE] != 0.0 and adx_state == 3:
+        if t[_T_ADX_MAX_SIGNAL] == 0:
+            level = 0
+        elif t[_T_ADX_MAX_SIGNAL] == 1:
+            if level == 4: level = 3
+            elif level == 2: level = 1
+    return score, level
+
+
+class _IndicatorSpec(NamedTuple):
+    """指标参数 (config['PARAMS'] 展开后的周期等) 及由其派生的各指标列名。"""
+    ema_short: int
+    ema_long: int
+    roc: int
+    rsi: int
+    bb_period: int
+    bb_std: float
+    macd_fast: int
+    macd_slow: int
+    macd_signal: int
+    vol_ma: int
+    kdj_length: int
+    kdj_signal: int
+    ichi_tenkan: int
+    ichi_kijun: int
+    ichi_senkou_b: int
+    adx_length: int
+    close_cols: Tuple[str, ...]       # 融合计算的输出列: EMA x2, ROC, RSI, BBL/BBM/BBU, MACD/MACDh/MACDs
+    vol_ma_col: str
+    kdj_cols: Tuple[str, ...]
+    ichi_cols: Tuple[str, ...]
+    adx_cols: Tuple[str, ...]
+    interpret_cols: Tuple[str, ...]   # 按 _F_* 顺序 (去掉首位 close) 的解读/评分所需列
+
+
+def _indicator_spec(config: dict) -> _IndicatorSpec:
+    """返回配置的指标参数与列名，同一个配置对象只展开一次 (与 _compile_config 相同，配置按只读处理)。"""
+    return _indicator_spec_cached(_ConfigKey(config))
+
+
+@lru_cache(maxsize=32)
+def _indicator_spec_cached(key: _ConfigKey) -> _IndicatorSpec:
+    params = key.config.get('PARAMS', {})
+    ema_short = params.get('ema_short_period', 10)
+    ema_long = params.get('ema_long_period', 30)
+    roc_period = params.get('roc_period', 9)
+    rsi_period = params.get('rsi_period', 14)
+    bb_period = params.get('bb_period', 20)
+    bb_std = params.get('bb_std_dev', 2.0)
+    macd_fast = params.get('macd_fast_period', 12)
+    macd_slow = params.get('macd_slow_period', 26)
+    macd_signal = params.get('macd_signal_period', 9)
+    vol_ma_period = params.get('volume_ma_period', 20)
+    # pandas_ta bbands 列名可能包含小数点 (e.g., BBU_20_2.0)
+    bb_suffix = f"{bb_period}_{float(bb_std):.1f}"
+    macd_suffix = f"{macd_fast}_{macd_slow}_{macd_signal}"
+    close_cols = (f'EMA_{ema_short}', f'EMA_{ema_long}', f'ROC_{roc_period}', f'RSI_{rsi_period}',
+                  f'BBL_{bb_suffix}', f'BBM_{bb_suffix}', f'BBU_{bb_suffix}',
+                  f'MACD_{macd_suffix}', f'MACDh_{macd_suffix}', f'MACDs_{macd_suffix}')
+    vol_ma_col = f'Vol_MA_{vol_ma_period}'
+    kdj_cols = ('KDJ_K', 'KDJ_D', 'KDJ_J')
+    ichi_cols = ('Ichi_Tenkan', 'Ichi_Kijun', 'Ichi_SenkouA', 'Ichi_SenkouB', 'Ichi_Chikou')
+    adx_cols = ('ADX', 'ADX_DIp', 'ADX_DIn')
+    interpret_cols = (
+        close_cols[0], close_cols[1], close_cols[2], close_cols[3],
+        close_cols[6], close_cols[4], close_cols[5], # BBU, BBL, BBM
+        # MACD Histogram 列名约定为 'MACDh_...' (注意小写 h)
+        close_cols[8], 'volume', vol_ma_col,
+    ) + kdj_cols + ichi_cols + adx_cols
+    return _IndicatorSpec(
+        ema_short, ema_long, roc_period, rsi_period, bb_period, bb_std, macd_fast, macd_slow, macd_signal,
+        vol_ma_period, params.get('kdj_length', 9), params.get('kdj_signal', 3),
+        params.get('ichimoku_tenkan', 9), params.get('ichimoku_kijun', 26), params.get('ichimoku_senkou_b', 52),
+        params.get('adx_length', 14),
+        close_cols, vol_ma_col, kdj_cols, ichi_cols, adx_cols, interpret_cols,
+    )
+
+
+def _missing_columns(columns: pd.Index, required) -> List[str]:
+    """返回 required 中不在 columns 里的列名 (保持 required 的顺序)；一次集合差集代替逐列的 Index 查找。"""
+    missing = set(required).difference(columns)
+    return [col for col in required if col in missing] if missing else []
+
+
+def _cross_flags(spread: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    按整列计算交叉: spread 为 快线-慢线 (MACD 柱本身即为 MACD-信号线)。
+    金叉: 当前 >0 且前一根 <=0；死叉: 当前 <0 且前一根 >=0。任一根缺失则不算交叉。
+    前一根通过下移一位得到，首行没有前值 (不能用 np.roll，否则首行会与末行比较)。
+    """
+    prev = np.empty_like(spread)
+    prev[:1] = np.nan
+    prev[1:] = spread[:-1]
+    return (spread > 0) & (prev <= 0), (spread < 0) & (prev >= 0)
+
+
+def _score_series(df: pd.DataFrame, config: dict) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    一次性对整段历史的每一行计算总分和信号等级 (与 _score_row 逐行结果一致)。
+
+    适用于回测等需要逐 K 线信号的场景：指标只需在整段数据上计算一次，
+    之后用布尔标志矩阵与权重向量相乘得到全部分数，不再按窗口重复调用解读函数。
+
+    Args:
+        df (pd.DataFrame): 已由 _calculate_indicators 计算指标的 K 线数据。
+        config (dict): 与 分析单周期趋势 相同的配置字典。
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (scores, signals)，signals 为 _SIGNAL_LABELS 的下标。
+    """
+    compiled = _compile_config(config)
+    cols = compiled.columns
+    missing_cols = _missing_columns(df.columns, cols)
+    if missing_cols:
+        raise KeyError(f"缺少指标列: {', '.join(missing_cols)}")
+    weights_arr, t = compiled.weights, compiled.thresholds
+
+    x = df.loc[:, list(cols)].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    close = x[:, _F_CLOSE]
+    ema_s, ema_l = x[:, _F_EMA_S], x[:, _F_EMA_L]
+    roc, rsi, macd_h = x[:, _F_ROC], x[:, _F_RSI], x[:, _F_MACD_H]
+    k, d, j = x[:, _F_K], x[:, _F_D], x[:, _F_J]
+    senkou_a, senkou_b = x[:, _F_SENKOU_A], x[:, _F_SENKOU_B]
+    tenkan, kijun = x[:, _F_TENKAN], x[:, _F_KIJUN]
+    adx, dip, din = x[:, _F_ADX], x[:, _F_DIP], x[:, _F_DIN]
+
+    # NaN 参与的比较结果均为 False，因此大多数标志无需单独判断缺失
+    with np.errstate(divide='ignore', invalid='ignore'):
+        diff_pct = np.where(ema_l != 0.0, (ema_s - ema_l) / ema_l, 0.0)
+    diff_pct[np.isnan(ema_s) | np.isnan(ema_l)] = np.nan
+
+    flags = np.zeros((len(x), len(_WEIGHT_DEFAULTS)), dtype=np.bool_)
+    # 1. EMA 趋势 / 2. ROC 动量: 按 elif 链取第一个成立的档位 (1 强正, 2 正, 3 强负, 4 负)
+    trend_cat = np.select([diff_pct > t[_T_TREND] * 2, diff_pct > 0, diff_pct < -t[_T_TREND] * 2, diff_pct < 0], [1, 2, 3, 4], 0)
+    mom_cat = np.select([roc > t[_T_MOM] * 2, roc > 0, roc < -t[_T_MOM] * 2, roc < 0], [1, 2, 3, 4], 0)
+    flags[:, _W_STRONG_BULL_TREND] = trend_cat == 1
+    flags[:, _W_BULL_TREND] = trend_cat == 2
+    flags[:, _W_STRONG_BEAR_TREND] = trend_cat == 3
+    flags[:, _W_BEAR_TREND] = trend_cat == 4
+    flags[:, _W_STRONG_POS_MOM] = mom_cat == 1
+    flags[:, _W_POS_MOM] = mom_cat == 2
+    flags[:, _W_STRONG_NEG_MOM] = mom_cat == 3
+    flags[:, _W_NEG_MOM] = mom_cat == 4
+    # 3. RSI
+    flags[:, _W_RSI_OB] = rsi > t[_T_RSI_OB]
+    flags[:, _W_RSI_OS] = (rsi < t[_T_RSI_OS]) & ~(rsi > t[_T_RSI_OB])
+    # 5. MACD 柱及交叉
+    flags[:, _W_MACD_POS] = macd_h > 0
+    flags[:, _W_MACD_NEG] = macd_h < 0
+    flags[:, _W_MACD_GOLD], flags[:, _W_MACD_DEAD] = _cross_flags(macd_h)
+    # 7. KDJ (K==D 按 K<D 处理；交叉需要 J 及前一行 K/D 均有效)
+    kd_valid = ~(np.isnan(k) | np.isnan(d))
+    flags[:, _W_K_ABOVE_D] = kd_valid & (k > d)
+    flags[:, _W_D_ABOVE_K] = kd_valid & ~(k > d)
+    flags[:, _W_KDJ_OB] = kd_valid & (j > t[_T_KDJ_OB])
+    flags[:, _W_KDJ_OS] = kd_valid & (j < t[_T_KDJ_OS]) & ~(j > t[_T_KDJ_OB])
+    kdj_gold, kdj_dead = _cross_flags(k - d)
+    flags[:, _W_KDJ_GOLD] = kdj_gold & ~np.isnan(j)
+    flags[:, _W_KDJ_DEAD] = kdj_dead & ~np.isnan(j)
+    # 8. Ichimoku
+    flags[:, _W_ABOVE_CLOUD] = (close > senkou_a) & (close > senkou_b)
+    flags[:, _W_BELOW_CLOUD] = (close < senkou_a) & (close < senkou_b)
+    flags[:, _W_TENKAN_ABOVE] = tenkan > kijun
+    flags[:, _W_KIJUN_ABOVE] = tenkan < kijun
+    # 9. ADX 确认
+    adx_strong = adx > t[_T_ADX_TREND]
+    adx_weak = (adx < t[_T_ADX_WEAK]) & ~adx_strong
+    adx_medium = ~np.isnan(adx) & ~adx_strong & ~adx_weak
+    flags[:, _W_ADX_STRONG_POS] = adx_strong & (dip > din)
+    flags[:, _W_ADX_MEDIUM_POS] = adx_medium & (dip > din)
+    flags[:, _W_ADX_STRONG_NEG] = adx_strong & (din > dip)
+    flags[:, _W_ADX_MEDIUM_NEG] = adx_medium & (din > dip)
+
+    # 标志矩阵 (N, 28) 与权重向量做一次矩阵-向量乘法，替代逐项累加
+    scores = flags.view(np.int8).astype(np.float64) @ weights_arr
+    signals = np.select(
+        [scores >= t[_T_STRONG_BULL], scores >= t[_T_BULL], scores <= t[_T_STRONG_BEAR], scores <= t[_T_BEAR]],
+        [4, 3, 2, 1], 0,
+    )
+    # ADX 弱趋势覆盖
+    if t[_T_ADX_OVERRIDE] != 0.0:
+        if t[_T_ADX_MAX_SIGNAL] == 0:
+            signals[adx_weak] = 0
+        elif t[_T_ADX_MAX_SIGNAL] == 1:
+            signals[adx_weak & (signals == 4)] = 3
+            signals[adx_weak & (signals == 2)] = 1
+    return scores, signals
+
+
+@njit(_SCORE_BATCH_SIG, cache=True, parallel=True, nogil=True)
+def _score_batch_kernel(x, w, t):
+    """
+    对 (S, N, F) 的多品种指标数组逐行调用 _score_row，各品种之间并行 (释放 GIL)。
+    每个品种首行没有前一行，按全 NaN 处理。返回 (scores, levels)，形状均为 (S, N)。
+    """
+    n_sym, n_rows, n_fields = x.shape
+    scores = np.full((n_sym, n_rows), np.nan)
+    levels = np.zeros((n_sym, n_rows), dtype=np.int64)
+    no_prev = np.full(n_fields, np.nan)
+    for s in prange(n_sym):
+        for i in range(n_rows):
+            prev = x[s, i - 1] if i > 0 else no_prev
+            score, level = _score_row(x[s, i], prev, w, t)
+            scores[s, i] = score
+            levels[s, i] = level
+    return scores, levels
+
+
+def _score_batch(dfs: List[pd.DataFrame], config: dict) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    对一批品种 (同一周期) 的指标数据逐行计算总分和信号等级，结果与逐个调用 _score_series 一致。
+
+    各 DataFrame 按末尾对齐截取到最短的长度后堆叠为 (S, N, F) 数组，交给并行内核按品种分核计算；
+    未安装 numba 时逐个品种调用向量化的 _score_series。
+
+    Args:
+        dfs (List[pd.DataFrame]): 已由 _calculate_indicators 计算指标的 K 线数据，每个品种一个。
+        config (dict): 与 分析单周期趋势 相同的配置字典。
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (scores, signals)，形状均为 (S, N)，signals 为 _SIGNAL_LABELS 的下标。
+    """
+    compiled = _compile_config(config)
+    cols = list(compiled.columns)
+    n_rows = min((len(df) for df in dfs), default=0)
+    x = np.full((len(dfs), n_rows, len(cols)), np.nan)
+    for s, df in enumerate(dfs):
+        missing_cols = _missing_columns(df.columns, cols)
+        if missing_cols:
+            raise KeyError(f"缺少指标列: {', '.join(missing_cols)}")
+        if n_rows:
+            x[s] = df.loc[:, cols].iloc[-n_rows:].to_numpy(dtype=np.float64, na_value=np.nan)
+    if not NUMBA_AVAILABLE:
+        scores = np.full((len(dfs), n_rows), np.nan)
+        levels = np.zeros((len(dfs), n_rows), dtype=np.int64)
+        for s in range(len(dfs)):
+            scores[s], levels[s] = _score_series(pd.DataFrame(x[s], columns=cols), config)
+        return scores, levels
+    return _score_batch_kernel(x, compiled.weights, compiled.thresholds)
+
+
+# 布林带位置分档: |相对位置| 依次落在 (0, 0.95]、(0.95, 1]、(1, ∞) 时对应 中轨上/下方、触轨、穿轨
+_BB_REL_EDGES = (0.95, 1.0)
+_BB_POS_ABOVE = (5, 3, 1)
+_BB_POS_BELOW = (6, 4, 2)
+
+
+@njit(_INTERPRET_STATES_SIG, cache=True)
+def _interpret_states(cur, prev, t):
+    """
+    将单行指标值 (按 _F_* 顺序，NaN 表示缺失) 归类为整数状态码，0 一律表示未知/无。
+    返回顺序与 InterpretationDetails 字段一致。纯数值 (与 _score_row 一样编译为机器码)，
+    状态码到字符串的映射在外部按预生成的表完成。
+
+    组合状态码: macd = 柱状态*3 + 交叉; kdj = K/D关系*9 + 交叉*3 + J水平;
+    ichi = 云位置*12 + 转换/基准*3 + 迟行线; adx = 强度*4 + DI方向。
+    """
+    close = cur[_F_CLOSE]
+
+    # 1. EMA 趋势
+    ema_short, ema_long = cur[_F_EMA_S], cur[_F_EMA_L]
+    ema_trend = 0
+    if not (np.isnan(ema_short) or np.isnan(ema_long)):
+        diff_pct = (ema_short - ema_long) / ema_long if ema_long != 0.0 else 0.0
+        if diff_pct > t[_T_TREND] * 2: ema_trend = 1
+        elif diff_pct > 0: ema_trend = 2
+        elif diff_pct < -t[_T_TREND] * 2: ema_trend = 3
+        elif diff_pct < 0: ema_trend = 4
+        else: ema_trend = 5
+
+    # 2. ROC 动量
+    roc = cur[_F_ROC]
+    roc_momentum = 0
+    if not np.isnan(roc):
+        if roc > t[_T_MOM] * 2: roc_momentum = 1
+        elif roc > 0: roc_momentum = 2
+        elif roc < -t[_T_MOM] * 2: roc_momentum = 3
+        elif roc < 0: roc_momentum = 4
+        else: roc_momentum = 5
+
+    # 3. RSI 超买超卖
+    rsi = cur[_F_RSI]
+    rsi_state = 0
+    if not np.isnan(rsi):
+        if rsi > t[_T_RSI_OB]: rsi_state = 1
+        elif rsi < t[_T_RSI_OS]: rsi_state = 2
+        else: rsi_state = 3
+
+    # 4. 布林带位置: 以半带宽为单位的相对位置分档 (触轨使用半带宽 5% 的容差)
+    bb_upper, bb_lower, bb_mid = cur[_F_BB_U], cur[_F_BB_L], cur[_F_BB_M]
+    bb_pos = 0
+    if not (np.isnan(close) or np.isnan(bb_upper) or np.isnan(bb_lower) or np.isnan(bb_mid)):
+        bb_rel = (close - bb_mid) / max(bb_upper - bb_mid, 1e-12)
+        # 档位 = 小于 |bb_rel| 的分界数 (即 bisect_left)
+        bucket = 0
+        for edge in _BB_REL_EDGES:
+            if edge < abs(bb_rel): bucket += 1
+        if bb_rel > 0: bb_pos = _BB_POS_ABOVE[bucket]
+        elif bb_rel < 0: bb_pos = _BB_POS_BELOW[bucket]
+        else: bb_pos = 7
+
+    # 5. MACD 柱及交叉
+    macd_hist, prev_macd_hist = cur[_F_MACD_H], prev[_F_MACD_H]
+    macd_hist_state = 0
+    macd_cross = 0
+    if not np.isnan(macd_hist):
+        if macd_hist > 0:
+            macd_hist_state = 1
+            if not np.isnan(prev_macd_hist) and prev_macd_hist <= 0: macd_cross = 1
+        elif macd_hist < 0:
+            macd_hist_state = 2
+            if not np.isnan(prev_macd_hist) and prev_macd_hist >= 0: macd_cross = 2
+        else:
+            macd_hist_state = 3
+
+    # 6. 成交量
+    volume, volume_ma = cur[_F_VOL], cur[_F_VOL_MA]
+    volume_state = 0
+    if not (np.isnan(volume) or np.isnan(volume_ma)) and volume_ma > 0:
+        if volume > volume_ma * t[_T_VOL_INC]: volume_state = 1
+        elif volume < volume_ma / t[_T_VOL_INC]: volume_state = 2
+        else: volume_state = 3
+
+    # 7. KDJ (K==D 按 K<D 处理；交叉需要 J 及前一行 K/D 均有效)
+    kdj_k, kdj_d, kdj_j = cur[_F_K], cur[_F_D], cur[_F_J]
+    prev_k, prev_d = prev[_F_K], prev[_F_D]
+    kdj_kd = kdj_cross = kdj_level = 0
+    if not (np.isnan(kdj_k) or np.isnan(kdj_d)):
+        kdj_kd = 1 if kdj_k > kdj_d else 2
+        if not np.isnan(kdj_j):
+            if kdj_j > t[_T_KDJ_OB]: kdj_level = 1
+            elif kdj_j < t[_T_KDJ_OS]: kdj_level = 2
+            if not (np.isnan(prev_k) or np.isnan(prev_d)):
+                if kdj_k > kdj_d and prev_k <= prev_d: kdj_cross = 1
+                elif kdj_k < kdj_d and prev_k >= prev_d: kdj_cross = 2
+
+    # 8. Ichimoku (迟行线仅与当前收盘价粗略比较)
+    tenkan, kijun = cur[_F_TENKAN], cur[_F_KIJUN]
+    senkou_a, senkou_b, chikou = cur[_F_SENKOU_A], cur[_F_SENKOU_B], cur[_F_CHIKOU]
+    ichi_cloud = ichi_tk = ichi_chikou = 0
+    if not (np.isnan(close) or np.isnan(senkou_a) or np.isnan(senkou_b)):
+        if close > senkou_a and close > senkou_b: ichi_cloud = 1
+        elif close < senkou_a and close < senkou_b: ichi_cloud = 2
+        else: ichi_cloud = 3
+    if not (np.isnan(tenkan) or np.isnan(kijun)):
+        if tenkan > kijun: ichi_tk = 1
+        elif tenkan < kijun: ichi_tk = 2
+        else: ichi_tk = 3
+    if not (np.isnan(chikou) or np.isnan(close)):
+        if chikou > close: ichi_chikou = 1
+        elif chikou < close: ichi_chikou = 2
+
+    # 9. ADX
+    adx, adx_dip, adx_din = cur[_F_ADX], cur[_F_DIP], cur[_F_DIN]
+    adx_strength = adx_di = 0
+    if not np.isnan(adx):
+        if adx > t[_T_ADX_TREND]: adx_strength = 1
+        elif adx < t[_T_ADX_WEAK]: adx_strength = 2
+        else: adx_strength = 3
+    if not (np.isnan(adx_dip) or np.isnan(adx_din)):
+        if adx_dip > adx_din: adx_di = 1
+        elif adx_din > adx_dip: adx_di = 2
+        else: adx_di = 3
+
+    return (
+        ema_trend,
+        roc_momentum,
+        rsi_state,
+        bb_pos,
+        macd_hist_state * 3 + macd_cross,
+        macd_cross,
+        macd_hist_state,
+        volume_state,
+        kdj_kd * 9 + kdj_cross * 3 + kdj_level,
+        ichi_cloud * 12 + ichi_tk * 3 + ichi_chikou,
+        adx_strength * 4 + adx_di,
+    )
+
+
+def _format_details(cur: np.ndarray, prev: np.ndarray, compiled: _CompiledConfig) -> Dict[str, str]:
+    """生成单个时间点的各项指标解读字符串 (仅在调用方需要详细解读时使用)。"""
+    state_codes = _interpret_states(cur, prev, compiled.thresholds)
+    details = InterpretationDetails._make([table[code] for table, code in zip(compiled.labels, state_codes)])
+    return details._asdict()
+
 
 # --- 内部辅助函数：解读指标 ---
-def _interpret_indicators(last_row: pd.Series, prev_row: pd.Series, config: dict,
-                        ema_short_col: str, ema_long_col: str, roc_col: str,
-                        rsi_col: str, bb_upper_col: str, bb_lower_col: str, bb_mid_col: str,
-                        macd_hist_col: str, volume_col: str, volume_ma_col: str,
-                        kdj_k_col: str, kdj_d_col: str, kdj_j_col: str,
-                        ichi_tenkan_col: str, ichi_kijun_col: str, ichi_senkou_a_col: str, ichi_senkou_b_col: str, ichi_chikou_col: str,
-                        adx_col: str, adx_dip_col: str, adx_din_col: str
-                        ) -> Dict[str, Union[str, float, Dict[str, str]]]:
+def _interpret_indicators(rows: pd.DataFrame, config: dict,
+                          include_details: bool = False) -> Dict[str, Union[str, float, Dict[str, str], None]]:
     """
-    解读单个时间点的所有指标，生成详细解读、评分和组合信号。
+    解读单个时间点的所有指标，生成评分和组合信号，按需生成详细解读。
 
     Args:
-        last_row (pd.Series): 最新的包含指标的 K 线数据行。
-        prev_row (pd.Series): 倒数第二行 K 线数据，用于计算交叉等。
+        rows (pd.DataFrame): 最后两行包含指标的 K 线数据 (倒数第二行用于计算交叉等)。
+            列已与 _compile_config(config).columns 完全一致时直接转换，不再按列名选取。
         config (dict): 包含解读阈值的配置 (e.g., rsi_oversold, adx_threshold)。
-        ... (column names for all indicators) ...
+        include_details (bool): 是否生成各项指标的解读字符串。默认只计算评分与信号。
 
     Returns:
         Dict: 包含 'combined_signal', 'score', 'details' 的字典。
-              'details' 是一个包含各项指标解读字符串的子字典。
-    """
-    interpretations = {}
-    combined_signal_str = "↔️" # Default signal string
-    score = 0.0 # Default score
-    params = config.get('PARAMS', {})
-    thresholds_interpret = config.get('THRESHOLDS', {}) # Thresholds for interpretation
-    # !!! Get Scoring Config !!!
-    scoring_config = config.get('SCORING', {})
-    weights = scoring_config.get('WEIGHTS', {}) # Scoring weights
-    thresholds_score = scoring_config.get('THRESHOLDS', {}) # Scoring thresholds
-
+              'details' 是一个包含各项指标解读字符串的子字典；include_details=False 时为 None。
+    """
     try:
-        # --- 提取基础数据 ---
-        close = last_row['close']
-        # --- 现有指标解读 --- 
-        # 1. EMA Trend
-        ema_short = last_row.get(ema_short_col, pd.NA)
-        ema_long = last_row.get(ema_long_col, pd.NA)
-        trend_strength_threshold = thresholds_interpret.get('trend_strength_threshold', 0.001) # Example threshold
-        ema_trend = "趋势: 未知"
-        if pd.notna(ema_short) and pd.notna(ema_long):
-            diff_pct = (ema_short - ema_long) / ema_long if ema_long else 0
-            if diff_pct > trend_strength_threshold * 2: ema_trend = "趋势: 强升(↑↑)"
-            elif diff_pct > 0: ema_trend = "趋势: 上升(↑)"
-            elif diff_pct < -trend_strength_threshold * 2: ema_trend = "趋势: 强降(↓↓)"
-            elif diff_pct < 0: ema_trend = "趋势: 下降(↓)"
-            else: ema_trend = "趋势: 盘整(↔)"
-        interpretations['ema_trend'] = ema_trend
-
-        # 2. ROC Momentum
-        roc = last_row.get(roc_col, pd.NA)
-        mom_strength_threshold = thresholds_interpret.get('momentum_strength_threshold', 0.1) # Example threshold
-        roc_momentum = "动量: 未知"
-        if pd.notna(roc):
-            if roc > mom_strength_threshold * 2: roc_momentum = "动量: 强正(++)"
-            elif roc > 0: roc_momentum = "动量: 正向(+)"
-            elif roc < -mom_strength_threshold * 2: roc_momentum = "动量: 强负(--)"
-            elif roc < 0: roc_momentum = "动量: 负向(-)"
-            else: roc_momentum = "动量: 趋平(0)"
-        interpretations['roc_momentum'] = roc_momentum
-
-        # 3. RSI Overbought/Oversold
-        rsi = last_row.get(rsi_col, pd.NA)
-        oversold = thresholds_interpret.get('rsi_oversold', 30)
-        overbought = thresholds_interpret.get('rsi_overbought', 70)
-        rsi_state = "RSI: 未知"
-        if pd.notna(rsi):
-            if rsi > overbought: rsi_state = f"RSI: 超买(>{overbought})"
-            elif rsi < oversold: rsi_state = f"RSI: 超卖(<{oversold})"
-            else: rsi_state = "RSI: 中性"
-        interpretations['rsi_state'] = rsi_state
-
-        # 4. Bollinger Bands Position
-        bb_upper = last_row.get(bb_upper_col, pd.NA)
-        bb_lower = last_row.get(bb_lower_col, pd.NA)
-        bb_mid = last_row.get(bb_mid_col, pd.NA) # Get Mid Band value
-        bb_pos = "BB: 未知"
-        if pd.notna(close) and pd.notna(bb_upper) and pd.notna(bb_lower) and pd.notna(bb_mid):
-            if close > bb_upper: bb_pos = "BB: 穿上轨(↗↗)" 
-            elif close < bb_lower: bb_pos = "BB: 穿下轨(↘↘)" 
-            # Use a small tolerance for touching
-            elif abs(close - bb_upper) < (bb_upper - bb_mid) * 0.05 : bb_pos = "BB: 触上轨(↗)" 
-            elif abs(close - bb_lower) < (bb_mid - bb_lower) * 0.05 : bb_pos = "BB: 触下轨(↘)"
-            elif close > bb_mid: bb_pos = "BB: 中轨上方"
-            elif close < bb_mid: bb_pos = "BB: 中轨下方"
-            else: bb_pos = "BB: 在中轨"
-        interpretations['bb_pos'] = bb_pos
-
-        # 5. MACD Histogram and Cross
-        macd_hist = last_row.get(macd_hist_col, pd.NA)
-        prev_macd_hist = prev_row.get(macd_hist_col, pd.NA) if prev_row is not None else pd.NA
-        macd_cross = ""
-        macd_hist_state = ""
-        if pd.notna(macd_hist):
-            if macd_hist > 0:
-                 macd_hist_state = "柱>0"
-                 if pd.notna(prev_macd_hist) and prev_macd_hist <= 0: macd_cross = ",金叉(🔼)" # Gold Cross
-            elif macd_hist < 0:
-                 macd_hist_state = "柱<0"
-                 if pd.notna(prev_macd_hist) and prev_macd_hist >= 0: macd_cross = ",死叉(🔽)" # Dead Cross
-            else:
-                 macd_hist_state = "柱=0"
-        macd_combined_state = f"MACD:{macd_hist_state}{macd_cross}"
-        interpretations['macd_state'] = macd_combined_state
-        interpretations['macd_cross'] = macd_cross # Store cross separately if needed for logic
-        interpretations['macd_hist_state'] = macd_hist_state # Store state separately
-
-        # 6. Volume Analysis
-        volume = last_row.get(volume_col, pd.NA)
-        volume_ma = last_row.get(volume_ma_col, pd.NA)
-        volume_increase_threshold = thresholds_interpret.get('volume_increase_threshold', 1.2)
-        volume_state = "Vol: 未知"
-        if pd.notna(volume) and pd.notna(volume_ma) and volume_ma > 0:
-            if volume > volume_ma * volume_increase_threshold: volume_state = "Vol: 放量(📈)"
-            elif volume < volume_ma / volume_increase_threshold: volume_state = "Vol: 缩量(📉)"
-            else: volume_state = "Vol: 平量"
-        interpretations['volume_state'] = volume_state
-
-        # --- 新指标解读 --- 
-        
-        # 7. KDJ Interpretation
-        kdj_k = last_row.get(kdj_k_col, pd.NA)
-        kdj_d = last_row.get(kdj_d_col, pd.NA)
-        kdj_j = last_row.get(kdj_j_col, pd.NA)
-        prev_k = prev_row.get(kdj_k_col, pd.NA) if prev_row is not None else pd.NA
-        prev_d = prev_row.get(kdj_d_col, pd.NA) if prev_row is not None else pd.NA
-        kdj_cross = ""
-        kdj_level = ""
-        kdj_signal_str = "KDJ: 未知"
-        if pd.notna(kdj_k) and pd.notna(kdj_d) and pd.notna(kdj_j) and pd.notna(prev_k) and pd.notna(prev_d):
-            # KDJ Cross
-            if kdj_k > kdj_d and prev_k <= prev_d: kdj_cross = ",金叉(🔼)" 
-            elif kdj_k < kdj_d and prev_k >= prev_d: kdj_cross = ",死叉(🔽)"
-            # J Level (common thresholds: 80-100 overbought, 0-20 oversold)
-            kdj_overbought = thresholds_interpret.get('kdj_overbought', 80)
-            kdj_oversold = thresholds_interpret.get('kdj_oversold', 20)
-            if kdj_j > kdj_overbought: kdj_level = f",J超买(>{kdj_overbought})"
-            elif kdj_j < kdj_oversold: kdj_level = f",J超卖(<{kdj_oversold})"
-            kdj_signal_str = f"KDJ: K>D" if kdj_k > kdj_d else "KDJ: K<D" 
-            kdj_signal_str += kdj_cross + kdj_level
-        elif pd.notna(kdj_k) and pd.notna(kdj_d): # Handle case with no prev data
-             kdj_signal_str = f"KDJ: K>D" if kdj_k > kdj_d else "KDJ: K<D" 
-             # J Level interpretation still possible
-             kdj_overbought = thresholds_interpret.get('kdj_overbought', 80)
-             kdj_oversold = thresholds_interpret.get('kdj_oversold', 20)
-             if pd.notna(kdj_j):
-                 if kdj_j > kdj_overbought: kdj_level = f",J超买(>{kdj_overbought})"
-                 elif kdj_j < kdj_oversold: kdj_level = f",J超卖(<{kdj_oversold})"
-             kdj_signal_str += kdj_level
-        interpretations['kdj_signal'] = kdj_signal_str
-
-        # 8. Ichimoku Interpretation
-        tenkan = last_row.get(ichi_tenkan_col, pd.NA)
-        kijun = last_row.get(ichi_kijun_col, pd.NA)
-        senkou_a = last_row.get(ichi_senkou_a_col, pd.NA)
-        senkou_b = last_row.get(ichi_senkou_b_col, pd.NA)
-        chikou = last_row.get(ichi_chikou_col, pd.NA)
-        # Note: Chikou needs comparison against price N periods ago (e.g., 26). This row doesn't have it directly.
-        # We can only compare Chikou with the *current* close for a rough idea, or ignore Chikou for simplicity here.
-        ichi_signal_parts = []
-        if pd.notna(close) and pd.notna(senkou_a) and pd.notna(senkou_b):
-            if close > senkou_a and close > senkou_b: ichi_signal_parts.append("价在云上")
-            elif close < senkou_a and close < senkou_b: ichi_signal_parts.append("价在云下")
-            else: ichi_signal_parts.append("价在云中")
-        if pd.notna(tenkan) and pd.notna(kijun):
-            if tenkan > kijun: ichi_signal_parts.append("转>基") # Tenkan > Kijun (Bullish)
-            elif tenkan < kijun: ichi_signal_parts.append("转<基") # Tenkan < Kijun (Bearish)
-            else: ichi_signal_parts.append("转=基")
-        # Chikou interpretation (simplified: vs current close - less accurate)
-        if pd.notna(chikou) and pd.notna(close):
-             if chikou > close: ichi_signal_parts.append("迟>价")
-             elif chikou < close: ichi_signal_parts.append("迟<价")
-        ichi_signal_str = "Ichi: " + (", ".join(ichi_signal_parts) if ichi_signal_parts else "未知")
-        interpretations['ichi_signal'] = ichi_signal_str
-
-        # 9. ADX Interpretation
-        adx = last_row.get(adx_col, pd.NA)
-        adx_dip = last_row.get(adx_dip_col, pd.NA) # +DI
-        adx_din = last_row.get(adx_din_col, pd.NA) # -DI
-        adx_trend_threshold = thresholds_interpret.get('adx_trend_threshold', 25) # Common threshold for trending market
-        adx_weak_threshold = thresholds_interpret.get('adx_weak_threshold', 20)
-        adx_signal_parts = []
-        if pd.notna(adx):
-            if adx > adx_trend_threshold: adx_signal_parts.append(f"强趋(>{adx_trend_threshold:.0f})")
-            elif adx < adx_weak_threshold: adx_signal_parts.append(f"弱趋(<{adx_weak_threshold:.0f})")
-            else: adx_signal_parts.append("趋中")
-        if pd.notna(adx_dip) and pd.notna(adx_din):
-            if adx_dip > adx_din: adx_signal_parts.append("+DI>-DI") # Uptrend bias
-            elif adx_din > adx_dip: adx_signal_parts.append("-DI>+DI") # Downtrend bias
-            else: adx_signal_parts.append("+DI=-DI")
-        adx_signal_str = "ADX: " + (", ".join(adx_signal_parts) if adx_signal_parts else "未知")
-        interpretations['adx_signal'] = adx_signal_str
-        
-        # --- 提取状态变量 (用于计分) ---
-        # (This logic remains the same)
-        is_strong_bull_trend = interpretations.get('ema_trend') == "趋势: 强升(↑↑)"
-        is_bull_trend = interpretations.get('ema_trend') == "趋势: 上升(↑)"
-        is_strong_bear_trend = interpretations.get('ema_trend') == "趋势: 强降(↓↓)"
-        is_bear_trend = interpretations.get('ema_trend') == "趋势: 下降(↓)"
-        is_ranging_trend = interpretations.get('ema_trend') == "趋势: 盘整(↔)"
-        is_strong_pos_mom = interpretations.get('roc_momentum') == "动量: 强正(++)"
-        is_pos_mom = interpretations.get('roc_momentum') == "动量: 正向(+)"
-        is_strong_neg_mom = interpretations.get('roc_momentum') == "动量: 强负(--)"
-        is_neg_mom = interpretations.get('roc_momentum') == "动量: 负向(-)"
-        is_weak_mom = interpretations.get('roc_momentum') == "动量: 趋平(0)"
-        is_overbought = "超买" in interpretations.get('rsi_state', "")
-        is_oversold = "超卖" in interpretations.get('rsi_state', "")
-        is_macd_gold_cross = "金叉" in interpretations.get('macd_state', "")
-        is_macd_dead_cross = "死叉" in interpretations.get('macd_state', "")
-        is_macd_hist_pos = "柱>0" in interpretations.get('macd_state', "")
-        is_macd_hist_neg = "柱<0" in interpretations.get('macd_state', "")
-        is_volume_high = "放量" in interpretations.get('volume_state', "") # Volume score not implemented yet
-        is_kdj_gold_cross = "金叉" in interpretations.get('kdj_signal', "")
-        is_kdj_dead_cross = "死叉" in interpretations.get('kdj_signal', "")
-        is_kdj_overbought = "J超买" in interpretations.get('kdj_signal', "")
-        is_kdj_oversold = "J超卖" in interpretations.get('kdj_signal', "")
-        is_kdj_k_above_d = "K>D" in interpretations.get('kdj_signal', "")
-        is_kdj_d_above_k = "K<D" in interpretations.get('kdj_signal', "")
-        is_price_above_cloud = "价在云上" in interpretations.get('ichi_signal', "")
-        is_price_below_cloud = "价在云下" in interpretations.get('ichi_signal', "")
-        is_tenkan_above_kijun = "转>基" in interpretations.get('ichi_signal', "")
-        is_kijun_above_tenkan = "转<基" in interpretations.get('ichi_signal', "")
-        is_adx_strong_trend = "强趋" in interpretations.get('adx_signal', "")
-        is_adx_medium_trend = "趋中" in interpretations.get('adx_signal', "")
-        is_adx_weak_trend = "弱趋" in interpretations.get('adx_signal', "")
-        is_adx_pos_dominant = "+DI>-DI" in interpretations.get('adx_signal', "")
-        is_adx_neg_dominant = "-DI>+DI" in interpretations.get('adx_signal', "")
-
-        # --- 计算总分 --- 
-        score = 0
-        if not weights: 
-             logging.warning("评分权重未在配置中定义，无法计算分数。")
-        else:
-            # Trend
-            if is_strong_bull_trend: score += weights.get('strong_bull_trend', 3)
-            if is_bull_trend: score += weights.get('bull_trend', 1)
-            if is_strong_bear_trend: score += weights.get('strong_bear_trend', -3)
-            if is_bear_trend: score += weights.get('bear_trend', -1)
-            # Momentum
-            if is_strong_pos_mom: score += weights.get('strong_pos_mom', 2)
-            if is_pos_mom: score += weights.get('pos_mom', 1)
-            if is_strong_neg_mom: score += weights.get('strong_neg_mom', -2)
-            if is_neg_mom: score += weights.get('neg_mom', -1)
-            # Oscillators
-            if is_overbought: score += weights.get('rsi_overbought', -2)
-            if is_oversold: score += weights.get('rsi_oversold', 2)
-            if is_kdj_overbought: score += weights.get('kdj_overbought', -1)
-            if is_kdj_oversold: score += weights.get('kdj_oversold', 1)
-            # Crosses
-            if is_macd_gold_cross: score += weights.get('macd_gold_cross', 3)
-            if is_macd_dead_cross: score += weights.get('macd_dead_cross', -3)
-            if is_kdj_gold_cross: score += weights.get('kdj_gold_cross', 2)
-            if is_kdj_dead_cross: score += weights.get('kdj_dead_cross', -2)
-            # State/Location
-            if is_macd_hist_pos: score += weights.get('macd_hist_pos', 1)
-            if is_macd_hist_neg: score += weights.get('macd_hist_neg', -1)
-            if is_kdj_k_above_d: score += weights.get('kdj_k_above_d', 0.5)
-            if is_kdj_d_above_k: score += weights.get('kdj_d_above_k', -0.5)
-            if is_price_above_cloud: score += weights.get('price_above_cloud', 2)
-            if is_price_below_cloud: score += weights.get('price_below_cloud', -2)
-            if is_tenkan_above_kijun: score += weights.get('tenkan_above_kijun', 1)
-            if is_kijun_above_tenkan: score += weights.get('kijun_above_tenkan', -1)
-            # ADX Confirmation
-            if is_adx_strong_trend and is_adx_pos_dominant: score += weights.get('adx_strong_pos', 2)
-            if is_adx_medium_trend and is_adx_pos_dominant: score += weights.get('adx_medium_pos', 1)
-            if is_adx_strong_trend and is_adx_neg_dominant: score += weights.get('adx_strong_neg', -2)
-            if is_adx_medium_trend and is_adx_neg_dominant: score += weights.get('adx_medium_neg', -1)
-        
-        logging.debug(f"Calculated score: {score}")
-
-        # --- 映射分数到信号 --- 
-        strong_bull_thresh = thresholds_score.get('strong_bullish', 8)
-        bull_thresh = thresholds_score.get('bullish', 3)
-        strong_bear_thresh = thresholds_score.get('strong_bearish', -8)
-        bear_thresh = thresholds_score.get('bearish', -3)
-        adx_override = thresholds_score.get('adx_weak_override_enabled', True)
-        adx_max_signal = thresholds_score.get('adx_weak_max_signal', 1) # 0: force ↔️, 1: cap at +/-
-        
-        signal_level = 0 # 0: Neutral, 1: Bearish, 2: Strong Bearish, 3: Bullish, 4: Strong Bullish
-        
-        if score >= strong_bull_thresh: signal_level = 4
-        elif score >= bull_thresh: signal_level = 3
-        elif score <= strong_bear_thresh: signal_level = 2
-        elif score <= bear_thresh: signal_level = 1
-        else: signal_level = 0
-            
-        # Apply ADX Weak Override
-        if adx_override and is_adx_weak_trend:
-            logging.debug(f"ADX weak trend detected. Applying override (max_signal={adx_max_signal}). Original signal level: {signal_level}")
-            if adx_max_signal == 0:
-                signal_level = 0 # Force neutral
-            elif adx_max_signal == 1:
-                # Cap at +/- ; Strong signals become normal, neutral remains neutral
-                if signal_level == 4: signal_level = 3 # Strong Bull -> Bull
-                elif signal_level == 2: signal_level = 1 # Strong Bear -> Bear
-            # If adx_max_signal is > 1, no capping applied based on this setting
-            logging.debug(f"Signal level after ADX override: {signal_level}")
-            
-        # Map final level to signal string
-        if signal_level == 4: combined_signal_str = "强看涨(🚀)"
-        elif signal_level == 3: combined_signal_str = "看涨(+)"
-        elif signal_level == 2: combined_signal_str = "强看跌(💥)"
-        elif signal_level == 1: combined_signal_str = "看跌(-)"
-        else: combined_signal_str = "盘整/不明(↔️)"
-            
+        # --- 一次性提取为 float64 数组 (缺失值统一为 NaN；缺少 close 列时抛出 KeyError) ---
+        compiled = _compile_config(config)
+        if tuple(rows.columns) != compiled.columns:
+            rows = rows.loc[:, list(compiled.columns)]
+        values = np.ascontiguousarray(rows.to_numpy(dtype=np.float64, na_value=np.nan))
+        cur_arr = values[-1]
+        prev_arr = values[-2] if len(values) > 1 else np.full(len(compiled.columns), np.nan)
+
+        # --- 计算总分与信号 ---
+        score, signal_level = _score_row(cur_arr, prev_arr, compiled.weights, compiled.thresholds)
+        logger.debug("Calculated score: %s, signal level: %s", score, signal_level)
+        combined_signal_str = _SIGNAL_LABELS[signal_level]
+
+        # --- 各指标解读字符串 (仅在需要时生成) ---
+        details = _format_details(cur_arr, prev_arr, compiled) if include_details else None
+
         # --- 返回结构化结果 --- 
         return {
             "combined_signal": combined_signal_str,
-            "score": round(score, 2), # Round score for cleaner output
-            "details": interpretations # Return the dictionary with detailed interpretations
+            "score": round(float(score), 2), # Round score for cleaner output
+            "details": details
         }
 
     except Exception as e:
-        logging.error(f"Error interpreting indicators: {e}", exc_info=True)
+        logger.error("Error interpreting indicators: %s", e, exc_info=True)
         # Return an error structure
         return {
             "combined_signal": "错误",
@@ -369,187 +783,423 @@ def _interpret_indicators(last_row: pd.Series, prev_row: pd.Series, config: dict
             "details": {"error": "无法解读指标"}
         }
 
+# --- 指标后端：优先 TA-Lib，未安装时回退 pandas_ta；均接收/返回 float64 ndarray ---
+def _pta_values(result, n: int, width: int = 0) -> np.ndarray:
+    """pandas_ta 在数据不足时返回 None，统一转换为 ndarray (width>0 时为 n x width 的二维数组)。"""
+    if result is None:
+        return np.full((n, width) if width else n, np.nan)
+    return result.to_numpy(dtype=np.float64)
+
+def _ind_ema(close: np.ndarray, length: int) -> np.ndarray:
+    if talib is not None:
+        return talib.EMA(close, timeperiod=length)
+    return _pta_values(ta.ema(pd.Series(close), length=length), len(close))
+
+def _ind_roc(close: np.ndarray, length: int) -> np.ndarray:
+    if talib is not None:
+        return talib.ROC(close, timeperiod=length)
+    # 无 TA-Lib 时直接用数组切片计算 (与 pandas_ta.roc 相同: 100 * (close - close[-length]) / close[-length])
+    out = np.full(len(close), np.nan)
+    if 0 < length < len(close):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[length:] = 100 * (close[length:] - close[:-length]) / close[:-length]
+    return out
+
+def _ind_rsi(close: np.ndarray, length: int) -> np.ndarray:
+    if talib is not None:
+        return talib.RSI(close, timeperiod=length)
+    return _pta_values(ta.rsi(pd.Series(close), length=length), len(close))
+
+def _ind_bbands(close: np.ndarray, length: int, std: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """返回 (lower, mid, upper)。"""
+    if talib is not None:
+        upper, mid, lower = talib.BBANDS(close, timeperiod=length, nbdevup=std, nbdevdn=std, matype=0)
+        return lower, mid, upper
+    # 无 TA-Lib 时用滑动窗口视图一次求出均值与总体标准差 (与 pandas_ta.bbands 默认 ddof=0 一致)
+    n = len(close)
+    mid = np.full(n, np.nan)
+    width = np.full(n, np.nan)
+    if 0 < length <= n:
+        windows = np.lib.stride_tricks.sliding_window_view(close, length)
+        mid[length - 1:] = windows.mean(axis=1)
+        width[length - 1:] = windows.std(axis=1) * std
+    return mid - width, mid, mid + width
+
+def _ind_macd(close: np.ndarray, fast: int, slow: int, signal: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """返回 (macd, hist, signal)，与 pandas_ta 的 MACD/MACDh/MACDs 对应。"""
+    if talib is not None:
+        macd, macd_signal, macd_hist = talib.MACD(close, fastperiod=fast, slowperiod=slow, signalperiod=signal)
+        return macd, macd_hist, macd_signal
+    m = _pta_values(ta.macd(pd.Series(close), fast=fast, slow=slow, signal=signal), len(close), 3)
+    return m[:, 0], m[:, 1], m[:, 2]
+
+def _ind_kdj(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int, signal: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """返回 (K, D, J)。KDJ 的 K/D 平滑为 alpha=1/signal 的 RMA，等价于周期 2*signal-1 的 EMA。"""
+    if talib is not None:
+        smooth = 2 * signal - 1
+        k, d = talib.STOCH(high, low, close, fastk_period=length,
+                           slowk_period=smooth, slowk_matype=1, slowd_period=smooth, slowd_matype=1)
+        return k, d, 3 * k - 2 * d
+    n = len(close)
+    kdj = _pta_values(ta.kdj(pd.Series(high), pd.Series(low), pd.Series(close), length=length, signal=signal), n, 3)
+    return kdj[:, 0], kdj[:, 1], kdj[:, 2]
+
+def _ind_adx(high: np.ndarray, low: np.ndarray, close: np.ndarray, length: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """返回 (ADX, +DI, -DI)。"""
+    if talib is not None:
+        return (talib.ADX(high, low, close, timeperiod=length),
+                talib.PLUS_DI(high, low, close, timeperiod=length),
+                talib.MINUS_DI(high, low, close, timeperiod=length))
+    n = len(close)
+    adx = _pta_values(ta.adx(pd.Series(high), pd.Series(low), pd.Series(close), length=length), n, 3)
+    return adx[:, 0], adx[:, 1], adx[:, 2]
+
+@njit(_FUSED_CLOSE_SIG, cache=True)
+def _fused_close_kernel(close, ema_s_n, ema_l_n, roc_n, rsi_n, bb_n, bb_dev, fast, slow, signal):
+    """
+    一次遍历 close 同时计算 EMA(短/长)、ROC、RSI、布林带和 MACD，算法与 TA-Lib 相同 (仅有浮点舍入级差异)：
+    EMA 以前 N 根的 SMA 为种子；MACD 快线种子取慢线种子窗口末端的 fast 根 (TA-Lib 的对齐方式)；
+    RSI 为 Wilder 平滑；布林带为总体标准差。要求 close 首元素非 NaN、slow >= fast。
+
+    返回 10 x n 数组，行顺序: ema_s, ema_l, roc, rsi, bb_lower, bb_mid, bb_upper, macd, macd_hist, macd_signal。
+    """
+    n = close.shape[0]
+    out = np.full((10, n), np.nan)
+    k_s = 2.0 / (ema_s_n + 1)
+    k_l = 2.0 / (ema_l_n + 1)
+    k_fast = 2.0 / (fast + 1)
+    k_slow = 2.0 / (slow + 1)
+    k_sig = 2.0 / (signal + 1)
+    fast_start = slow - fast
+    ema_s = ema_l = ema_fast = ema_slow = sig = 0.0
+    gain = loss = 0.0
+    bb_sum = bb_mean = bb_m2 = 0.0
+
+    for i in range(n):
+        c = close[i]
+
+        # EMA 短/长: 先累加种子窗口，之后递推
+        if i < ema_s_n - 1:
+            ema_s += c
+        elif i == ema_s_n - 1:
+            ema_s = (ema_s + c) / ema_s_n
+            out[0, i] = ema_s
+        else:
+            ema_s = (c - ema_s) * k_s + ema_s
+            out[0, i] = ema_s
+        if i < ema_l_n - 1:
+            ema_l += c
+        elif i == ema_l_n - 1:
+            ema_l = (ema_l + c) / ema_l_n
+            out[1, i] = ema_l
+        else:
+            ema_l = (c - ema_l) * k_l + ema_l
+            out[1, i] = ema_l
+
+        # ROC
+        if i >= roc_n:
+            base = close[i - roc_n]
+            out[2, i] = ((c / base) - 1.0) * 100.0 if base != 0.0 else 0.0
+
+        # RSI (前 rsi_n 个差值取简单平均，之后 Wilder 平滑)
+        if i >= 1:
+            delta = c - close[i - 1]
+            if i > rsi_n:
+                loss *= (rsi_n - 1)
+                gain *= (rsi_n - 1)
+            if delta < 0:
+                loss -= delta
+            else:
+                gain += delta
+            if i >= rsi_n:
+                loss /= rsi_n
+                gain /= rsi_n
+                total = gain + loss
+                out[3, i] = 100.0 * (gain / total) if not (-1e-8 < total < 1e-8) else 0.0
+            # 未满 rsi_n 个差值时只累加，不做平均
+
+        # 布林带: 中轨为滑动和 (与 TA-Lib SMA 相同)，方差用滑动窗口 Welford 更新 (避免平方和相减的抵消误差)
+        bb_sum += c
+        if i < bb_n:
+            delta = c - bb_mean
+            bb_mean += delta / (i + 1)
+            bb_m2 += delta * (c - bb_mean)
+        else:
+            old = close[i - bb_n]
+            prev_mean = bb_mean
+            bb_mean += (c - old) / bb_n
+            bb_m2 += (c - old) * (c - bb_mean + old - prev_mean)
+        if i >= bb_n - 1:
+            mid = bb_sum / bb_n
+            bb_sum -= close[i - bb_n + 1]
+            var = bb_m2 / bb_n
+            width = (np.sqrt(var) if var >= 1e-8 else 0.0) * bb_dev # 与 TA-Lib 相同，极小方差视为 0
+            out[4, i] = mid - width
+            out[5, i] = mid
+            out[6, i] = mid + width
+
+        # MACD: 慢线种子为 close[0:slow]，快线种子为 close[slow-fast:slow]，均在 slow-1 处对齐
+        if i < slow - 1:
+            ema_slow += c
+            if i >= fast_start:
+                ema_fast += c
+        elif i == slow - 1:
+            ema_slow = (ema_slow + c) / slow
+            ema_fast = (ema_fast + c) / fast
+        else:
+            ema_slow = (c - ema_slow) * k_slow + ema_slow
+            ema_fast = (c - ema_fast) * k_fast + ema_fast
+        if i >= slow - 1:
+            macd = ema_fast - ema_slow
+            j = i - (slow - 1)
+            if j < signal - 1:
+                sig += macd
+            else:
+                if j == signal - 1:
+                    sig = (sig + macd) / signal
+                else:
+                    sig = (macd - sig) * k_sig + sig
+                out[7, i] = macd
+                out[8, i] = macd - sig
+                out[9, i] = sig
+    return out
+
+def _ind_close_fused(close: np.ndarray, ema_s: int, ema_l: int, roc_n: int, rsi_n: int, bb_n: int, bb_std: float,
+                     fast: int, slow: int, signal: int) -> np.ndarray:
+    """_fused_close_kernel 的包装：与 TA-Lib Python 封装一样跳过开头的 NaN，并保证 slow >= fast。"""
+    out = np.full((10, len(close)), np.nan)
+    valid = np.flatnonzero(~np.isnan(close))
+    if valid.size == 0:
+        return out
+    begin = valid[0]
+    if slow < fast:
+        fast, slow = slow, fast
+    out[:, begin:] = _fused_close_kernel(np.ascontiguousarray(close[begin:]), int(ema_s), int(ema_l), int(roc_n),
+                                         int(rsi_n), int(bb_n), float(bb_std), int(fast), int(slow), int(signal))
+    return out
+
+def _midprice(high: np.ndarray, low: np.ndarray, length: int) -> np.ndarray:
+    """(N 周期最高价 + N 周期最低价) / 2；前 length-1 个及窗口内含 NaN 的位置为 NaN。"""
+    out = np.full(len(high), np.nan)
+    if length <= 0 or len(high) < length:
+        return out
+    windows_high = np.lib.stride_tricks.sliding_window_view(high, length)
+    windows_low = np.lib.stride_tricks.sliding_window_view(low, length)
+    out[length - 1:] = (windows_high.max(axis=1) + windows_low.min(axis=1)) / 2
+    return out
+
+def _ind_ichimoku(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                  tenkan: int, kijun: int, senkou: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    返回 (转换线, 基准线, 先行带A, 先行带B, 迟行线)，与 pandas_ta.ichimoku 的定义一致：
+    先行带 A/B 向前平移 kijun 根 (开头补 NaN)，迟行线为 close 向后平移 kijun 根 (末尾补 NaN)。
+    """
+    n = len(close)
+    tenkan_sen = _midprice(high, low, tenkan)
+    kijun_sen = _midprice(high, low, kijun)
+    senkou_a = np.full(n, np.nan)
+    senkou_b = np.full(n, np.nan)
+    chikou = np.full(n, np.nan)
+    if 0 <= kijun < n:
+        senkou_a[kijun:] = (0.5 * (tenkan_sen + kijun_sen))[:n - kijun]
+        senkou_b[kijun:] = _midprice(high, low, senkou)[:n - kijun]
+        chikou[:n - kijun] = close[kijun:]
+    return tenkan_sen, kijun_sen, senkou_a, senkou_b, chikou
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    基于累加和的滑动均值，只遍历数组一次。
+    与 pandas rolling(window).mean() 一致：前 window-1 个及窗口内含 NaN 的位置为 NaN。
+    """
+    n = len(values)
+    out = np.full(n, np.nan)
+    if window <= 0 or n < window:
+        return out
+    nan_mask = np.isnan(values)
+    cs = np.concatenate(([0.0], np.cumsum(np.where(nan_mask, 0.0, values))))
+    nan_cs = np.concatenate(([0], np.cumsum(nan_mask)))
+    out[window - 1:] = (cs[window:] - cs[:-window]) / window
+    out[window - 1:][(nan_cs[window:] - nan_cs[:-window]) > 0] = np.nan
+    return out
+
 # --- 指标计算 ---
 def _calculate_indicators(df: pd.DataFrame, config: dict) -> pd.DataFrame:
     """
     计算所有需要的技术指标。
+    不修改传入的 df：指标与降精度后的列写入新的 DataFrame 返回，调用方无需事先复制。
     """
-    params = config.get('PARAMS', {}) # 获取参数子字典
+    spec = _indicator_spec(config) # 参数与列名 (按配置缓存)
     try:
-        # 确保列名正确 (小写)
-        df.columns = df.columns.str.lower()
+        # 确保列名正确 (小写)；只有需要改名时才生成新对象，不改动调用方的列名
+        lower_columns = df.columns.str.lower()
+        if not lower_columns.equals(df.columns):
+            df = df.set_axis(lower_columns, axis=1)
         required_cols = ['open', 'high', 'low', 'close', 'volume']
-        if not all(col in df.columns for col in required_cols):
-            missing_cols = [col for col in required_cols if col not in df.columns]
-            logging.error(f"Missing required columns for indicator calculation: {missing_cols}")
+        missing_cols = _missing_columns(df.columns, required_cols)
+        if missing_cols:
+            logger.error("Missing required columns for indicator calculation: %s", missing_cols)
             return df # 返回原始df或引发错误
 
-        logging.debug(f"Calculating indicators for DataFrame with shape: {df.shape}. Initial columns: {df.columns.tolist()}")
-
-        # 1. EMA (趋势)
-        ema_short = params.get('ema_short_period', 10)
-        ema_long = params.get('ema_long_period', 30)
-        df.ta.ema(length=ema_short, append=True, col_names=(f'EMA_{ema_short}',))
-        df.ta.ema(length=ema_long, append=True, col_names=(f'EMA_{ema_long}',))
-        logging.debug(f"EMA_{ema_short} and EMA_{ema_long} calculated.")
-
-        # 2. ROC (动量)
-        roc_period = params.get('roc_period', 9)
-        df.ta.roc(length=roc_period, append=True, col_names=(f'ROC_{roc_period}',))
-        logging.debug(f"ROC_{roc_period} calculated.")
-
-        # 3. RSI (超买超卖)
-        rsi_period = params.get('rsi_period', 14)
-        df.ta.rsi(length=rsi_period, append=True, col_names=(f'RSI_{rsi_period}',))
-        logging.debug(f"RSI_{rsi_period} calculated.")
-
-        # 4. Bollinger Bands (波动性/通道)
-        bb_period = params.get('bb_period', 20)
-        bb_std = params.get('bb_std_dev', 2)
-        # Note: ta.bbands appends multiple columns like BBL_20_2.0, BBM_20_2.0 etc.
-        df.ta.bbands(length=bb_period, std=bb_std, append=True)
-        logging.debug(f"Bollinger Bands (period={bb_period}, std={bb_std}) calculated.")
-
-        # 5. MACD (动量/趋势)
-        macd_fast = params.get('macd_fast_period', 12)
-        macd_slow = params.get('macd_slow_period', 26)
-        macd_signal = params.get('macd_signal_period', 9)
-        # Note: ta.macd appends MACD_12_26_9, MACDh_12_26_9, MACDs_12_26_9
-        df.ta.macd(fast=macd_fast, slow=macd_slow, signal=macd_signal, append=True)
-        logging.debug(f"MACD (fast={macd_fast}, slow={macd_slow}, signal={macd_signal}) calculated.")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Calculating indicators for DataFrame with shape: %s. Initial columns: %s", df.shape, df.columns.tolist())
+
+        # OHLCV 转为连续 float64 数组，直接喂给 TA-Lib (无需 pandas_ta 的列名重命名)
+        high = df['high'].to_numpy(dtype=np.float64)
+        low = df['low'].to_numpy(dtype=np.float64)
+        close = df['close'].to_numpy(dtype=np.float64)
+        volume = df['volume'].to_numpy(dtype=np.float64)
+        # 计算在 float64 上完成；DataFrame 中的 OHLCV、其余 float64 列 (成交额、主动买入量等) 与指标列
+        # 均以 float32 存储 (阈值比较不需要双精度)，一次 astype 完成
+        downcast = dict.fromkeys(df.select_dtypes(include=np.float64).columns, np.float32)
+        downcast.update(dict.fromkeys(required_cols, np.float32))
+        df = df.astype(downcast)
+
+        close_cols = spec.close_cols
+
+        # 各指标结果先收集为独立数组，最后一次性拼接到 df (避免逐列插入反复触发 BlockManager 重组)
+        results: Dict[str, np.ndarray] = {}
+
+        if NUMBA_AVAILABLE:
+            # 1-5. EMA / ROC / RSI / BBands / MACD: 一次遍历 close 融合计算
+            fused = _ind_close_fused(close, spec.ema_short, spec.ema_long, spec.roc, spec.rsi, spec.bb_period, spec.bb_std,
+                                     spec.macd_fast, spec.macd_slow, spec.macd_signal)
+            results.update(zip(close_cols, fused))
+            logger.debug("EMA/ROC/RSI/BBands/MACD calculated in fused pass.")
+        else:
+            # 1. EMA (趋势)
+            results[close_cols[0]] = _ind_ema(close, spec.ema_short)
+            results[close_cols[1]] = _ind_ema(close, spec.ema_long)
+            logger.debug("EMA_%s and EMA_%s calculated.", spec.ema_short, spec.ema_long)
+
+            # 2. ROC (动量)
+            results[close_cols[2]] = _ind_roc(close, spec.roc)
+            logger.debug("ROC_%s calculated.", spec.roc)
+
+            # 3. RSI (超买超卖)
+            results[close_cols[3]] = _ind_rsi(close, spec.rsi)
+            logger.debug("RSI_%s calculated.", spec.rsi)
+
+            # 4. Bollinger Bands (波动性/通道)
+            results.update(zip(close_cols[4:7], _ind_bbands(close, spec.bb_period, spec.bb_std)))
+            logger.debug("Bollinger Bands (period=%s, std=%s) calculated.", spec.bb_period, spec.bb_std)
+
+            # 5. MACD (动量/趋势)
+            results.update(zip(close_cols[7:10], _ind_macd(close, spec.macd_fast, spec.macd_slow, spec.macd_signal)))
+            logger.debug("MACD (fast=%s, slow=%s, signal=%s) calculated.", spec.macd_fast, spec.macd_slow, spec.macd_signal)
 
         # 6. Volume MA (成交量)
-        vol_ma_period = params.get('volume_ma_period', 20)
-        df[f'Vol_MA_{vol_ma_period}'] = df['volume'].rolling(window=vol_ma_period).mean()
-        logging.debug(f"Volume MA_{vol_ma_period} calculated.")
+        results[spec.vol_ma_col] = _rolling_mean(volume, spec.vol_ma)
+        logger.debug("Volume MA_%s calculated.", spec.vol_ma)
 
         # --- 新增指标 ---
+        n = len(close)
 
         # 7. KDJ (随机指标)
-        kdj_len = params.get('kdj_length', 9)
-        kdj_sig = params.get('kdj_signal', 3)
-        kdj_k = params.get('kdj_k_period', 3) # This k parameter is for internal smoothing, might not appear in column name
-        # !!! FIX: Adjust original column names based on DEBUG logs !!!
-        kdj_cols_orig = [f'K_{kdj_len}_{kdj_sig}', f'D_{kdj_len}_{kdj_sig}', f'J_{kdj_len}_{kdj_sig}'] 
-        kdj_cols_new = ['KDJ_K', 'KDJ_D', 'KDJ_J']
+        kdj_cols_new = spec.kdj_cols
         try:
-            df.ta.kdj(length=kdj_len, signal=kdj_sig, k=kdj_k, append=True)
-            logging.debug(f"Columns after KDJ calculation (before rename): {df.columns.tolist()}") 
-            # 重命名 KDJ 列 (using corrected original names)
-            rename_dict = dict(zip(kdj_cols_orig, kdj_cols_new))
-            df.rename(columns=rename_dict, inplace=True, errors='ignore')
-            logging.debug(f"KDJ (length={kdj_len}, signal={kdj_sig}, k={kdj_k}) calculated. Attempted rename using {rename_dict}.")
-            # Verify rename success, add NA if still missing
-            for i, col_new in enumerate(kdj_cols_new):
-                 if col_new not in df.columns:
-                      logging.warning(f"Column '{col_new}' is missing after attempted KDJ rename from '{kdj_cols_orig[i]}'. Adding as NA.")
-                      df[col_new] = pd.NA
+            results.update(zip(kdj_cols_new, _ind_kdj(high, low, close, spec.kdj_length, spec.kdj_signal)))
+            logger.debug("KDJ (length=%s, signal=%s) calculated.", spec.kdj_length, spec.kdj_signal)
         except Exception as e:
-            logging.warning(f"KDJ calculation/rename failed: {e}. Adding NA columns {kdj_cols_new}.")
-            for col in kdj_cols_new:
-                if col not in df.columns: df[col] = pd.NA
+            logger.warning("KDJ calculation failed: %s. Adding NaN columns %s.", e, kdj_cols_new)
+            results.update((col, np.full(n, np.nan)) for col in kdj_cols_new)
 
         # 8. Ichimoku Cloud (一目均衡表)
-        ichi_tenkan = params.get('ichimoku_tenkan', 9)
-        ichi_kijun = params.get('ichimoku_kijun', 26)
-        ichi_senkou_b_period = params.get('ichimoku_senkou_b', 52) # Config name for the period used in calculation
-        ichi_cols_new = ['Ichi_Tenkan', 'Ichi_Kijun', 'Ichi_SenkouA', 'Ichi_SenkouB', 'Ichi_Chikou']
+        ichi_cols_new = spec.ichi_cols
         try:
-            ichi_df, _ = df.ta.ichimoku(tenkan=ichi_tenkan, kijun=ichi_kijun, senkou=ichi_senkou_b_period, include_chikou=True, append=False)
-            if ichi_df is not None:
-                logging.debug(f"Ichimoku DataFrame columns returned by ta.ichimoku: {ichi_df.columns.tolist()}")
-            else:
-                logging.warning("ta.ichimoku returned None for ichi_df")
-                raise ValueError("Ichimoku calculation returned None.")
-                
-            if not ichi_df.empty:
-                 # Build the rename map dynamically based on DEBUG logs
-                 rename_map = {}
-                 # Tenkan
-                 tenkan_col_orig = f'ITS_{ichi_tenkan}'
-                 if tenkan_col_orig in ichi_df.columns: rename_map[tenkan_col_orig] = 'Ichi_Tenkan'
-                 # Kijun
-                 kijun_col_orig = f'IKS_{ichi_kijun}'
-                 if kijun_col_orig in ichi_df.columns: rename_map[kijun_col_orig] = 'Ichi_Kijun'
-                 # !!! FIX: Senkou A name based on DEBUG logs !!!
-                 senkou_a_col_orig = f'ISA_{ichi_tenkan}' # Was ISA_9 in logs
-                 if senkou_a_col_orig in ichi_df.columns: rename_map[senkou_a_col_orig] = 'Ichi_SenkouA'
-                 # !!! FIX: Senkou B name based on DEBUG logs !!!
-                 senkou_b_col_orig = f'ISB_{ichi_kijun}' # Was ISB_26 in logs (uses kijun period)
-                 if senkou_b_col_orig in ichi_df.columns: rename_map[senkou_b_col_orig] = 'Ichi_SenkouB'
-                 # Chikou
-                 chikou_col_orig = f'ICS_{ichi_kijun}'
-                 if chikou_col_orig in ichi_df.columns: rename_map[chikou_col_orig] = 'Ichi_Chikou'
-                 
-                 logging.debug(f"Ichimoku rename map constructed: {rename_map}")
-                 
-                 if not rename_map:
-                      logging.warning("Ichimoku rename map is empty. Cannot merge Ichimoku columns.")
-                 else:
-                      cols_to_select = list(rename_map.keys())
-                      # Check if all expected new columns are in the map keys
-                      missing_in_map = [ichi_cols_new[i] for i, orig_col in enumerate([tenkan_col_orig, kijun_col_orig, senkou_a_col_orig, senkou_b_col_orig, chikou_col_orig]) if orig_col not in rename_map]
-                      if missing_in_map:
-                          logging.warning(f"Could not find original columns in ichi_df for: {missing_in_map}. Corresponding columns will be missing.")
-                      
-                      ichi_selected = ichi_df[cols_to_select].rename(columns=rename_map)
-                      df = pd.concat([df, ichi_selected], axis=1)
-                      logging.debug(f"Ichimoku columns merged and renamed: {ichi_selected.columns.tolist()}")
-                      # Add NA for any columns that failed to map/merge
-                      for col_new in ichi_cols_new:
-                          if col_new not in df.columns:
-                              logging.warning(f"Column '{col_new}' is missing after Ichimoku merge. Adding as NA.")
-                              df[col_new] = pd.NA
-            else:
-                 raise ValueError("Ichimoku calculation returned empty DataFrame.")
+            results.update(zip(ichi_cols_new, _ind_ichimoku(high, low, close, spec.ichi_tenkan, spec.ichi_kijun, spec.ichi_senkou_b)))
+            logger.debug("Ichimoku (tenkan=%s, kijun=%s, senkou=%s) calculated.", spec.ichi_tenkan, spec.ichi_kijun, spec.ichi_senkou_b)
         except Exception as e:
-            logging.warning(f"Ichimoku calculation/merge failed: {e}. Adding NA columns {ichi_cols_new}.")
-            for col in ichi_cols_new:
-                if col not in df.columns: df[col] = pd.NA
-
-        # 9. ADX (Already confirmed working from logs, keeping rename)
-        adx_len = params.get('adx_length', 14)
-        adx_cols_orig = [f'ADX_{adx_len}', f'DMP_{adx_len}', f'DMN_{adx_len}']
-        adx_cols_new = ['ADX', 'ADX_DIp', 'ADX_DIn']
+            logger.warning("Ichimoku calculation failed: %s. Adding NaN columns %s.", e, ichi_cols_new)
+            results.update((col, np.full(n, np.nan)) for col in ichi_cols_new)
+
+        # 9. ADX
+        adx_cols_new = spec.adx_cols
         try:
-            df.ta.adx(length=adx_len, append=True)
-            logging.debug(f"Columns after ADX calculation (before rename): {df.columns.tolist()}")
-            rename_dict = dict(zip(adx_cols_orig, adx_cols_new))
-            df.rename(columns=rename_dict, inplace=True, errors='ignore')
-            logging.debug(f"ADX (length={adx_len}) calculated. Attempted rename using {rename_dict}.")
-            # Verify rename success, add NA if still missing
-            for i, col_new in enumerate(adx_cols_new):
-                 if col_new not in df.columns:
-                      logging.warning(f"Column '{col_new}' is missing after attempted ADX rename from '{adx_cols_orig[i]}'. Adding as NA.")
-                      df[col_new] = pd.NA
+            results.update(zip(adx_cols_new, _ind_adx(high, low, close, spec.adx_length)))
+            logger.debug("ADX (length=%s) calculated.", spec.adx_length)
         except Exception as e:
-            logging.warning(f"ADX calculation/rename failed: {e}. Adding NA columns {adx_cols_new}.")
-            for col in adx_cols_new:
-                if col not in df.columns: df[col] = pd.NA
+            logger.warning("ADX calculation failed: %s. Adding NaN columns %s.", e, adx_cols_new)
+            results.update((col, np.full(n, np.nan)) for col in adx_cols_new)
 
         # --- End of New Indicators ---
 
-        logging.info(f"All indicators calculation attempt finished. DataFrame final shape: {df.shape}")
-        logging.debug(f"Final columns before returning from _calculate_indicators: {df.columns.tolist()}")
+        # 一次性拼接所有指标列 (float32 存储)；重复计算时先去掉旧的同名列
+        indicators_df = pd.DataFrame(
+            {col: np.asarray(arr, dtype=np.float32) for col, arr in results.items()}, index=df.index)
+        df = pd.concat([df.drop(columns=[col for col in results if col in df.columns]), indicators_df], axis=1)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("All indicators calculation attempt finished. DataFrame final shape: %s", df.shape)
+            logger.debug("Final columns before returning from _calculate_indicators: %s", df.columns.tolist())
 
     except Exception as e:
-        logging.error(f"Critical error during indicator calculation: {e}", exc_info=True)
+        logger.error("Critical error during indicator calculation: %s", e, exc_info=True)
         # Depending on policy, return df as is, or return None, or raise error
         # Returning df might lead to errors downstream if columns are missing
         # Adding expected columns as NA might be safer if downstream needs them
-        expected_cols = [f'EMA_{ema_short}', f'EMA_{ema_long}', f'ROC_{roc_period}', f'RSI_{rsi_period}',
-                         f'BBL_{bb_period}_{bb_std}.0', f'BBM_{bb_period}_{bb_std}.0', f'BBU_{bb_period}_{bb_std}.0', # Adjust BB names if needed
-                         f'MACD_{macd_fast}_{macd_slow}_{macd_signal}', f'MACDh_{macd_fast}_{macd_slow}_{macd_signal}', f'MACDs_{macd_fast}_{macd_slow}_{macd_signal}',
-                         f'Vol_MA_{vol_ma_period}'] + kdj_cols_new + ichi_cols_new + adx_cols_new
-        for col in expected_cols:
-             if col not in df.columns: df[col] = pd.NA
-        logging.warning("Returning DataFrame potentially with NAs due to calculation error.")
+        expected_cols = spec.close_cols + (spec.vol_ma_col,) + spec.kdj_cols + spec.ichi_cols + spec.adx_cols
+        missing = _missing_columns(df.columns, expected_cols)
+        if missing: # 一次性补齐缺失列 (float32 NaN，与正常路径的指标列类型一致)
+            df = pd.concat([df, pd.DataFrame(np.nan, index=df.index, columns=missing, dtype=np.float32)], axis=1)
+        logger.warning("Returning DataFrame potentially with NAs due to calculation error.")
 
     return df
 
+# --- 指标结果缓存 ---
+# 指标只由 (参数, K 线数据) 决定；多周期分析反复请求同一段 K 线时直接复用上次的计算结果。
+# K 线按固定条数滑动获取，窗口起点变化会改变 EMA 等指标的种子值，因此只做完全命中的缓存，不做增量续算。
+# 这里只缓存指标 (可只保留解读所需的末尾几行以节省内存)；K 线请求的重复调用由 数据获取模块 的短时进程内缓存合并。
+_INDICATOR_CACHE_SIZE = 64
+_indicator_cache: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+_indicator_cache_lock = threading.Lock()
+
+def _indicator_cache_key(symbol: str, market_type: str, interval: str, df: pd.DataFrame, config: dict) -> Optional[tuple]:
+    """
+    生成指标缓存键: (交易对, 市场, 周期, 行数, 首/末 K 线时间, 末根 K 线 OHLCV, 参数)。
+    末根 K 线可能是尚未收盘的实时 K 线 (时间戳不变但价格在变)，因此其 OHLCV 也计入键中。
+    无法生成键时返回 None (不使用缓存)。
+    """
+    try:
+        timestamps = df['timestamp'] if 'timestamp' in df.columns else df.index
+        last_bar = tuple(df[['open', 'high', 'low', 'close', 'volume']].iloc[-1].tolist())
+        params_key = tuple(sorted(config.get('PARAMS', {}).items()))
+        key = (symbol, market_type, interval, len(df), timestamps[0], timestamps[len(df) - 1], last_bar, params_key)
+        hash(key)
+        return key
+    except (KeyError, IndexError, TypeError):
+        return None
+
+def _calculate_indicators_cached(df: pd.DataFrame, config: dict, cache_key: Optional[tuple],
+                                 tail_rows: Optional[int] = None) -> pd.DataFrame:
+    """
+    带 LRU 缓存的 _calculate_indicators。命中时返回缓存中的 DataFrame，调用方不应修改它。
+    tail_rows 不为 None 时只返回 (并缓存) 最后 tail_rows 行，调用方只需要最新几根 K 线时使用。
+    """
+    if cache_key is None:
+        result = _calculate_indicators(df, config)
+        return result if tail_rows is None else result.iloc[-tail_rows:]
+    cache_key = cache_key + (tail_rows,)
+    with _indicator_cache_lock:
+        cached = _indicator_cache.get(cache_key)
+        if cached is not None:
+            _indicator_cache.move_to_end(cache_key)
+    if cached is not None:
+        logger.debug("指标缓存命中: %s %s %s", cache_key[0], cache_key[1], cache_key[2])
+        return cached
+
+    result = _calculate_indicators(df, config)
+    if tail_rows is not None:
+        result = result.iloc[-tail_rows:].copy() # 复制以释放完整的指标 DataFrame
+    with _indicator_cache_lock:
+        _indicator_cache[cache_key] = result
+        while len(_indicator_cache) > _INDICATOR_CACHE_SIZE:
+            _indicator_cache.popitem(last=False)
+    return result
+
 # --- 单周期分析函数 ---
 # 重命名：分析微观趋势 -> 分析单周期趋势
-def 分析单周期趋势(df_with_indicators: pd.DataFrame, config: dict, interval: str = "") -> Dict[str, Union[str, float, Dict[str, str], None]]:
+def 分析单周期趋势(df_with_indicators: pd.DataFrame, config: dict, interval: str = "",
+                  include_details: bool = False) -> Dict[str, Union[str, float, Dict[str, str], None]]:
     """
     分析单个时间周期的、已包含指标的DataFrame，提取最新信号信息。
 
@@ -557,110 +1207,72 @@ def 分析单周期趋势(df_with_indicators: pd.DataFrame, config: dict, interv
         df_with_indicators (pd.DataFrame): 已计算指标的 K 线数据。
         config (dict): 包含计算和解读所需参数的配置字典。
         interval (str, optional): 当前分析的时间周期 (用于日志或错误信息). Defaults to "".
+        include_details (bool, optional): 是否生成各项指标的解读字符串. Defaults to False.
 
     Returns:
-        Dict: 包含 'interval', 'combined_signal', 'score', 'details' 的字典，
+        Dict: 包含 'interval', 'combined_signal', 'score', 'details' 的字典 ('details' 仅在 include_details 时填充)，
               或者在错误时包含 'error' 键。
     """
     interval_prefix = f"[{interval}] " if interval else ""
-    result_base = {"interval": interval, "combined_signal": None, "score": None, "details": None} 
     
     if df_with_indicators is None or df_with_indicators.empty:
         logger.warning(f"{interval_prefix}输入数据为空，无法分析。")
-        result_base["error"] = "输入数据为空"
-        return result_base
+        return IntervalResult(interval, error="输入数据为空").to_dict()
 
     if len(df_with_indicators) < 2:
         logger.warning(f"{interval_prefix}数据不足 (<2 行)，无法计算交叉信号。")
         # Decide how to handle this - maybe still try to interpret?
         # For now, let's return an error state for consistency in MTF analysis
-        result_base["error"] = "数据行数不足 (<2)"
         # If you want to proceed with single-row analysis, adjust here
         # last_row = df_with_indicators.iloc[-1]
         # prev_row = None 
-        return result_base 
-    else:
-        last_row = df_with_indicators.iloc[-1]
-        prev_row = df_with_indicators.iloc[-2]
+        return IntervalResult(interval, error="数据行数不足 (<2)").to_dict()
 
     try:
-        # --- 动态确定列名 --- 
-        params = config.get('PARAMS', {})
-        ema_short_period = params.get('ema_short_period', 10)
-        ema_long_period = params.get('ema_long_period', 30)
-        roc_period = params.get('roc_period', 9)
-        rsi_period = params.get('rsi_period', 14)
-        bb_period = params.get('bb_period', 20)
-        bb_std_dev = params.get('bb_std_dev', 2.0)
-        macd_fast = params.get('macd_fast_period', 12)
-        macd_slow = params.get('macd_slow_period', 26)
-        macd_signal = params.get('macd_signal_period', 9)
-        volume_ma_period = params.get('volume_ma_period', 20)
-
-        ema_short_col = f'EMA_{ema_short_period}'
-        ema_long_col = f'EMA_{ema_long_period}'
-        roc_col = f'ROC_{roc_period}'
-        rsi_col = f'RSI_{rsi_period}'
-        # pandas_ta bbands 列名可能包含小数点 (e.g., BBU_20_2.0)
-        bb_std_str = f"{bb_std_dev:.1f}" # Format std dev for column name
-        bb_upper_col = f'BBU_{bb_period}_{bb_std_str}'
-        bb_lower_col = f'BBL_{bb_period}_{bb_std_str}'
-        bb_mid_col = f'BBM_{bb_period}_{bb_std_str}' # 中轨列名
-        # MACD Histogram 列名约定为 'MACDh_...' (注意小写 h)
-        macd_hist_col = f'MACDh_{macd_fast}_{macd_slow}_{macd_signal}'
-        volume_col = 'volume' # Assuming original volume column exists
-        volume_ma_col = f'Vol_MA_{volume_ma_period}'
-
-        # 新指标 (使用 _calculate_indicators 中重命名后的列名)
-        kdj_k_col = 'KDJ_K'
-        kdj_d_col = 'KDJ_D'
-        kdj_j_col = 'KDJ_J'
-        ichi_tenkan_col = 'Ichi_Tenkan'
-        ichi_kijun_col = 'Ichi_Kijun'
-        ichi_senkou_a_col = 'Ichi_SenkouA'
-        ichi_senkou_b_col = 'Ichi_SenkouB'
-        ichi_chikou_col = 'Ichi_Chikou'
-        adx_col = 'ADX'
-        adx_dip_col = 'ADX_DIp' # DI+
-        adx_din_col = 'ADX_DIn' # DI-
-        
+        # --- 动态确定列名及其位置 (close 在首位) --- 
+        columns = _compile_config(config).columns
+        positions = df_with_indicators.columns.get_indexer(columns)
+
         # --- 检查列 --- 
-        required_cols_for_interpret = [
-            ema_short_col, ema_long_col, roc_col, rsi_col, 
-            bb_upper_col, bb_lower_col, bb_mid_col, 
-            macd_hist_col, volume_col, volume_ma_col,
-            kdj_k_col, kdj_d_col, kdj_j_col,
-            ichi_tenkan_col, ichi_kijun_col, ichi_senkou_a_col, ichi_senkou_b_col, ichi_chikou_col,
-            adx_col, adx_dip_col, adx_din_col
-        ]
-        missing_cols = [col for col in required_cols_for_interpret if col not in df_with_indicators.columns]
+        missing_cols = [col for col, pos in zip(columns[1:], positions[1:]) if pos < 0]
         if missing_cols:
             logger.error(f"{interval_prefix}无法解读指标，缺少列: {missing_cols}")
-            result_base["error"] = f"缺少指标列: {', '.join(missing_cols)}"
-            return result_base
-
-        # --- 调用解读函数 --- 
-        interpretation_result = _interpret_indicators(
-            last_row, prev_row, config,
-            ema_short_col, ema_long_col, roc_col, rsi_col,
-            bb_upper_col, bb_lower_col, bb_mid_col,
-            macd_hist_col, volume_col, volume_ma_col,
-            kdj_k_col, kdj_d_col, kdj_j_col,
-            ichi_tenkan_col, ichi_kijun_col, ichi_senkou_a_col, ichi_senkou_b_col, ichi_chikou_col,
-            adx_col, adx_dip_col, adx_din_col
-        )
+            return IntervalResult(interval, error=f"缺少指标列: {', '.join(missing_cols)}").to_dict()
+
+        # --- 调用解读函数: 按列位置一次性取出最后两行 (缺少 close 时传整行，由解读函数返回错误结果) --- 
+        tail = df_with_indicators.iloc[-2:, positions] if positions[0] >= 0 else df_with_indicators.iloc[-2:]
+        interpretation_result = _interpret_indicators(tail, config, include_details=include_details)
         
         # --- 组合最终结果字典 --- 
-        result_base.update(interpretation_result) # Merge results from _interpret_indicators
-        return result_base
+        return IntervalResult(interval, **interpretation_result).to_dict() # Merge results from _interpret_indicators
 
     except Exception as e:
         logger.error(f"{interval_prefix}Error in 分析单周期趋势: {e}", exc_info=True)
-        result_base["error"] = "分析过程中断"
-        return result_base
+        return IntervalResult(interval, error="分析过程中断").to_dict()
 
 # --- 多周期分析协调函数 (新增) ---
-def 执行多周期分析(symbol: str, market_type: str, intervals: List[str], config: dict, kline_limit_base: int = 100) -> Dict[str, Dict[str, Union[str, float, Dict[str, str], None]]]:
+def _required_kline_limit(config: dict, kline_limit_base: int) -> int:
+    """计算指标所需的最少 K 线数量，同一个配置对象只计算一次。"""
+    return _required_kline_limit_cached(_ConfigKey(config), kline_limit_base)
+
+
+@lru_cache(maxsize=32)
+def _required_kline_limit_cached(key: _ConfigKey, kline_limit_base: int) -> int:
+    # (这个逻辑可以更精确，但简单起见，我们先用一个基数，或取配置中的最大值)
+    spec = _indicator_spec(key.config)
+    max_period = max(
+        spec.ema_long,
+        spec.bb_period,
+        spec.macd_slow + spec.macd_signal,
+        spec.vol_ma,
+        spec.kdj_length + spec.kdj_signal,
+        spec.ichi_senkou_b + spec.ichi_kijun, # Ichimoku 需要考虑位移
+        spec.adx_length * 2 # ADX 计算比较复杂，给些余量
+    )
+    return max(kline_limit_base, max_period + 5) # 加一点 buffer
+
+def 执行多周期分析(symbol: str, market_type: str, intervals: List[str], config: dict, kline_limit_base: int = 100,
+                 include_details: bool = False) -> Dict[str, Dict[str, Union[str, float, Dict[str, str], None]]]:
     """
     执行多周期微观趋势分析。
 
@@ -670,6 +1282,7 @@ def 执行多周期分析(symbol: str, market_type: str, intervals: List[str], c
         intervals (list): 需要分析的时间周期列表 (e.g., ['1m', '5m', '15m', '1h'])。
         config (dict): 指标计算和解读的配置。
         kline_limit_base (int): 获取K线的基础数量，会根据指标周期适当调整。
+        include_details (bool): 是否为每个周期生成各项指标的解读字符串。
 
     Returns:
         Dict: 键是时间周期, 值是包含该周期分析结果的字典 (来自 分析单周期趋势)。
@@ -679,24 +1292,13 @@ def 执行多周期分析(symbol: str, market_type: str, intervals: List[str], c
         logger.error("数据获取模块未加载，无法执行多周期分析。")
         return {"error": "数据获取模块不可用"}
 
-    # 确定计算指标所需的最少 K 线数量 (基于配置中的最长周期)
-    # (这个逻辑可以更精确，但简单起见，我们先用一个基数，或取配置中的最大值)
-    max_period = max(
-        config.get('ema_long_period', 30),
-        config.get('bb_period', 20),
-        config.get('macd_slow_period', 26) + config.get('macd_signal_period', 9),
-        config.get('volume_ma_period', 20),
-        config.get('kdj_length', 9) + config.get('kdj_signal', 3),
-        config.get('ichimoku_senkou_b', 52) + config.get('ichimoku_kijun', 26), # Ichimoku 需要考虑位移
-        config.get('adx_length', 14) * 2 # ADX 计算比较复杂，给些余量
-    )
-    required_limit = max(kline_limit_base, max_period + 5) # 加一点 buffer
+    # 确定计算指标所需的最少 K 线数量 (基于配置中的最长周期，按配置缓存)
+    required_limit = _required_kline_limit(config, kline_limit_base)
     logger.info(f"多周期分析将为每个周期请求 {required_limit} 条 K 线数据。")
 
-    for interval in intervals:
+    def _analyze_one(interval: str) -> Tuple[str, Dict[str, Union[str, float, Dict[str, str], None]]]:
+        """获取单个周期的 K 线、计算指标并解读；异常在此处理，不影响其他周期。"""
         logger.info(f"--- 开始分析周期: {interval} ---")
-        # Store analysis result dictionary directly
-        results[interval] = {"interval": interval, "combined_signal": "分析中...", "score": None, "details": None}
         try:
             # 1. 获取 K 线数据
             logger.debug(f"[{interval}] 获取 {symbol} {market_type} {interval} K线数据, limit={required_limit}...")
@@ -709,24 +1311,22 @@ def 执行多周期分析(symbol: str, market_type: str, intervals: List[str], c
 
             if kline_data is None or kline_data.empty or len(kline_data) < 2: # 需要至少2条才能分析
                 logger.warning(f"[{interval}] 未能获取到足够的 K 线数据 (获取到 {len(kline_data) if kline_data is not None else 0} 条)。")
-                results[interval] = {"interval": interval, "error": "K线数据不足"}
-                continue # 继续下一个周期
+                return interval, IntervalResult(interval, error="K线数据不足").to_dict()
             
             logger.debug(f"[{interval}] 成功获取 {len(kline_data)} 条K线数据.")
             
-            # 2. 计算指标
-            data_with_indicators = _calculate_indicators(kline_data.copy(), config)
+            # 2. 计算指标 (分析单周期趋势 只读取最后两行，缓存中也只保留这两行)
+            cache_key = _indicator_cache_key(symbol, market_type, interval, kline_data, config)
+            data_with_indicators = _calculate_indicators_cached(kline_data, config, cache_key, tail_rows=2)
 
             if data_with_indicators is None or data_with_indicators.empty:
                 logger.error(f"[{interval}] 指标计算失败或返回空的 DataFrame.")
-                results[interval] = {"interval": interval, "error": "指标计算失败"}
-                continue
+                return interval, IntervalResult(interval, error="指标计算失败").to_dict()
                 
             logger.debug(f"[{interval}] 指标计算完成.")
                 
             # 3. 分析单周期趋势 (调用返回字典的函数) --- 
-            single_interval_result = 分析单周期趋势(data_with_indicators, config, interval=interval)
-            results[interval] = single_interval_result # Store the entire result dictionary
+            single_interval_result = 分析单周期趋势(data_with_indicators, config, interval=interval, include_details=include_details)
             # Log the combined signal and score for info
             log_signal = single_interval_result.get('combined_signal', 'N/A')
             log_score = single_interval_result.get('score')
@@ -735,15 +1335,88 @@ def 执行多周期分析(symbol: str, market_type: str, intervals: List[str], c
                  logger.info(f"[{interval}] 分析完成 (有错误): {log_error}")
             else:
                  logger.info(f"[{interval}] 分析完成: 组合:{log_signal} (评分:{log_score})")
+            return interval, single_interval_result # Store the entire result dictionary
 
         except Exception as e:
             logger.error(f"[{interval}] 处理周期时发生意外错误: {e}", exc_info=True)
-            results[interval] = {"interval": interval, "error": "周期处理异常"}
+            return interval, IntervalResult(interval, error="周期处理异常").to_dict()
+
+    # 各周期相互独立，耗时主要在 K 线请求的网络等待上，用线程池并发执行 (总耗时约等于最慢的一个周期)。
+    # 所有请求都经由 数据获取模块 中唯一的 Client，其内部的 keep-alive requests.Session 在各周期/线程间共用
+    # (数据获取模块 已将其连接池调大到每个主机 HTTP_POOL_MAXSIZE=32 个连接，足够覆盖常用周期数及分页并发)，因此无需为每次分析另建会话。
+    # 数据获取模块 只提供同步接口 (重试装饰器建立在同步 Client 上)，这里不改写为 asyncio；
+    # 网络等待期间线程会释放 GIL，线程池已能让各周期的请求相互重叠。
+    # 结果字典先按传入顺序占位，保证输出顺序与 intervals 一致。
+    unique_intervals = list(dict.fromkeys(intervals))
+    for interval in unique_intervals:
+        results[interval] = IntervalResult(interval, combined_signal="分析中...").to_dict()
+    if unique_intervals:
+        with ThreadPoolExecutor(max_workers=len(unique_intervals)) as executor:
+            futures = [executor.submit(_analyze_one, interval) for interval in unique_intervals]
+            for future in as_completed(futures):
+                interval, interval_result = future.result()
+                results[interval] = interval_result
             
     logger.info("--- 多周期分析全部完成 ---")
     return results
 
+@njit(_AGGREGATE_SIG, cache=True)
+def _aggregate_scores_kernel(scores, weights, bull_thr, bear_thr):
+    """
+    一次遍历各周期评分 (scores 非空，与 weights 一一对应)。
+    返回 (加权总分, 总权重, 最高分, 最低分, 看涨周期数, 看跌周期数)。
+    """
+    total_weighted = 0.0
+    total_weight = 0.0
+    max_s = float(scores[0])
+    min_s = float(scores[0])
+    n_bull = 0
+    n_bear = 0
+    for i in range(scores.shape[0]):
+        s = float(scores[i])
+        w = float(weights[i])
+        total_weighted += s * w
+        total_weight += w
+        if s > max_s: max_s = s
+        if s < min_s: min_s = s
+        if s >= bull_thr: n_bull += 1
+        elif s <= bear_thr: n_bear += 1
+    return total_weighted, total_weight, max_s, min_s, n_bull, n_bear
+
+
+def _aggregate_scores(scores: np.ndarray, weights: np.ndarray,
+                      bull_thr: float, bear_thr: float) -> Tuple[float, float, float, float, int, int]:
+    """
+    汇总各周期评分，返回值同 _aggregate_scores_kernel。
+    有 numba 时走单次遍历的编译内核；否则用 numpy 整列运算 (避免退化为逐元素的 Python 循环)。
+    """
+    if NUMBA_AVAILABLE:
+        return _aggregate_scores_kernel(scores, weights, bull_thr, bear_thr)
+    # 多空计数用无分支的整列比较 + count_nonzero；看跌计数排除已计为看涨的周期，与内核的 if/elif 一致
+    is_bull = np.greater_equal(scores, bull_thr)
+    is_bear = np.less_equal(scores, bear_thr)
+    is_bear &= ~is_bull
+    # 结果转为内置 float / int，与编译内核的返回类型一致 (np.float64 的 round 行为不同)
+    return (float((scores * weights).sum()), float(weights.sum()), float(scores.max()), float(scores.min()),
+            int(np.count_nonzero(is_bull)), int(np.count_nonzero(is_bear)))
+
+
 # --- 多周期信号整合函数 (优化) ---
+# 整合结果类型 / 方向的中文映射 (只读)
+_TYPE_CN = {
+    'StrongConfirmation': '强力确认',
+    'WeakConfirmation': '弱确认',
+    'Conflicting': '信号冲突',
+    'Neutral': '中性',
+    'Error': '错误',
+    'Incomplete Data': '数据不足'
+}
+_DIRECTION_CN = {
+    'Bullish': '看涨',
+    'Bearish': '看跌',
+    'Neutral': '中性'
+}
+
 def 整合多周期信号(mtf_results: Dict[str, Dict[str, Union[str, float, Dict[str, str], None]]],
                    config: dict) -> Dict[str, Union[str, List[str], float, None]]: # 返回类型可能增加 score
     """
@@ -778,17 +1451,13 @@ def 整合多周期信号(mtf_results: Dict[str, Dict[str, Union[str, float, Dic
         weighted_bear_threshold = -1.5
         conflict_ratio_threshold = 0.4
         
-    # 单项评分的阈值 (从传入的 config['SCORING'] 获取)
-    scoring_thresholds = config.get('SCORING', {}).get('THRESHOLDS', {})
-    single_bull_threshold = scoring_thresholds.get('bullish', 1.0) # 默认 1.0
-    single_bear_threshold = scoring_thresholds.get('bearish', -1.0) # 默认 -1.0
-
     logger.info(f"开始整合信号. 整合周期: {intervals_to_integrate}, 权重: {interval_weights}, 冲突阈值: {conflict_diff_threshold}")
 
-    # --- 提取相关周期的有效评分和权重 --- 
-    valid_scores = {}
-    total_weighted_score = 0.0
-    total_weight = 0.0
+    # --- 提取相关周期的有效评分和权重 (Python 只负责字典查找，数值汇总交给 _aggregate_scores) --- 
+    # 评分/权重在查找的同时直接写入预分配的数组，不经过临时列表
+    valid_scores = np.empty(len(intervals_to_integrate), dtype=np.float64)
+    valid_weights = np.empty(len(intervals_to_integrate), dtype=np.float64)
+    num_valid = 0
     periods_involved = []
     
     for interval in intervals_to_integrate:
@@ -796,17 +1465,27 @@ def 整合多周期信号(mtf_results: Dict[str, Dict[str, Union[str, float, Dic
         weight = interval_weights.get(interval)
         
         if result and not result.get("error") and result.get("score") is not None and weight is not None:
-            score = result["score"]
-            valid_scores[interval] = score
-            total_weighted_score += score * weight
-            total_weight += weight
+            valid_scores[num_valid] = result["score"]
+            valid_weights[num_valid] = weight
+            num_valid += 1
             periods_involved.append(interval)
         elif weight is None:
              logger.warning(f"跳过周期 {interval}：未在配置中找到权重。")
         # else: 忽略错误或无分数的周期
 
-    # --- 检查是否有足够的有效周期数据 --- 
-    if not valid_scores or total_weight == 0:
+    # --- 检查是否有足够的有效周期数据 (没有任何有效周期时直接返回，不再读取评分阈值) --- 
+    if num_valid:
+        # 单项评分的阈值 (从传入的 config['SCORING'] 获取)
+        scoring_thresholds = config.get('SCORING', {}).get('THRESHOLDS', {})
+        single_bull_threshold = scoring_thresholds.get('bullish', 1.0) # 默认 1.0
+        single_bear_threshold = scoring_thresholds.get('bearish', -1.0) # 默认 -1.0
+
+        (total_weighted_score, total_weight, max_score, min_score,
+         num_bullish_periods, num_bearish_periods) = _aggregate_scores(
+            valid_scores[:num_valid], valid_weights[:num_valid],
+            float(single_bull_threshold), float(single_bear_threshold))
+
+    if not num_valid or total_weight == 0:
         msg = f"无法整合：缺少足够的可用于整合的周期数据或有效权重。参与周期: {periods_involved}"
         logger.warning(msg)
         return {"type": "Error", "direction": "Neutral", "score": None, "periods_involved": periods_involved, "message": msg}
@@ -823,21 +1502,10 @@ def 整合多周期信号(mtf_results: Dict[str, Dict[str, Union[str, float, Dic
         preliminary_direction = "Bearish"
         
     # --- 冲突检测 --- 
+    # (多空周期数已由 _aggregate_scores 按单项评分阈值统计)
     is_conflicting = False
     conflict_reasons = []
-    num_bullish_periods = 0
-    num_bearish_periods = 0
-    scores_list = list(valid_scores.values())
-    max_score = max(scores_list)
-    min_score = min(scores_list)
-    
-    for score in scores_list:
-        if score >= single_bull_threshold: # 使用单项评分阈值统计
-            num_bullish_periods += 1
-        elif score <= single_bear_threshold:
-            num_bearish_periods += 1
-            
-    num_total_periods = len(scores_list)
+    num_total_periods = num_valid
     
     # 1. 检查评分差异
     score_diff = max_score - min_score
@@ -904,27 +1572,14 @@ def 整合多周期信号(mtf_results: Dict[str, Dict[str, Union[str, float, Dic
     }
     
     # --- 添加中文映射 --- 
-    type_cn_map = {
-        'StrongConfirmation': '强力确认',
-        'WeakConfirmation': '弱确认',
-        'Conflicting': '信号冲突',
-        'Neutral': '中性',
-        'Error': '错误',
-        'Incomplete Data': '数据不足'
-    }
-    direction_cn_map = {
-        'Bullish': '看涨',
-        'Bearish': '看跌',
-        'Neutral': '中性'
-    }
-    
-    result_dict['type'] = type_cn_map.get(final_type, final_type) # 替换为中文，找不到则保留原文
-    result_dict['direction'] = direction_cn_map.get(final_direction, final_direction) # 替换为中文
+    result_dict['type'] = _TYPE_CN.get(final_type, final_type) # 替换为中文，找不到则保留原文
+    result_dict['direction'] = _DIRECTION_CN.get(final_direction, final_direction) # 替换为中文
     
     return result_dict
 
 # --- 主逻辑和测试 ---
 if __name__ == '__main__':
+    configure_logging(logging.DEBUG)
     test_symbol = 'BTCUSDT'
     test_market_type = 'futures'
     # !!! 更新：从配置读取要分析的时间周期列表 !!!
@@ -5,15 +5,21 @@
 '''
 
 import logging
+import sys
 import pandas as pd
 from pathlib import Path
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
 from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
 import numpy as np
 
 # 导入自定义模块
 import 配置
 import 数据获取模块
+from 加速模块 import njit, nb_types, NUMBA_AVAILABLE
 
 # --- 日志配置 ---
 log_level = getattr(logging, 配置.LOG_LEVEL.upper(), logging.INFO)
@@ -42,83 +48,211 @@ if not logger.handlers: # 防止重复添加 handler
 logger.info("成交流分析模块日志记录器初始化完成。")
 
 # --- 内部辅助函数 ---
+def _taker_split(taker_sell_codes, weights=None):
+    """
+    按 Taker 方向一次性汇总 (taker_sell_codes: 0=主动买, 1=主动卖)，返回 (主动买合计, 主动卖合计)。
+    weights 为 None 时统计笔数，否则对 weights 求和；用一次 bincount 代替两次布尔掩码求和。
+    """
+    totals = np.bincount(taker_sell_codes, weights=weights, minlength=2)
+    return totals[0], totals[1]
+
+# --- 成交统计内核: 最高/最低价、总成交额与主动买卖统计在一次遍历中完成 ---
+# 显式签名使内核在导入时即编译 (或从磁盘缓存加载)；数组参数声明为只读 C 连续数组，可写数组也能传入
+if NUMBA_AVAILABLE:
+    _F8_1D_RO = nb_types.Array(nb_types.float64, 1, 'C', readonly=True)
+    _U1_1D_RO = nb_types.Array(nb_types.uint8, 1, 'C', readonly=True)
+    _TRADE_CORE_SIG = nb_types.Tuple((nb_types.float64,) * 5 + (nb_types.int64,) * 2)(_F8_1D_RO, _F8_1D_RO, _U1_1D_RO)
+    _LARGE_TRADES_SIG = nb_types.Tuple((nb_types.int64[:, ::1], nb_types.float64[:, ::1]))(
+        _F8_1D_RO, _F8_1D_RO, _F8_1D_RO, _U1_1D_RO, _F8_1D_RO)
+else:
+    _TRADE_CORE_SIG = _LARGE_TRADES_SIG = None
+
+@njit(_TRADE_CORE_SIG, cache=True)
+def _trade_core_kernel(price, quote_qty, taker_sell_codes):
+    """单次遍历 (price 非空)，返回 (最高价, 最低价, 总成交额, 主动买额, 主动卖额, 主动买笔数, 主动卖笔数)。"""
+    high = price[0]
+    low = price[0]
+    buy_vol = 0.0
+    sell_vol = 0.0
+    sell_trades = 0
+    for i in range(price.shape[0]):
+        p = price[i]
+        if p > high: high = p
+        if p < low: low = p
+        if taker_sell_codes[i]:
+            sell_vol += quote_qty[i]
+            sell_trades += 1
+        else:
+            buy_vol += quote_qty[i]
+    return high, low, buy_vol + sell_vol, buy_vol, sell_vol, price.shape[0] - sell_trades, sell_trades
+
+def _trade_core(price, quote_qty, taker_sell_codes):
+    """
+    成交核心统计，返回值同 _trade_core_kernel (taker_sell_codes 为 None 时主动买卖四项为 None)。
+    有 numba 时走单次遍历的编译内核；否则用 numpy 整列运算。
+    """
+    if NUMBA_AVAILABLE:
+        codes = taker_sell_codes if taker_sell_codes is not None else np.zeros(len(price), dtype=np.uint8)
+        result = _trade_core_kernel(np.ascontiguousarray(price), np.ascontiguousarray(quote_qty), np.ascontiguousarray(codes))
+        return result if taker_sell_codes is not None else result[:3] + (None,) * 4
+    taker_stats = (None,) * 4
+    if taker_sell_codes is not None:
+        taker_stats = _taker_split(taker_sell_codes, quote_qty) + _taker_split(taker_sell_codes)
+    return (price.max(), price.min(), quote_qty.sum()) + taker_stats
+
+# _large_trades_kernel 输出列: counts[j] = (大单笔数, 主动买笔数, 主动卖笔数)
+# sums[j] = (总成交额, 主动买额, 主动卖额, 买方价格*数量, 买方数量, 卖方价格*数量, 卖方数量, 最低价, 最高价, 价格离差平方和)
+@njit(_LARGE_TRADES_SIG, cache=True)
+def _large_trades_kernel(price, quote_qty, quantity, taker_sell_codes, thresholds):
+    """
+    一次遍历同时累计所有百分位的大单统计 (成交额 >= thresholds[j] 的成交计入第 j 组)。
+    价格标准差用 Welford 在线算法累计离差平方和，避免 sum/sum² 相减的精度损失。
+    """
+    k = thresholds.shape[0]
+    counts = np.zeros((k, 3), dtype=np.int64)
+    sums = np.zeros((k, 10), dtype=np.float64)
+    mean = np.zeros(k, dtype=np.float64)
+    for j in range(k):
+        sums[j, 7] = np.inf
+        sums[j, 8] = -np.inf
+    for i in range(price.shape[0]):
+        q = quote_qty[i]
+        p = price[i]
+        pq = p * quantity[i]
+        sell = taker_sell_codes[i] != 0
+        for j in range(k):
+            if q >= thresholds[j]:
+                counts[j, 0] += 1
+                sums[j, 0] += q
+                if sell:
+                    counts[j, 2] += 1
+                    sums[j, 2] += q
+                    sums[j, 5] += pq
+                    sums[j, 6] += quantity[i]
+                else:
+                    counts[j, 1] += 1
+                    sums[j, 1] += q
+                    sums[j, 3] += pq
+                    sums[j, 4] += quantity[i]
+                if p < sums[j, 7]: sums[j, 7] = p
+                if p > sums[j, 8]: sums[j, 8] = p
+                delta = p - mean[j]
+                mean[j] += delta / counts[j, 0]
+                sums[j, 9] += delta * (p - mean[j])
+    return counts, sums
+
+def _large_trades_fused(price, quote_qty, quantity, taker_sell_codes, thresholds):
+    """
+    用 _large_trades_kernel 一次算出各百分位的大单指标，返回与 thresholds 对应的指标字典列表
+    (与逐个百分位计算的结果一致)。
+    """
+    n = len(price)
+    counts, sums = _large_trades_kernel(
+        np.ascontiguousarray(price), np.ascontiguousarray(quote_qty),
+        np.ascontiguousarray(quantity) if quantity is not None else np.zeros(n),
+        np.ascontiguousarray(taker_sell_codes) if taker_sell_codes is not None else np.zeros(n, dtype=np.uint8),
+        np.ascontiguousarray(thresholds, dtype=np.float64))
+    results = []
+    for threshold, (count, buy_trades, sell_trades), row in zip(thresholds, counts, sums):
+        if count == 0:
+            results.append(_assemble_large_trade_metrics(threshold, 0, 0.0, None, None, None))
+            continue
+        taker = vwap_parts = None
+        if taker_sell_codes is not None:
+            taker = (row[1], row[2], buy_trades, sell_trades)
+            if quantity is not None:
+                vwap_parts = (row[3], row[5], row[4], row[6])
+        price_std = np.sqrt(row[9] / (count - 1)) if count > 1 else None
+        results.append(_assemble_large_trade_metrics(threshold, int(count), row[0], price_std, row[7], row[8], taker, vwap_parts))
+    return results
+
+def _empty_trade_metrics(large_order_percentiles=[98]):
+    """
+    无成交时的指标字典: 包含所有期望键的空/默认值，以便后续处理统一。
+    直接构造字典 (每次返回新对象，调用方可以修改)，无需为此创建空 DataFrame。
+    """
+    return {
+        'start_time': None, 'end_time': None, 'time_span_seconds': 0,
+        'first_price': None, 'last_price': None, 'high_price': None, 'low_price': None,
+        'total_quote_volume': 0.0, 'total_trades': 0,
+        'taker_buy_quote_volume': 0.0, 'taker_sell_quote_volume': 0.0,
+        'taker_buy_trades': 0, 'taker_sell_trades': 0,
+        'taker_volume_ratio': None, 'taker_trade_ratio': None,
+        'delta_volume': None, # <--- 包含 Delta
+        'large_trades_analysis': {p: {} for p in large_order_percentiles}, # 大单分析初始化为空字典
+        'trades_per_second': 0.0, 'avg_trade_size_quote': None,
+        'price_change_pct': None
+    }
+
 def _calculate_trade_metrics(df, large_order_percentiles=[98]):
     """
     计算给定时间窗口内成交记录的各项指标。
 
     Args:
-        df (pd.DataFrame): 包含时间窗口内成交记录的 DataFrame。
+        df (pd.DataFrame): 包含时间窗口内成交记录的 DataFrame (按 timestamp 升序，获取并处理近期成交 已保证)。
                            需要 'timestamp', 'price', 'quoteQty', 'is_buyer_maker' 列。
         large_order_percentiles (list): 要计算的大单成交额百分位列表。
 
     Returns:
         dict: 包含各项计算指标的字典。
     """
-    metrics = {}
     if df.empty:
-        # 返回一个包含所有期望键的空/默认值字典，以便后续处理统一
-        metrics = {
-            'start_time': None, 'end_time': None, 'time_span_seconds': 0,
-            'first_price': None, 'last_price': None, 'high_price': None, 'low_price': None,
-            'total_quote_volume': 0.0, 'total_trades': 0,
-            'taker_buy_quote_volume': 0.0, 'taker_sell_quote_volume': 0.0,
-            'taker_buy_trades': 0, 'taker_sell_trades': 0,
-            'taker_volume_ratio': None, 'taker_trade_ratio': None,
-            'delta_volume': None, # <--- 包含 Delta
-            'large_trades_analysis': {},
-            'trades_per_second': 0.0, 'avg_trade_size_quote': None,
-            'price_change_pct': None
-        }
-        for p in large_order_percentiles:
-             metrics['large_trades_analysis'][p] = {} # 初始化大单分析为空字典
-        return metrics
-
-    # --- 时间跨度 ---
-    start_time = df['timestamp'].min()
-    end_time = df['timestamp'].max()
+        return _empty_trade_metrics(large_order_percentiles)
+
+    # --- 各列只提取一次为 numpy 数组，后续统计都直接在数组上进行 (避免反复经过 Series 的方法分派) ---
+    price = df['price'].to_numpy(dtype=np.float64)
+    quote_qty = df['quoteQty'].to_numpy(dtype=np.float64)
+    quantity = df['quantity'].to_numpy(dtype=np.float64) if 'quantity' in df.columns else None
+    taker_sell_codes = df['is_buyer_maker'].to_numpy(dtype=np.uint8) if 'is_buyer_maker' in df.columns else None
+
+    # --- 时间跨度 (数据已按时间升序，首尾即最早/最晚成交) ---
+    timestamps = df['timestamp']
+    start_time = timestamps.iloc[0]
+    end_time = timestamps.iloc[-1]
     time_span = (end_time - start_time).total_seconds()
     # 如果只有一条记录，时间跨度为0，后续频率计算可能需要特殊处理
     if time_span == 0 and len(df) == 1:
          time_span = 1.0 # 假设至少跨越1秒，避免除零
 
-    # --- 基本价格和成交量统计 ---
-    first_price = df['price'].iloc[0]
-    last_price = df['price'].iloc[-1]
-    high_price = df['price'].max()
-    low_price = df['price'].min()
-    total_volume = df['quoteQty'].sum()
-    total_trades = len(df)
-
-    # --- 主动买卖统计 ---
-    t_buy_vol = None
-    t_sell_vol = None
-    t_buy_trades = None
-    t_sell_trades = None
-    if 'is_buyer_maker' in df.columns:
-        # 假设 is_buyer_maker 已经根据 market_type 调整过含义
-        # True = Taker Sell, False = Taker Buy
-        is_taker_sell = df['is_buyer_maker']
-        t_buy_vol = df.loc[~is_taker_sell, 'quoteQty'].sum()
-        t_sell_vol = df.loc[is_taker_sell, 'quoteQty'].sum()
-        t_buy_trades = (~is_taker_sell).sum()
-        t_sell_trades = is_taker_sell.sum()
-    else:
+    # --- 基本价格和成交量统计，以及主动买卖统计 (一次完成，见 _trade_core) ---
+    # 假设 is_buyer_maker 已经根据 market_type 调整过含义
+    # True = Taker Sell, False = Taker Buy
+    first_price = price[0]
+    last_price = price[-1]
+    total_trades = len(price)
+    (high_price, low_price, total_volume,
+     t_buy_vol, t_sell_vol, t_buy_trades, t_sell_trades) = _trade_core(price, quote_qty, taker_sell_codes)
+    if taker_sell_codes is None:
         logger.warning("成交数据缺少 'is_buyer_maker' 列，无法计算主动买卖指标。")
 
     # --- 大单分析 --- 
     large_trades_analysis = {}
-    if 'quoteQty' in df.columns and not df['quoteQty'].empty:
-        for percentile in large_order_percentiles:
+    if quote_qty.size:
+        # 大单指标直接在 numpy 数组上计算，各百分位只对数组做布尔筛选，不再切出子 DataFrame
+        # 所有百分位阈值一次求出 (np.percentile 内部按各分位点做一次 partition 选择，而非逐个百分位各选一次)
+        try:
+            thresholds = np.percentile(quote_qty, large_order_percentiles)
+        except Exception:
+            thresholds = None # 逐个百分位计算，由下方记录具体出错的百分位
+        fused_metrics = None
+        if NUMBA_AVAILABLE and thresholds is not None:
+            # 有 numba 时所有百分位在一次遍历中累计 (见 _large_trades_kernel)；出错则退回逐个百分位计算
+            try:
+                fused_metrics = _large_trades_fused(price, quote_qty, quantity, taker_sell_codes, thresholds)
+            except Exception as e:
+                logger.warning(f"大单指标融合计算失败，改为逐个百分位计算: {e}")
+        for i, percentile in enumerate(large_order_percentiles):
             try:
-                threshold = np.percentile(df['quoteQty'], percentile)
-                large_trades_df = df[df['quoteQty'] >= threshold]
-                large_metrics = {}
-                if not large_trades_df.empty:
-                     large_metrics = _calculate_large_trade_metrics(large_trades_df) # 调用辅助函数
-                large_trades_analysis[percentile] = {
-                    'large_order_threshold_quote': threshold,
-                    **large_metrics # 合并大单计算结果
-                }
+                threshold = thresholds[i] if thresholds is not None else np.percentile(quote_qty, percentile)
+                if fused_metrics is not None:
+                    large_trades_analysis[percentile] = fused_metrics[i]
+                    continue
+                # 下标只求一次，四列共用 (布尔掩码每次索引都会重新扫描一遍)
+                large_idx = np.flatnonzero(quote_qty >= threshold)
+                large_trades_analysis[percentile] = _calculate_large_trade_metrics( # 调用辅助函数 (结果已含阈值)
+                    threshold, price[large_idx], quote_qty[large_idx],
+                    quantity[large_idx] if quantity is not None else None,
+                    taker_sell_codes[large_idx] if taker_sell_codes is not None else None)
             except Exception as e:
                  logger.error(f"计算 P{percentile} 大单指标时出错: {e}")
                  large_trades_analysis[percentile] = {'error': str(e)}
@@ -165,76 +299,96 @@ def _calculate_trade_metrics(df, large_order_percentiles=[98]):
     return metrics
 
 # --- 内部辅助函数：计算大单具体指标 --- 
-def _calculate_large_trade_metrics(large_trades_df):
-    """计算大单 DataFrame 的具体指标，如成交量、VWAP 等。"""
-    metrics = {
-        'large_trades_count': 0,
-        'large_total_quote_volume': 0.0,
-        'large_taker_buy_quote_volume': None,
-        'large_taker_sell_quote_volume': None,
-        'large_taker_volume_ratio': None,
-        'large_taker_buy_trades': None,
-        'large_taker_sell_trades': None,
-        'large_taker_trade_ratio': None,
-        'large_taker_buy_vwap': None,
-        'large_taker_sell_vwap': None,
-        'large_trades_price_stddev': None,
-        'large_trades_min_price': None,
-        'large_trades_max_price': None
+def _assemble_large_trade_metrics(threshold, count, total_quote_volume, price_stddev, min_price, max_price,
+                                  taker=None, vwap_parts=None):
+    """
+    由大单汇总量组装某一百分位的大单指标字典 (逐百分位的 numpy 路径与融合内核共用)。
+    阈值直接写入同一个字典，不再另建外层字典合并；没有大单时只包含阈值。
+
+    Args:
+        taker (tuple, optional): (主动买额, 主动卖额, 主动买笔数, 主动卖笔数)；缺少 Taker 方向信息时为 None。
+        vwap_parts (tuple, optional): (买方价格*数量, 卖方价格*数量, 买方数量, 卖方数量)；缺少数量时为 None。
+    """
+    if count == 0:
+        return {'large_order_threshold_quote': threshold}
+
+    large_taker_buy_volume = large_taker_sell_volume = None
+    large_taker_buy_trades = large_taker_sell_trades = None
+    volume_ratio = trade_ratio = buy_vwap = sell_vwap = None
+    # 大单主动性指标和 VWAP (如果可用)
+    if taker is not None:
+        large_taker_buy_volume, large_taker_sell_volume, large_taker_buy_trades, large_taker_sell_trades = taker
+        if large_taker_sell_volume is not None and large_taker_sell_volume > 0: volume_ratio = large_taker_buy_volume / large_taker_sell_volume
+        elif large_taker_buy_volume is not None and large_taker_buy_volume > 0: volume_ratio = float('inf')
+
+        if large_taker_sell_trades is not None and large_taker_sell_trades > 0: trade_ratio = large_taker_buy_trades / large_taker_sell_trades
+        elif large_taker_buy_trades is not None and large_taker_buy_trades > 0: trade_ratio = float('inf')
+
+        if vwap_parts is not None:
+            buy_numerator, sell_numerator, buy_denominator, sell_denominator = vwap_parts
+            if large_taker_buy_trades > 0 and buy_denominator > 0: buy_vwap = buy_numerator / buy_denominator
+            if large_taker_sell_trades > 0 and sell_denominator > 0: sell_vwap = sell_numerator / sell_denominator
+
+    return {
+        'large_order_threshold_quote': threshold,
+        'large_trades_count': count,
+        'large_total_quote_volume': total_quote_volume,
+        'large_taker_buy_quote_volume': large_taker_buy_volume,
+        'large_taker_sell_quote_volume': large_taker_sell_volume,
+        'large_taker_volume_ratio': volume_ratio,
+        'large_taker_buy_trades': large_taker_buy_trades,
+        'large_taker_sell_trades': large_taker_sell_trades,
+        'large_taker_trade_ratio': trade_ratio,
+        'large_taker_buy_vwap': buy_vwap,
+        'large_taker_sell_vwap': sell_vwap,
+        'large_trades_price_stddev': price_stddev,
+        'large_trades_min_price': min_price,
+        'large_trades_max_price': max_price
     }
-    if large_trades_df.empty:
-        return metrics
 
-    metrics['large_trades_count'] = len(large_trades_df)
-    metrics['large_total_quote_volume'] = large_trades_df['quoteQty'].sum()
+def _calculate_large_trade_metrics(threshold, price, quote_qty, quantity=None, taker_sell_codes=None):
+    """
+    计算大单的具体指标，如成交量、VWAP 等 (未安装 numba 时使用；否则见 _large_trades_fused)。
 
-    # 计算大单价格标准差
-    if metrics['large_trades_count'] > 1:
-        try: metrics['large_trades_price_stddev'] = large_trades_df['price'].std()
+    threshold 为该百分位的大单成交额阈值；其余参数均为已按大单筛选、长度相同的 numpy 数组
+    (price / quoteQty / quantity / is_buyer_maker 的 uint8 编码)，缺少 quantity 或 Taker 方向信息时对应参数传 None。
+    """
+    count = len(price)
+    if count == 0:
+        return _assemble_large_trade_metrics(threshold, 0, 0.0, None, None, None)
+
+    # 计算大单价格标准差 (样本标准差，与 pandas 的 std 一致)
+    price_stddev = None
+    if count > 1:
+        try: price_stddev = price.std(ddof=1)
         except Exception as std_e: logger.warning(f"计算大单价格标准差时出错: {std_e}")
 
     # 计算大单价格范围
+    min_price = max_price = None
     try:
-        metrics['large_trades_min_price'] = large_trades_df['price'].min()
-        metrics['large_trades_max_price'] = large_trades_df['price'].max()
+        min_price = price.min()
+        max_price = price.max()
     except Exception as range_e: logger.warning(f"计算大单价格范围时出错: {range_e}")
 
-    # 计算大单主动性指标和 VWAP (如果可用)
-    if 'is_buyer_maker' in large_trades_df.columns:
-        is_taker_sell = large_trades_df['is_buyer_maker']
-        large_taker_buy_volume = large_trades_df.loc[~is_taker_sell, 'quoteQty'].sum()
-        large_taker_sell_volume = large_trades_df.loc[is_taker_sell, 'quoteQty'].sum()
-        metrics['large_taker_buy_quote_volume'] = large_taker_buy_volume
-        metrics['large_taker_sell_quote_volume'] = large_taker_sell_volume
-        if large_taker_sell_volume is not None and large_taker_sell_volume > 0: metrics['large_taker_volume_ratio'] = large_taker_buy_volume / large_taker_sell_volume
-        elif large_taker_buy_volume is not None and large_taker_buy_volume > 0: metrics['large_taker_volume_ratio'] = float('inf')
-        else: metrics['large_taker_volume_ratio'] = None
-
-        large_taker_buy_trades = (~is_taker_sell).sum()
-        large_taker_sell_trades = is_taker_sell.sum()
-        metrics['large_taker_buy_trades'] = large_taker_buy_trades
-        metrics['large_taker_sell_trades'] = large_taker_sell_trades
-        if large_taker_sell_trades is not None and large_taker_sell_trades > 0: metrics['large_taker_trade_ratio'] = large_taker_buy_trades / large_taker_sell_trades
-        elif large_taker_buy_trades is not None and large_taker_buy_trades > 0: metrics['large_taker_trade_ratio'] = float('inf')
-        else: metrics['large_taker_trade_ratio'] = None
-
-        # 计算大单 VWAP
-        large_buy_df = large_trades_df[~is_taker_sell]
-        if not large_buy_df.empty and 'quantity' in large_buy_df.columns:
-            buy_numerator = (large_buy_df['price'] * large_buy_df['quantity']).sum()
-            buy_denominator = large_buy_df['quantity'].sum()
-            if buy_denominator is not None and buy_denominator > 0: metrics['large_taker_buy_vwap'] = buy_numerator / buy_denominator
-        
-        large_sell_df = large_trades_df[is_taker_sell]
-        if not large_sell_df.empty and 'quantity' in large_sell_df.columns:
-            sell_numerator = (large_sell_df['price'] * large_sell_df['quantity']).sum()
-            sell_denominator = large_sell_df['quantity'].sum()
-            if sell_denominator is not None and sell_denominator > 0: metrics['large_taker_sell_vwap'] = sell_numerator / sell_denominator
-            
-    return metrics
+    # 主动买卖汇总与 VWAP 分子分母: 各用一次 bincount 按方向汇总
+    taker = vwap_parts = None
+    if taker_sell_codes is not None:
+        taker = _taker_split(taker_sell_codes, quote_qty) + _taker_split(taker_sell_codes)
+        if quantity is not None:
+            vwap_parts = _taker_split(taker_sell_codes, price * quantity) + _taker_split(taker_sell_codes, quantity)
+
+    return _assemble_large_trade_metrics(threshold, count, quote_qty.sum(), price_stddev, min_price, max_price, taker, vwap_parts)
 
 # --- 核心功能 ---
 
+# 现货 / 聚合成交原始列名 -> 统一列名
+_TRADE_COLUMN_RENAMES = {
+    'isBuyerMaker': 'is_buyer_maker', 'm': 'is_buyer_maker',
+    'time': 'timestamp', 'T': 'timestamp',
+    'qty': 'quantity', 'q': 'quantity',
+    'p': 'price',
+}
+
 def 获取并处理近期成交(symbol, limit=100, market_type='spot'):
     """
     获取指定交易对指定市场的近期成交记录，并进行初步处理。
@@ -280,19 +434,13 @@ def 获取并处理近期成交(symbol, limit=100, market_type='spot'):
         return df
 
     try:
-        # 0. 统一 Taker 方向列名为 'is_buyer_maker' (小写)
-        if 'isBuyerMaker' in df.columns: # 检查现货原始列名 (大写 B)
-            df = df.rename(columns={'isBuyerMaker': 'is_buyer_maker'})
-        elif 'm' in df.columns: # 检查聚合数据原始列名 ('m')
-            df = df.rename(columns={'m': 'is_buyer_maker'})
-        # else: 可能两种都没有，后续检查会处理
-
-        # 尝试重命名其他列名
-        if 'time' in df.columns: df = df.rename(columns={'time': 'timestamp'})
-        if 'qty' in df.columns: df = df.rename(columns={'qty': 'quantity'})
-        if 'p' in df.columns: df = df.rename(columns={'p': 'price'})
-        if 'q' in df.columns: df = df.rename(columns={'q': 'quantity'})
-        if 'T' in df.columns: df = df.rename(columns={'T': 'timestamp'})
+        # 0. 统一列名: Taker 方向统一为 'is_buyer_maker' (小写)，其余为 timestamp/quantity/price
+        #    现货原始列名 isBuyerMaker (大写 B) 优先于聚合数据的 'm'；两者都没有时后续检查会处理
+        rename_map = {col: new for col, new in _TRADE_COLUMN_RENAMES.items() if col in df.columns}
+        if 'isBuyerMaker' in rename_map:
+            rename_map.pop('m', None)
+        if rename_map:
+            df = df.rename(columns=rename_map) # 一次完成全部重命名
 
         # 计算 quoteQty (如果不存在)
         if 'quoteQty' not in df.columns and all(col in df.columns for col in ['price', 'quantity']):
@@ -329,26 +477,33 @@ def 获取并处理近期成交(symbol, limit=100, market_type='spot'):
             elif df['timestamp'].dt.tz is None:
                  df['timestamp'] = df['timestamp'].dt.tz_localize('UTC')
             # 只有当 is_buyer_maker 列实际存在时才转换它
+            # 以 uint8 (0/1) 存储: 各统计函数直接把它当作 Taker 方向编码使用 (bincount / 内核)，取用时无需再转换
             if 'is_buyer_maker' in df.columns:
-                df['is_buyer_maker'] = df['is_buyer_maker'].astype(bool)
+                maker = df['is_buyer_maker'].to_numpy()
+                if maker.dtype != np.bool_: # 已是布尔列时直接按字节重解释，不再做一次 astype 拷贝
+                    maker = maker.astype(bool)
+                df['is_buyer_maker'] = maker.view(np.uint8)
         except Exception as type_e:
              logger.error(f"转换数据类型时出错 ({market_type}): {type_e}")
              return None
 
         # 3. 丢弃转换失败或必要列为空的数据
-        df = df.dropna(subset=list(required_cols)) # 使用可能已修改的 required_cols
+        # 逐列取底层数组累积有效掩码，只切片一次 (全部有效时不复制)；使用可能已修改的 required_cols
+        valid = np.ones(len(df), dtype=bool)
+        for col in required_cols:
+            valid &= ~pd.isna(df[col].to_numpy())
+        if not valid.all():
+            df = df.iloc[valid]
         if df.empty: logger.warning(f"处理 {symbol} ({market_type}) 成交数据后为空。"); return df
 
         # 4. 计算 trade_type (仅当 is_buyer_maker 存在时)
         final_cols = list(required_cols)
         if 'is_buyer_maker' in df.columns:
             try:
-                if market_type == 'spot':
-                    # 现货: is_buyer_maker=False -> Taker Buy
-                    df['trade_type'] = df['is_buyer_maker'].apply(lambda x: 'Taker Sell' if x else 'Taker Buy')
-                elif market_type == 'futures':
-                    # 合约(聚合): is_buyer_maker=True ('m'=True) -> Taker Sell
-                    df['trade_type'] = df['is_buyer_maker'].apply(lambda x: 'Taker Sell' if x else 'Taker Buy')
+                # 现货: is_buyer_maker=False -> Taker Buy；合约(聚合): is_buyer_maker=True ('m'=True) -> Taker Sell
+                # 两者映射相同，直接以布尔值作为分类编码 (0: Taker Buy, 1: Taker Sell)，不逐行回调
+                df['trade_type'] = pd.Categorical.from_codes(df['is_buyer_maker'].to_numpy(), # uint8 编码直接使用
+                                                             categories=['Taker Buy', 'Taker Sell'])
                 final_cols.append('trade_type') # 只有成功计算才加入最终列
             except Exception as tt_e:
                  logger.error(f"计算 trade_type 时出错 ({market_type}): {tt_e}")
@@ -413,18 +568,21 @@ def 分析成交流(symbol: str, market_type: str = 'spot',
     # --- 3. 分析指定时间窗口 --- 
     if time_windows_seconds:
         # ... (时间窗口分析逻辑保持不变) ...
-        now = pd.Timestamp.now(tz='UTC') # 使用 UTC 时间
+        # 成交已按时间升序：窗口起点用二分查找定位，窗口即其后的连续切片
+        # 比较统一在 int64 纳秒 (UTC 纪元) 上进行，不构造带时区的 Timestamp / Timedelta
+        now_ns = time.time_ns()
+        timestamps_ns = trades_df['timestamp'].to_numpy(dtype='datetime64[ns]').view(np.int64)
         for window_sec in time_windows_seconds:
              window_key = f'{window_sec}s'
              try:
-                 start_time = now - pd.Timedelta(seconds=window_sec)
-                 window_df = trades_df[trades_df['timestamp'] >= start_time]
+                 start_ns = now_ns - round(window_sec * 1_000_000_000)
+                 window_df = trades_df.iloc[np.searchsorted(timestamps_ns, start_ns, side='left'):]
                  logger.debug(f"分析时间窗口 {window_key} ({len(window_df)} 条记录) ...")
                  if not window_df.empty:
                      analysis_output['windows'][window_key] = _calculate_trade_metrics(window_df, large_order_percentiles)
                  else:
                      logger.debug(f"时间窗口 {window_key} 内无成交数据。")
-                     analysis_output['windows'][window_key] = _calculate_trade_metrics(pd.DataFrame(columns=trades_df.columns)) # 返回空指标结构
+                     analysis_output['windows'][window_key] = _empty_trade_metrics() # 返回空指标结构 (不经由空 DataFrame)
              except Exception as e:
                   logger.error(f"分析时间窗口 {window_key} ({symbol}) 时出错: {e}", exc_info=True)
                   analysis_output['windows'][window_key] = {'error': str(e)}
@@ -441,6 +599,115 @@ def 分析成交流(symbol: str, market_type: str = 'spot',
 
     return analysis_output
 
+# --- 解读辅助: 与上一轮比较的趋势指标 ---
+# (指标键, 阈值配置键, 默认阈值, 解读文本表: 0=无变化, 1=增加, 2=减少, 3=上一轮没有而本轮出现)
+_TREND_METRICS = (
+    ('taker_volume_ratio', 'trend_ratio_change_threshold', 0.2, ("", "买盘增强", "卖压增强", "")),
+    ('large_trades_count', 'trend_large_count_change_threshold', 0.3, ("", "大单数量增加", "大单数量减少", "出现大单")),
+    ('large_total_quote_volume', 'trend_large_volume_change_threshold', 0.3, ("", "大单金额放大", "大单金额萎缩", "出现大额成交")), # 与数量的解读略区别
+    ('trades_per_second', 'trend_frequency_change_threshold', 0.3, ("", "交易频率加快", "交易频率放缓", "")),
+    ('avg_trade_size_quote', 'trend_avg_trade_size_change_threshold', 0.25, ("", "平均成交额增大", "平均成交额减小", "")),
+)
+_TREND_CAN_APPEAR = np.array([bool(texts[3]) for *_, texts in _TREND_METRICS])
+
+# --- 解读阈值与主要百分位: 导入时从 配置 读取一次，解读时直接按属性取用 (配置 在运行期间不会被修改) ---
+_DEFAULT_INTERPRETATION_THRESHOLDS = {
+    'taker_vol_strong_buy': 2.0, 'taker_vol_weak_buy': 1.3,
+    'taker_vol_weak_sell': 0.7, 'taker_vol_strong_sell': 0.5,
+    'large_taker_vol_strong_buy': 1.8, 'large_taker_vol_weak_buy': 1.2,
+    'large_taker_vol_weak_sell': 0.8, 'large_taker_vol_strong_sell': 0.6,
+    'large_vol_contribution_pct': 20.0,
+    'large_trade_contribution_pct': 10.0,
+    'trend_ratio_change_threshold': 0.2,
+    'trend_large_count_change_threshold': 0.3,
+    'trend_large_volume_change_threshold': 0.3,
+    'trend_frequency_change_threshold': 0.3,
+    'price_change_significant_pct': 0.1,
+    'trend_avg_trade_size_change_threshold': 0.25,
+    'large_price_stddev_high_pct': 0.15,
+    'divergence_price_flat_ratio': 0.0001 # Delta 背离判断中视为价格持平的相对容差 (相对本轮价格)
+}
+try:
+    # 配置中未列出的键沿用默认值
+    _THR = SimpleNamespace(**{**_DEFAULT_INTERPRETATION_THRESHOLDS, **配置.TRADE_FLOW_INTERPRETATION_THRESHOLDS})
+except AttributeError:
+    logger.warning("在 配置.py 中未找到 TRADE_FLOW_INTERPRETATION_THRESHOLDS，使用默认阈值。")
+    _THR = SimpleNamespace(**_DEFAULT_INTERPRETATION_THRESHOLDS)
+# 趋势比较阈值 (顺序同 _TREND_METRICS)
+_TREND_THRESHOLDS = np.array([getattr(_THR, key) for _, key, _, _ in _TREND_METRICS], dtype=np.float64)
+_PRIMARY_PERCENTILE = getattr(配置, 'TRADE_FLOW_PRIMARY_PERCENTILE', 98) # 解读时用于大单评分的主要百分位
+_PRICE_FLAT_RATIO = _THR.divergence_price_flat_ratio
+
+def _trend_interpretations(metrics, prev_metrics, trend_thresholds):
+    """
+    将本轮与上一轮的各趋势指标打包为数组，一次算出变化率并按阈值查表生成趋势解读。
+    缺失值 (None) 记为 NaN，不参与比较；只有上一轮数值 > 0 时才计算变化率，
+    否则若本轮数值 > 0 且该指标有“出现”解读，则给出“出现”解读。
+    """
+    keys = [key for key, *_ in _TREND_METRICS]
+    current = np.array([np.nan if metrics.get(k) is None else metrics.get(k) for k in keys], dtype=np.float64)
+    previous = np.array([np.nan if prev_metrics.get(k) is None else prev_metrics.get(k) for k in keys], dtype=np.float64)
+    has_prev = previous > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = np.divide(current - previous, previous, out=np.full(len(keys), np.nan), where=has_prev)
+    codes = np.select([change > trend_thresholds, change < -trend_thresholds, ~has_prev & _TREND_CAN_APPEAR & (current > 0)],
+                      [1, 2, 3], default=0)
+    return [texts[code] for (*_, texts), code in zip(_TREND_METRICS, codes) if code]
+
+# Delta 背离: 字段顺序与 _delta_divergences 中的取值数组一致
+_DIVERGENCE_FIELDS = ('last_price', 'delta_volume', 'price_change_pct')
+_DIVERGENCE_RESULTS = {1: ("⚠️ 检测到看涨 Delta 背离 (底?)", 1.0), # 背离是较强信号
+                       -1: ("⚠️ 检测到看跌 Delta 背离 (顶?)", -1.0)}
+
+def _delta_divergences(all_scopes, previous_analysis):
+    """
+    对所有时间范围一次性判断 Delta 背离，返回 {scope: 1 (看涨) / -1 (看跌)}，无背离的范围不出现。
+    看涨: 价格创新低或持平低位 (持平时本轮价格需下跌)，但 Delta 改善；看跌反之。
+    价格高低以本轮价格的 0.01% 为容差；任一所需字段缺失 (None) 的范围不参与判断。
+    """
+    scopes = []
+    rows = []
+    for scope, metrics in all_scopes.items():
+        if not metrics or metrics.get('total_trades', 0) == 0 or not previous_analysis:
+            continue
+        prev_metrics = previous_analysis.get(scope)
+        if not isinstance(prev_metrics, dict) or prev_metrics.get('total_trades', 0) <= 0:
+            continue
+        scopes.append(scope)
+        rows.append([np.nan if m.get(k) is None else m.get(k) for m in (metrics, prev_metrics) for k in _DIVERGENCE_FIELDS])
+    if not scopes:
+        return {}
+
+    cur_price, cur_delta, cur_pc, prev_price, prev_delta, prev_pc = np.array(rows, dtype=np.float64).T
+    valid = ~np.isnan(cur_price) & ~np.isnan(cur_delta) & ~np.isnan(cur_pc) \
+            & ~np.isnan(prev_price) & ~np.isnan(prev_delta) & ~np.isnan(prev_pc)
+    price_diff_threshold = _PRICE_FLAT_RATIO * cur_price # 避免完全相等的情况
+    price_equal = np.abs(cur_price - prev_price) <= price_diff_threshold
+    bullish = ((cur_price < prev_price - price_diff_threshold) | (price_equal & (cur_pc < 0))) & (cur_delta > prev_delta)
+    bearish = ((cur_price > prev_price + price_diff_threshold) | (price_equal & (cur_pc > 0))) & (cur_delta < prev_delta)
+    signals = np.where(bearish, -1, np.where(bullish, 1, 0)) * valid
+    return {scope: int(signal) for scope, signal in zip(scopes, signals) if signal}
+
+# 各时间范围在加权总分中的权重 (例如，越近权重越高)；未列出的范围默认 0.5
+_SCOPE_WEIGHTS = {
+    '60s': 1.5,
+    '300s': 1.0,
+    '900s': 0.8,
+    'overall': 0.5 # 整体权重相对较低
+}
+
+_WEIGHTED_SCORE_SIG = nb_types.UniTuple(nb_types.float64, 2)(_F8_1D_RO, _F8_1D_RO) if NUMBA_AVAILABLE else None
+
+@njit(_WEIGHTED_SCORE_SIG, cache=True)
+def _weighted_score(scores, weights):
+    """按范围顺序累加，返回 (加权评分和, 权重和)；未安装 numba 时按普通 Python 循环执行，结果相同。"""
+    score_sum = 0.0
+    weight_sum = 0.0
+    for i in range(scores.shape[0]):
+        score_sum += scores[i] * weights[i]
+        weight_sum += weights[i]
+    return score_sum, weight_sum
+
 def 解读成交流分析(analysis_results, previous_analysis=None):
     """
     根据分析结果字典生成可读的解读和评分。
@@ -458,27 +725,7 @@ def 解读成交流分析(analysis_results, previous_analysis=None):
     bias_score = 0 # 初始化总评分
     is_conflicting_refined = False # 初始化精细冲突标志
 
-    # 从配置导入阈值，如果配置不存在则使用默认值
-    try:
-        thresholds = 配置.TRADE_FLOW_INTERPRETATION_THRESHOLDS
-        logger.debug("成功加载成交流解读阈值配置。")
-    except AttributeError:
-        logger.warning("在 配置.py 中未找到 TRADE_FLOW_INTERPRETATION_THRESHOLDS，使用默认阈值。")
-        thresholds = {
-            'taker_vol_strong_buy': 2.0, 'taker_vol_weak_buy': 1.3,
-            'taker_vol_weak_sell': 0.7, 'taker_vol_strong_sell': 0.5,
-            'large_taker_vol_strong_buy': 1.8, 'large_taker_vol_weak_buy': 1.2,
-            'large_taker_vol_weak_sell': 0.8, 'large_taker_vol_strong_sell': 0.6,
-            'large_vol_contribution_pct': 20.0,
-            'large_trade_contribution_pct': 10.0,
-            'trend_ratio_change_threshold': 0.2,
-            'trend_large_count_change_threshold': 0.3,
-            'trend_large_volume_change_threshold': 0.3,
-            'trend_frequency_change_threshold': 0.3,
-            'price_change_significant_pct': 0.1,
-            'trend_avg_trade_size_change_threshold': 0.25,
-            'large_price_stddev_high_pct': 0.15
-        }
+    thr = _THR # 解读阈值 (导入时已从 配置 读取)
 
     # 提取所有范围的 metrics
     all_scopes = {} # 先收集所有有效的 metrics
@@ -487,18 +734,14 @@ def 解读成交流分析(analysis_results, previous_analysis=None):
     if 'windows' in analysis_results:
         all_scopes.update(analysis_results['windows'])
 
-    # 用于计算最终 bias_score 的加权分数
-    weighted_score_sum = 0
-    total_weight = 0
-    # 定义不同时间窗口的权重 (例如，越近权重越高)
-    scope_weights = {
-        '60s': 1.5,
-        '300s': 1.0,
-        '900s': 0.8,
-        'overall': 0.5 # 整体权重相对较低
-    }
+    delta_divergences = _delta_divergences(all_scopes, previous_analysis)
 
-    for scope, metrics in all_scopes.items():
+    # 各范围评分及其权重按范围顺序存放在并行数组中 (无有效数据的范围评分、权重均为 0，不影响加权和)；
+    # 循环结束后由 _weighted_score 汇总，冲突判断也直接取数组的最大/最小值
+    scope_scores = np.zeros(len(all_scopes), dtype=np.float64)
+    scope_weights = np.zeros(len(all_scopes), dtype=np.float64)
+
+    for position, (scope, metrics) in enumerate(all_scopes.items()):
         scope_interpretations = []
         scope_score = 0 # 初始化当前范围的评分
 
@@ -514,78 +757,24 @@ def 解读成交流分析(analysis_results, previous_analysis=None):
             if isinstance(prev_data, dict) and prev_data.get('total_trades', 0) > 0:
                  prev_metrics = prev_data
 
-        trend_interpretations = []
         current_ratio = metrics.get('taker_volume_ratio')
-        if prev_metrics and current_ratio is not None:
-            prev_ratio = prev_metrics.get('taker_volume_ratio')
-            if prev_ratio is not None and prev_ratio > 0:
-                ratio_change = (current_ratio - prev_ratio) / prev_ratio
-                if ratio_change > thresholds.get('trend_ratio_change_threshold', 0.2):
-                    trend_interpretations.append("买盘增强")
-                elif ratio_change < -thresholds.get('trend_ratio_change_threshold', 0.2):
-                    trend_interpretations.append("卖压增强")
-
-        current_large_count = metrics.get('large_trades_count')
-        if prev_metrics and current_large_count is not None:
-             prev_large_count = prev_metrics.get('large_trades_count')
-             if prev_large_count is not None and prev_large_count > 0: # 只有上一次有大单才比较趋势
-                 count_change = (current_large_count - prev_large_count) / prev_large_count
-                 if count_change > thresholds.get('trend_large_count_change_threshold', 0.3):
-                     trend_interpretations.append("大单数量增加")
-                 elif count_change < -thresholds.get('trend_large_count_change_threshold', 0.3):
-                     trend_interpretations.append("大单数量减少")
-             elif current_large_count > 0: # 上次没有，这次有
-                 trend_interpretations.append("出现大单")
-
-        current_large_vol = metrics.get('large_total_quote_volume')
-        if prev_metrics and current_large_vol is not None:
-             prev_large_vol = prev_metrics.get('large_total_quote_volume')
-             if prev_large_vol is not None and prev_large_vol > 0:
-                 volume_change = (current_large_vol - prev_large_vol) / prev_large_vol
-                 if volume_change > thresholds.get('trend_large_volume_change_threshold', 0.3):
-                     trend_interpretations.append("大单金额放大")
-                 elif volume_change < -thresholds.get('trend_large_volume_change_threshold', 0.3):
-                     trend_interpretations.append("大单金额萎缩")
-             elif current_large_vol > 0: # 上次没有，这次有
-                 trend_interpretations.append("出现大额成交") # 与数量的解读略区别
-
-        current_freq = metrics.get('trades_per_second')
-        if prev_metrics and current_freq is not None:
-            prev_freq = prev_metrics.get('trades_per_second')
-            if prev_freq is not None and prev_freq > 0:
-                freq_change = (current_freq - prev_freq) / prev_freq
-                if freq_change > thresholds.get('trend_frequency_change_threshold', 0.3):
-                    trend_interpretations.append("交易频率加快")
-                elif freq_change < -thresholds.get('trend_frequency_change_threshold', 0.3):
-                    trend_interpretations.append("交易频率放缓")
-
-        # --- 新增：趋势 5: 平均成交额变化 ---
-        current_avg_size = metrics.get('avg_trade_size_quote')
-        if prev_metrics and current_avg_size is not None:
-            prev_avg_size = prev_metrics.get('avg_trade_size_quote')
-            if prev_avg_size is not None and prev_avg_size > 0:
-                size_change = (current_avg_size - prev_avg_size) / prev_avg_size
-                threshold = thresholds.get('trend_avg_trade_size_change_threshold', 0.25)
-                if size_change > threshold:
-                    trend_interpretations.append("平均成交额增大")
-                elif size_change < -threshold:
-                    trend_interpretations.append("平均成交额减小")
+        trend_interpretations = _trend_interpretations(metrics, prev_metrics, _TREND_THRESHOLDS) if prev_metrics else []
 
         # --- 组合和添加解读，并进行评分 --- 
         # 1. 解读整体主动买卖量 (基础解读)
         base_interpretation = "→ 买卖力量均衡"
         base_score_adj = 0
         if current_ratio is not None:
-             if current_ratio > thresholds['taker_vol_strong_buy']: 
+             if current_ratio > thr.taker_vol_strong_buy: 
                  base_interpretation = "↑ 主动买盘强劲"
                  base_score_adj = 2
-             elif current_ratio > thresholds['taker_vol_weak_buy']: 
+             elif current_ratio > thr.taker_vol_weak_buy: 
                  base_interpretation = "↑ 主动买盘占优"
                  base_score_adj = 1
-             elif current_ratio < thresholds['taker_vol_strong_sell']: 
+             elif current_ratio < thr.taker_vol_strong_sell: 
                  base_interpretation = "↓ 主动卖压沉重"
                  base_score_adj = -2
-             elif current_ratio < thresholds['taker_vol_weak_sell']: 
+             elif current_ratio < thr.taker_vol_weak_sell: 
                  base_interpretation = "↓ 主动卖压占优"
                  base_score_adj = -1
         scope_interpretations.append(base_interpretation)
@@ -596,7 +785,7 @@ def 解读成交流分析(analysis_results, previous_analysis=None):
         price_relation_interp = ""
         price_score_adj = 0
         if price_change_pct is not None and current_ratio is not None:
-            price_threshold = thresholds.get('price_change_significant_pct', 0.1)
+            price_threshold = thr.price_change_significant_pct
             price_moved_up = price_change_pct > price_threshold
             price_moved_down = price_change_pct < -price_threshold
 
@@ -619,7 +808,7 @@ def 解读成交流分析(analysis_results, previous_analysis=None):
         # 2. 解读大单情况 (增加评分逻辑)
         large_trade_score_adj = 0
         if 'large_trades_analysis' in metrics and metrics['large_trades_analysis']:
-            primary_percentile = getattr(配置, 'TRADE_FLOW_PRIMARY_PERCENTILE', 98) # 使用主要百分位评分
+            primary_percentile = _PRIMARY_PERCENTILE # 使用主要百分位评分
             if primary_percentile in metrics['large_trades_analysis']:
                 large_metrics = metrics['large_trades_analysis'][primary_percentile]
                 # --- 大单方向评分 --- 
@@ -628,10 +817,10 @@ def 解读成交流分析(analysis_results, previous_analysis=None):
                     large_ratio = large_metrics.get('large_taker_volume_ratio')
                     if large_ratio is not None:
                         # 大单评分权重更高
-                        if large_ratio > thresholds['large_taker_vol_strong_buy']: large_trade_score_adj = 1.5
-                        elif large_ratio > thresholds['large_taker_vol_weak_buy']: large_trade_score_adj = 0.75
-                        elif large_ratio < thresholds['large_taker_vol_strong_sell']: large_trade_score_adj = -1.5
-                        elif large_ratio < thresholds['large_taker_vol_weak_sell']: large_trade_score_adj = -0.75
+                        if large_ratio > thr.large_taker_vol_strong_buy: large_trade_score_adj = 1.5
+                        elif large_ratio > thr.large_taker_vol_weak_buy: large_trade_score_adj = 0.75
+                        elif large_ratio < thr.large_taker_vol_strong_sell: large_trade_score_adj = -1.5
+                        elif large_ratio < thr.large_taker_vol_weak_sell: large_trade_score_adj = -0.75
             # ... (其他百分位的解读文本逻辑保持不变) ...
         scope_score += large_trade_score_adj
 
@@ -639,43 +828,12 @@ def 解读成交流分析(analysis_results, previous_analysis=None):
         if trend_interpretations:
              scope_interpretations.append(f"趋势: {', '.join(trend_interpretations)}")
 
-        # --- 新增：初步的 Delta 散度判断 --- 
-        current_delta = metrics.get('delta_volume')
-        current_price_change = metrics.get('price_change_pct')
-        current_last_price = metrics.get('last_price') # 需要当前价格来判断高低
-        delta_divergence_interp = None
-        delta_divergence_score_adj = 0
-
-        if prev_metrics and current_delta is not None and current_price_change is not None and current_last_price is not None:
-            prev_delta = prev_metrics.get('delta_volume')
-            prev_price_change = prev_metrics.get('price_change_pct')
-            prev_last_price = prev_metrics.get('last_price') # 需要前一个价格
-
-            if prev_delta is not None and prev_price_change is not None and prev_last_price is not None:
-                # 定义价格高低点判断的微小阈值 (避免完全相等的情况)
-                price_diff_threshold = 0.0001 * current_last_price 
-                
-                # 看涨背离条件: 价格创新低或持平低位，但 Delta 改善
-                price_lower = current_last_price < prev_last_price - price_diff_threshold
-                price_equal_low = abs(current_last_price - prev_last_price) <= price_diff_threshold and current_price_change < 0 # 持平低位需要价格是下跌的
-                delta_higher = current_delta > prev_delta
-                
-                if (price_lower or price_equal_low) and delta_higher:
-                    delta_divergence_interp = "⚠️ 检测到看涨 Delta 背离 (底?)"
-                    delta_divergence_score_adj = 1.0 # 背离是较强信号
-
-                # 看跌背离条件: 价格创新高或持平高位，但 Delta 减弱
-                price_higher = current_last_price > prev_last_price + price_diff_threshold
-                price_equal_high = abs(current_last_price - prev_last_price) <= price_diff_threshold and current_price_change > 0 # 持平高位需要价格是上涨的
-                delta_lower = current_delta < prev_delta
-                
-                if (price_higher or price_equal_high) and delta_lower:
-                    delta_divergence_interp = "⚠️ 检测到看跌 Delta 背离 (顶?)"
-                    delta_divergence_score_adj = -1.0 # 背离是较强信号
-        
-        if delta_divergence_interp:
+        # --- 新增：初步的 Delta 散度判断 (各范围已在循环前一次算出) --- 
+        divergence = delta_divergences.get(scope)
+        if divergence:
+            delta_divergence_interp, delta_divergence_score_adj = _DIVERGENCE_RESULTS[divergence]
             scope_interpretations.append(delta_divergence_interp)
-        scope_score += delta_divergence_score_adj
+            scope_score += delta_divergence_score_adj
         # ------------------------------------
 
         # --- 计算并存储当前范围的结果 --- 
@@ -683,12 +841,12 @@ def 解读成交流分析(analysis_results, previous_analysis=None):
         scope_score = max(-3, min(3, round(scope_score, 2))) # 单范围评分限制在 -3 到 +3
         interpretation_details_by_scope[scope] = {'details': scope_interpretations, 'score': scope_score}
         
-        # --- 更新加权总分 --- 
-        weight = scope_weights.get(scope, 0.5) # 默认权重 0.5
-        weighted_score_sum += scope_score * weight
-        total_weight += weight
+        # --- 记录加权总分所需的评分和权重 --- 
+        scope_scores[position] = scope_score
+        scope_weights[position] = _SCOPE_WEIGHTS.get(scope, 0.5) # 默认权重 0.5
 
     # --- 计算最终加权平均 bias_score --- 
+    weighted_score_sum, total_weight = _weighted_score(scope_scores, scope_weights)
     if total_weight > 0:
         bias_score = round(weighted_score_sum / total_weight, 2)
     else:
@@ -698,15 +856,12 @@ def 解读成交流分析(analysis_results, previous_analysis=None):
     # 选取最重要的时间窗口解读（例如 60s 或 300s）作为主要参考
     primary_scope = '60s' if '60s' in interpretation_details_by_scope else ('300s' if '300s' in interpretation_details_by_scope else 'overall')
     if primary_scope in interpretation_details_by_scope:
-        overall_summary = interpretation_details_by_scope[primary_scope]['details'][:2] # 取前两句作为摘要
-        overall_details = interpretation_details_by_scope[primary_scope]['details']
+        overall_details = interpretation_details_by_scope[primary_scope]['details'] # 直接引用，不复制
+        overall_summary = list(islice(overall_details, 2)) # 取前两句作为摘要 (新列表，后面可能追加冲突提示)
     
     # 判断精细冲突：如果不同时间窗口的 scope_score 符号相反且绝对值都较大
-    scores = [d['score'] for d in interpretation_details_by_scope.values() if d.get('score') is not None]
-    if len(scores) >= 2:
-        max_score = max(scores)
-        min_score = min(scores)
-        if max_score > 1.0 and min_score < -1.0: # 例如，一个强看涨窗口和一个强看跌窗口
+    if len(scope_scores) >= 2:
+        if scope_scores.max() > 1.0 and scope_scores.min() < -1.0: # 例如，一个强看涨窗口和一个强看跌窗口
             is_conflicting_refined = True
             overall_summary.append("!!注意：不同时间窗口信号存在显著冲突!!")
 
@@ -721,22 +876,100 @@ def 解读成交流分析(analysis_results, previous_analysis=None):
         'time_segments': interpretation_details_by_scope # 包含每个时间段的解读和分数
     }
 
+# --- 辅助函数：打印用的格式化 ---
+def _vwap_diff_str(vwap, ref_price):
+    """VWAP 相对参考价的偏离百分比文本，如 " (+0.012%)"；任一值缺失或参考价为 0 时返回空串。"""
+    if vwap is None or ref_price is None or ref_price == 0: return ""
+    diff_pct = (vwap - ref_price) / ref_price * 100
+    sign = '+' if diff_pct >= 0 else ''
+    return f" ({sign}{diff_pct:.3f}%)"
+
+@lru_cache(maxsize=1024)
+def _fmt_hms(ts):
+    """时间的 时:分:秒 文本；各窗口的首尾成交时间多有重复，结果缓存以免反复 strftime。"""
+    return ts.strftime('%H:%M:%S')
+
+@lru_cache(maxsize=256)
+def _price_decimals(ref_p, default=2):
+    """按参考价的有效小数位决定价格显示精度 (至少 default 位)；同一价格在各窗口间反复出现，结果缓存。"""
+    decimals = default
+    if ref_p is not None:
+        try:
+            p_str = f"{ref_p:.8f}"
+            if '.' in p_str: decimals = max(default, len(p_str.split('.')[1].rstrip('0')))
+        except Exception: pass
+    return decimals
+
+# 精简显示的主要大单百分位 (导入时读取一次；未配置时不单独显示，全部放入详细百分位块)
+_DISPLAY_PRIMARY_PERCENTILE = getattr(配置, 'TRADE_FLOW_PRIMARY_PERCENTILE', None)
+
+@lru_cache(maxsize=32)
+def _sorted_percentiles(percentiles):
+    """排序后的百分位列表；各窗口的百分位集合相同，按元组缓存，不必每次重新排序。"""
+    return sorted(percentiles)
+
+def _format_percentile_rows(percentile, large_metrics, total_trades, total_volume, last_price, last_price_decimals):
+    """
+    详细百分位块中单个百分位的两行文本。
+    last_price_decimals 为按最新价确定的价格精度 (没有最新价时为 None，改按该百分位的 VWAP 决定)。
+    """
+    large_threshold = large_metrics.get('large_order_threshold_quote', 0)
+    large_trades_count = large_metrics.get('large_trades_count', 0)
+    large_total_vol = large_metrics.get('large_total_quote_volume', 0.0)
+    large_buy_vwap = large_metrics.get('large_taker_buy_vwap')
+    large_sell_vwap = large_metrics.get('large_taker_sell_vwap')
+    large_buy_vol = large_metrics.get('large_taker_buy_quote_volume')
+    large_sell_vol = large_metrics.get('large_taker_sell_quote_volume')
+    large_vol_ratio = large_metrics.get('large_taker_volume_ratio')
+    large_trade_ratio = large_metrics.get('large_taker_trade_ratio')
+
+    large_trade_pct_str = f"({large_trades_count / total_trades * 100:.1f}%笔)" if total_trades > 0 else ""
+    large_vol_pct_str = f"({large_total_vol / total_volume * 100:.1f}%额)" if total_volume > 0 else ""
+    price_decimals = last_price_decimals if last_price_decimals is not None else _price_decimals(large_buy_vwap if large_buy_vwap is not None else large_sell_vwap)
+    buy_vwap_diff_str = _vwap_diff_str(large_buy_vwap, last_price)
+    sell_vwap_diff_str = _vwap_diff_str(large_sell_vwap, last_price)
+    buy_vwap_str = f'{large_buy_vwap:.{price_decimals}f}' if large_buy_vwap is not None else '-'
+    sell_vwap_str = f'{large_sell_vwap:.{price_decimals}f}' if large_sell_vwap is not None else '-'
+    large_buy_vol_str = f'{large_buy_vol:.2f}' if large_buy_vol is not None else '-'
+    large_sell_vol_str = f'{large_sell_vol:.2f}' if large_sell_vol is not None else '-'
+    large_vol_ratio_str = f'{large_vol_ratio:.4f}' if large_vol_ratio is not None else '-'
+    large_trade_ratio_str = f'{large_trade_ratio:.4f}' if large_trade_ratio is not None else '-'
+
+    return (f"    P{percentile}(>{large_threshold:.2f}Q): 数量:{large_trades_count}{large_trade_pct_str} | 贡献:{large_total_vol:.2f}{large_vol_pct_str}",
+            f"      买/卖额: {large_buy_vol_str}/{large_sell_vol_str} | VWAP: {buy_vwap_str}{buy_vwap_diff_str}/{sell_vwap_str}{sell_vwap_diff_str} | 比率(V/T): {large_vol_ratio_str}/{large_trade_ratio_str}")
+
 # --- 辅助函数：打印分析结果 ---
+# _format_analysis_metrics 读取的顶层字段及其缺失时的默认值 (顺序即解包顺序)
+_SUMMARY_FIELDS = (
+    ('start_time', None), ('end_time', None), ('time_span_seconds', 0),
+    ('total_quote_volume', 0), ('total_trades', 0),
+    ('taker_buy_quote_volume', None), ('taker_sell_quote_volume', None),
+    ('taker_buy_trades', None), ('taker_sell_trades', None),
+    ('last_price', None),
+)
+
 def _print_analysis_metrics(metrics, title, requested_window_sec=None):
-    """辅助函数，用于格式化打印单个分析结果字典 (紧凑格式)。"""
+    """辅助函数，用于格式化打印单个分析结果字典 (紧凑格式)，整块内容一次写出。"""
+    lines = _format_analysis_metrics(metrics, title, requested_window_sec)
+    sys.stdout.write('\n'.join(lines) + '\n')
+
+def _format_analysis_metrics(metrics, title, requested_window_sec=None):
+    """将单个分析结果字典格式化为待打印的文本行列表 (紧凑格式)，由调用方决定何时统一输出。"""
+    lines = []
     if not metrics:
-        print(f"\n--- {title} ---")
-        print("  (无数据或分析失败)")
-        return
+        lines.append(f"\n--- {title} ---")
+        lines.append("  (无数据或分析失败)")
+        return lines
+
+    lines.append(f"\n--- {title} ---") # 窗口标题
+    # 顶层字段按 _SUMMARY_FIELDS 的顺序一次取出 (缺失时取各自的默认值)
+    (actual_start_time, actual_end_time, actual_span_sec, total_volume, total_trades,
+     t_buy_vol, t_sell_vol, t_buy_trades, t_sell_trades, last_price) = [metrics.get(key, default) for key, default in _SUMMARY_FIELDS]
 
-    print(f"\n--- {title} ---") # 窗口标题
     # 时间范围和覆盖警告
-    actual_start_time = metrics.get('start_time')
-    actual_end_time = metrics.get('end_time')
-    actual_span_sec = metrics.get('time_span_seconds', 0)
     time_info = "  时间范围: N/A"
     if actual_start_time and actual_end_time:
-        time_info = f"  数据时间: {actual_start_time.strftime('%H:%M:%S')} -> {actual_end_time.strftime('%H:%M:%S')} ({actual_span_sec:.1f}s)" # 简化时间格式
+        time_info = f"  数据时间: {_fmt_hms(actual_start_time)} -> {_fmt_hms(actual_end_time)} ({actual_span_sec:.1f}s)" # 简化时间格式
         if requested_window_sec is not None and requested_window_sec > 0:
             if actual_span_sec > 0:
                 coverage_ratio = actual_span_sec / requested_window_sec
@@ -744,17 +977,9 @@ def _print_analysis_metrics(metrics, title, requested_window_sec=None):
                     time_info += f" [⚠警告: 覆盖率 {coverage_ratio:.1%}]"
             else:
                 time_info += f" [⚠警告: {requested_window_sec}s 内无数据]"
-    print(time_info)
-
-    # 整体成交统计
-    total_volume = metrics.get('total_quote_volume', 0)
-    total_trades = metrics.get('total_trades', 0)
-    t_buy_vol = metrics.get('taker_buy_quote_volume')
-    t_sell_vol = metrics.get('taker_sell_quote_volume')
-    t_buy_trades = metrics.get('taker_buy_trades')
-    t_sell_trades = metrics.get('taker_sell_trades')
-    last_price = metrics.get('last_price') # 用于 VWAP 对比
+    lines.append(time_info)
 
+    # 整体成交统计 (last_price 用于 VWAP 对比)
     t_buy_vol_str = f'{t_buy_vol:.2f}' if t_buy_vol is not None else '-'
     t_sell_vol_str = f'{t_sell_vol:.2f}' if t_sell_vol is not None else '-'
     buy_vol_pct_str = f"({t_buy_vol/total_volume*100:.1f}%)" if total_volume > 0 and t_buy_vol is not None else ""
@@ -764,31 +989,17 @@ def _print_analysis_metrics(metrics, title, requested_window_sec=None):
     buy_trade_pct_str = f"({t_buy_trades/total_trades*100:.0f}%)" if total_trades > 0 and t_buy_trades is not None else ""
     sell_trade_pct_str = f"({t_sell_trades/total_trades*100:.0f}%)" if total_trades > 0 and t_sell_trades is not None else ""
 
-    print(f"  [📈整体] 总额: {total_volume:.2f} | 笔数: {total_trades}")
-    print(f"    买/卖额: {t_buy_vol_str}{buy_vol_pct_str} / {t_sell_vol_str}{sell_vol_pct_str}")
-    print(f"    买/卖笔: {t_buy_trades_str}{buy_trade_pct_str} / {t_sell_trades_str}{sell_trade_pct_str}")
+    lines.append(f"  [📈整体] 总额: {total_volume:.2f} | 笔数: {total_trades}")
+    lines.append(f"    买/卖额: {t_buy_vol_str}{buy_vol_pct_str} / {t_sell_vol_str}{sell_vol_pct_str}")
+    lines.append(f"    买/卖笔: {t_buy_trades_str}{buy_trade_pct_str} / {t_sell_trades_str}{sell_trade_pct_str}")
 
-    # --- 内部辅助函数 Start ---
-    def get_vwap_diff_str(vwap, ref_price):
-        if vwap is None or ref_price is None or ref_price == 0: return ""
-        diff_pct = (vwap - ref_price) / ref_price * 100
-        sign = '+' if diff_pct >= 0 else ''
-        return f" ({sign}{diff_pct:.3f}%)"
-
-    def get_price_decimals(ref_p, default=2):
-        decimals = default
-        if ref_p is not None:
-            try:
-                p_str = f"{ref_p:.8f}"
-                if '.' in p_str: decimals = max(default, len(p_str.split('.')[1].rstrip('0')))
-            except Exception: pass
-        return decimals
-    # --- 内部辅助函数 End ---
+    # 价格显示精度由最新价决定，各百分位共用，只算一次；没有最新价时才按各百分位的 VWAP 决定
+    last_price_decimals = _price_decimals(last_price) if last_price is not None else None
 
     # --- 打印精简的主要百分位大单分析 --- 
     primary_percentile_printed = False
     if 'large_trades_analysis' in metrics and metrics['large_trades_analysis']:
-        primary_percentile = getattr(配置, 'TRADE_FLOW_PRIMARY_PERCENTILE', None)
+        primary_percentile = _DISPLAY_PRIMARY_PERCENTILE
         if primary_percentile and primary_percentile in metrics['large_trades_analysis']:
             primary_percentile_printed = True
             large_metrics = metrics['large_trades_analysis'][primary_percentile]
@@ -800,57 +1011,36 @@ def _print_analysis_metrics(metrics, title, requested_window_sec=None):
 
             large_trade_pct_str = f"({large_trades_count / total_trades * 100:.1f}%笔)" if total_trades > 0 else ""
             large_vol_pct_str = f"({large_total_vol / total_volume * 100:.1f}%额)" if total_volume > 0 else ""
-            price_decimals = get_price_decimals(last_price if last_price is not None else (large_buy_vwap if large_buy_vwap is not None else large_sell_vwap))
-            buy_vwap_diff_str = get_vwap_diff_str(large_buy_vwap, last_price)
-            sell_vwap_diff_str = get_vwap_diff_str(large_sell_vwap, last_price)
+            price_decimals = last_price_decimals if last_price_decimals is not None else _price_decimals(large_buy_vwap if large_buy_vwap is not None else large_sell_vwap)
+            buy_vwap_diff_str = _vwap_diff_str(large_buy_vwap, last_price)
+            sell_vwap_diff_str = _vwap_diff_str(large_sell_vwap, last_price)
             buy_vwap_str = f'{large_buy_vwap:.{price_decimals}f}' if large_buy_vwap is not None else '-'
             sell_vwap_str = f'{large_sell_vwap:.{price_decimals}f}' if large_sell_vwap is not None else '-'
 
-            print(f"  [🐋大单(P{primary_percentile})] 阈值: {large_threshold:.2f}Q | 笔数: {large_trades_count}{large_trade_pct_str} | 贡献: {large_total_vol:.2f}{large_vol_pct_str}")
-            print(f"    VWAP: 买{buy_vwap_str}{buy_vwap_diff_str} | 卖{sell_vwap_str}{sell_vwap_diff_str}")
+            lines.append(f"  [🐋大单(P{primary_percentile})] 阈值: {large_threshold:.2f}Q | 笔数: {large_trades_count}{large_trade_pct_str} | 贡献: {large_total_vol:.2f}{large_vol_pct_str}")
+            lines.append(f"    VWAP: 买{buy_vwap_str}{buy_vwap_diff_str} | 卖{sell_vwap_str}{sell_vwap_diff_str}")
 
     # --- 打印详细的多百分位大单分析 (仅在必要时显示) ---
     if 'large_trades_analysis' in metrics and metrics['large_trades_analysis']:
-        percentiles_to_print = sorted(metrics['large_trades_analysis'].keys())
-        primary_p = getattr(配置, 'TRADE_FLOW_PRIMARY_PERCENTILE', None)
+        large_trades_by_percentile = metrics['large_trades_analysis']
+        primary_p = _DISPLAY_PRIMARY_PERCENTILE
         # 只有当存在多个百分位，或者唯一百分位不是主要百分位时，才显示这个详细块
-        show_detailed_block = len(percentiles_to_print) > 1 or (len(percentiles_to_print) == 1 and percentiles_to_print[0] != primary_p)
+        # (只看键的个数和唯一的键，不需要排序；排序推迟到确实要显示时)
+        show_detailed_block = len(large_trades_by_percentile) > 1 or next(iter(large_trades_by_percentile)) != primary_p
         
         if show_detailed_block:
-            print("  --- (详细百分位) ---")
-            for percentile in percentiles_to_print:
+            lines.append("  --- (详细百分位) ---")
+            for percentile in _sorted_percentiles(tuple(large_trades_by_percentile)):
                 # 如果主要百分位已在精简块打印，则跳过详细块中的重复打印
                 if percentile == primary_p and primary_percentile_printed:
                     continue 
                     
-                large_metrics = metrics['large_trades_analysis'][percentile]
-                large_threshold = large_metrics.get('large_order_threshold_quote', 0)
-                large_trades_count = large_metrics.get('large_trades_count', 0)
-                large_total_vol = large_metrics.get('large_total_quote_volume', 0.0)
-                large_buy_vwap = large_metrics.get('large_taker_buy_vwap')
-                large_sell_vwap = large_metrics.get('large_taker_sell_vwap')
-                large_buy_vol = large_metrics.get('large_taker_buy_quote_volume')
-                large_sell_vol = large_metrics.get('large_taker_sell_quote_volume')
-                large_vol_ratio = large_metrics.get('large_taker_volume_ratio')
-                large_trade_ratio = large_metrics.get('large_taker_trade_ratio')
-
-                large_trade_pct_str = f"({large_trades_count / total_trades * 100:.1f}%笔)" if total_trades > 0 else ""
-                large_vol_pct_str = f"({large_total_vol / total_volume * 100:.1f}%额)" if total_volume > 0 else ""
-                price_decimals = get_price_decimals(last_price if last_price is not None else (large_buy_vwap if large_buy_vwap is not None else large_sell_vwap))
-                buy_vwap_diff_str = get_vwap_diff_str(large_buy_vwap, last_price)
-                sell_vwap_diff_str = get_vwap_diff_str(large_sell_vwap, last_price)
-                buy_vwap_str = f'{large_buy_vwap:.{price_decimals}f}' if large_buy_vwap is not None else '-'
-                sell_vwap_str = f'{large_sell_vwap:.{price_decimals}f}' if large_sell_vwap is not None else '-'
-                large_buy_vol_str = f'{large_buy_vol:.2f}' if large_buy_vol is not None else '-'
-                large_sell_vol_str = f'{large_sell_vol:.2f}' if large_sell_vol is not None else '-'
-                large_vol_ratio_str = f'{large_vol_ratio:.4f}' if large_vol_ratio is not None else '-'
-                large_trade_ratio_str = f'{large_trade_ratio:.4f}' if large_trade_ratio is not None else '-'
-                 
                 # 压缩详细信息到2行
-                print(f"    P{percentile}(>{large_threshold:.2f}Q): 数量:{large_trades_count}{large_trade_pct_str} | 贡献:{large_total_vol:.2f}{large_vol_pct_str}")
-                print(f"      买/卖额: {large_buy_vol_str}/{large_sell_vol_str} | VWAP: {buy_vwap_str}{buy_vwap_diff_str}/{sell_vwap_str}{sell_vwap_diff_str} | 比率(V/T): {large_vol_ratio_str}/{large_trade_ratio_str}")
+                lines.extend(_format_percentile_rows(percentile, metrics['large_trades_analysis'][percentile],
+                                                     total_trades, total_volume, last_price, last_price_decimals))
 
     # 函数末尾不再打印分隔线
+    return lines
 
 # --- 测试代码 --- (增加合约测试和趋势模拟)
 if __name__ == '__main__':
@@ -858,7 +1048,7 @@ if __name__ == '__main__':
     try:
         test_percentiles = 配置.TRADE_FLOW_LARGE_ORDER_PERCENTILES
         test_windows = 配置.TRADE_FLOW_ANALYSIS_WINDOWS
-        logger.info(f"使用配置：大单百分位={test_percentiles}, 时间窗口={test_windows}s")
+        logger.info("使用配置：大单百分位=%s, 时间窗口=%ss", test_percentiles, test_windows)
     except AttributeError:
         logger.warning("在 配置.py 中未找到成交流分析参数，使用默认值。")
         test_percentiles = [95, 98, 99]
@@ -873,78 +1063,82 @@ if __name__ == '__main__':
     num_iterations = 2 # 模拟运行两次以便比较
     iteration_delay_seconds = 5 # 每次迭代间隔秒数
 
+    def _run_scenario(symbol, market_type, iteration, prev_scenario_analysis):
+        """获取 → 分析 → 解读单个场景，返回 (分析结果或 None, 待打印的文本行)；各场景在线程池中并发执行。"""
+        output_lines = []
+        logger.info("\n===== 测试场景: %s (%s) - 迭代 %s ====", symbol, market_type.upper(), iteration)
+        logger.info("--- 测试获取、处理、分析并解读 %s (%s) --- ", symbol, market_type)
+
+        # 使用配置中定义的获取数量
+        fetch_limit = getattr(配置, 'TRADE_FLOW_FETCH_LIMIT', 1000) # 默认1000以防万一
+        processed_trades = 获取并处理近期成交(symbol, limit=fetch_limit, market_type=market_type)
+
+        if processed_trades is None:
+            output_lines.append(f"\n获取或处理 {symbol} ({market_type}) 成交记录失败。")
+            return None, output_lines
+        if processed_trades.empty:
+            output_lines.append(f"\n近期 {symbol} ({market_type}) 没有成交记录或处理后为空。")
+            return None, output_lines
+
+        output_lines.append(f"\n成功获取并处理了 {len(processed_trades)} 条成交记录.")
+        output_lines.append(f"  (数据实际时间范围: {processed_trades['timestamp'].min()} -> {processed_trades['timestamp'].max()})")
+
+        # 1. 分析
+        trade_flow_analysis = 分析成交流(symbol, market_type, fetch_limit, test_percentiles, test_windows)
+        if not trade_flow_analysis:
+            output_lines.append("\n未能生成成交流分析结果。")
+            return None, output_lines
+
+        # 2. 解读 (传入这个场景上一次的分析结果)
+        interpretations = 解读成交流分析(trade_flow_analysis, previous_analysis=prev_scenario_analysis)
+
+        output_lines.append(f"\n=== 时间窗口分析与解读 ({market_type.upper()}) - 迭代 {iteration} ===")
+        if 'windows' in trade_flow_analysis and trade_flow_analysis['windows']:
+            for window_key, window_metrics in trade_flow_analysis['windows'].items():
+                requested_sec = int(window_key[:-1])
+                market_name_cn = "合约" if market_type == 'futures' else "现货"
+                title = f"--- {market_name_cn}市场 成交数据分析 - 时间窗口 {window_key} ({requested_sec//60} 分钟) ---"
+                output_lines.extend(_format_analysis_metrics(window_metrics, title, requested_window_sec=requested_sec))
+
+                # 修正：从 interpretations['time_segments'] 获取解读 (第二次修正)
+                scope_interpretations = interpretations.get('time_segments', {}).get(window_key, {})
+                details_list = scope_interpretations.get('details')
+
+                if details_list: # 检查列表是否非空
+                     output_lines.append("  解读:")
+                     output_lines.extend(f"    - {line}" for line in details_list) # 修正：直接迭代 details_list
+                else:
+                     output_lines.append("  (无解读信息)")
+                output_lines.append("----------------------------------")
+        else:
+            output_lines.append("  未请求或未生成任何时间窗口的分析结果。")
+        return trade_flow_analysis, output_lines
+
     for i in range(num_iterations):
-        logger.info(f"\n<<<<<<<<<< 模拟迭代 {i+1}/{num_iterations} >>>>>>>>>>")
+        iteration_started = time.monotonic()
+        logger.info("\n<<<<<<<<<< 模拟迭代 %s/%s >>>>>>>>>>", i + 1, num_iterations)
         current_iteration_results = {} # 存储当前迭代结果，传给下一次
 
-        for scenario in test_scenarios:
-            symbol = scenario['symbol']
-            market_type = scenario['market_type']
-            scenario_key = f"{symbol}_{market_type}" # 用于区分存储的结果
-
-            logger.info(f"\n===== 测试场景: {symbol} ({market_type.upper()}) - 迭代 {i+1} ====")
-            logger.info(f"--- 测试获取、处理、分析并解读 {symbol} ({market_type}) --- ")
-
-            # 使用配置中定义的获取数量
-            fetch_limit = getattr(配置, 'TRADE_FLOW_FETCH_LIMIT', 1000) # 默认1000以防万一
-            processed_trades = 获取并处理近期成交(symbol, limit=fetch_limit, market_type=market_type)
-
-            if processed_trades is not None and not processed_trades.empty:
-                print(f"\n成功获取并处理了 {len(processed_trades)} 条成交记录.")
-                print(f"  (数据实际时间范围: {processed_trades['timestamp'].min()} -> {processed_trades['timestamp'].max()})")
-
-                # 1. 分析
-                trade_flow_analysis = 分析成交流(symbol, market_type, fetch_limit, test_percentiles, test_windows)
-
-                if trade_flow_analysis:
-                    # 获取这个场景上一次的分析结果
-                    prev_scenario_analysis = previous_results.get(scenario_key)
-
-                    # 2. 解读 (传入上一次的结果)
-                    interpretations = 解读成交流分析(trade_flow_analysis, previous_analysis=prev_scenario_analysis)
-
-                    print(f"\n=== 时间窗口分析与解读 ({market_type.upper()}) - 迭代 {i+1} ===")
-                    if 'windows' in trade_flow_analysis and trade_flow_analysis['windows']:
-                        for window_key, window_metrics in trade_flow_analysis['windows'].items():
-                            requested_sec = int(window_key[:-1])
-                            market_name_cn = "合约" if market_type == 'futures' else "现货"
-                            title = f"--- {market_name_cn}市场 成交数据分析 - 时间窗口 {window_key} ({requested_sec//60} 分钟) ---"
-                            _print_analysis_metrics(window_metrics, title, requested_window_sec=requested_sec)
-
-                            # 修正：从 interpretations['time_segments'] 获取解读 (第二次修正)
-                            scope_interpretations = interpretations.get('time_segments', {}).get(window_key, {})
-                            details_list = scope_interpretations.get('details')
-
-                            if details_list: # 检查列表是否非空
-                                 print("  解读:")
-                                 for line in details_list: # 修正：直接迭代 details_list
-                                     print(f"    - {line}")
-                            else:
-                                 print("  (无解读信息)")
-                            print("----------------------------------")
-                    else:
-                        print("  未请求或未生成任何时间窗口的分析结果。")
-
-                    # 存储当前结果供下一次迭代使用
-                    current_iteration_results[scenario_key] = trade_flow_analysis
-
-                else:
-                    print("\n未能生成成交流分析结果。")
-                    current_iteration_results[scenario_key] = None # 标记失败
-
-            elif processed_trades is not None and processed_trades.empty:
-                print(f"\n近期 {symbol} ({market_type}) 没有成交记录或处理后为空。")
-                current_iteration_results[scenario_key] = None
-            else:
-                print(f"\n获取或处理 {symbol} ({market_type}) 成交记录失败。")
-                current_iteration_results[scenario_key] = None
+        # 各场景的成交获取是网络 I/O，并发执行；输出按场景定义顺序依次写出，保持稳定
+        with ThreadPoolExecutor(max_workers=len(test_scenarios)) as executor:
+            futures = []
+            for scenario in test_scenarios:
+                scenario_key = f"{scenario['symbol']}_{scenario['market_type']}" # 用于区分存储的结果
+                futures.append((scenario_key, executor.submit(_run_scenario, scenario['symbol'], scenario['market_type'],
+                                                              i + 1, previous_results.get(scenario_key))))
+            for scenario_key, future in futures:
+                trade_flow_analysis, output_lines = future.result()
+                sys.stdout.write('\n'.join(output_lines) + '\n')
+                # 存储当前结果供下一次迭代使用 (失败时为 None)
+                current_iteration_results[scenario_key] = trade_flow_analysis
 
         # 更新 previous_results 为当前迭代的结果
         previous_results = current_iteration_results
 
-        # 如果不是最后一次迭代，则等待
+        # 如果不是最后一次迭代，则等待：按迭代开始时刻计间隔，本轮获取和分析已用的时间不再额外等待
         if i < num_iterations - 1:
-            logger.info(f"迭代 {i+1} 完成，等待 {iteration_delay_seconds} 秒...")
-            time.sleep(iteration_delay_seconds)
+            remaining_delay = max(0.0, iteration_delay_seconds - (time.monotonic() - iteration_started))
+            logger.info("迭代 %s 完成，等待 %.1f 秒...", i + 1, remaining_delay)
+            time.sleep(remaining_delay)
 
     logger.info("--- 成交流分析模块所有场景及迭代测试结束 ---")
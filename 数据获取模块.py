@@ -6,10 +6,14 @@
 
 import os
 import logging
+import random
 from pathlib import Path
 import functools # 导入 functools 用于装饰器
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np # 用于 percentile 计算
-from datetime import datetime, timezone, timedelta # 导入 timedelta 用于缓存有效期
+from datetime import datetime, timezone
 
 # 从配置模块导入必要的配置
 import 配置
@@ -41,18 +45,43 @@ if not logger.handlers:
 
 logger.info("数据获取模块日志记录器初始化完成。")
 
+# 日志格式中不使用线程/进程信息，关闭这些字段的收集以减少每条日志记录的开销
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
 # --- Binance API 客户端初始化 ---
 from binance.client import Client
 from binance.exceptions import BinanceAPIException, BinanceRequestException
 import pandas as pd
+import requests
 import time
 from datetime import datetime, timezone
 
+# 客户端共享 HTTP 会话的连接池大小。requests 默认每个主机只保留 10 个连接，
+# 多个分析模块和分页请求并发调用时超出的连接会被丢弃，下次请求需要重新建立 TLS 连接
+HTTP_POOL_CONNECTIONS = 16
+HTTP_POOL_MAXSIZE = 32
+
+def _tune_client_session(binance_client):
+    """
+    调整币安客户端的 requests 会话: 增大连接池以复用 keep-alive 连接。
+    适配器不做自动重试 (max_retries=0)，重试统一由 _retry_on_api_error 处理，避免重复重试。
+    """
+    session = getattr(binance_client, 'session', None)
+    if session is None:
+        return
+    adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS,
+                                            pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
 # 使用从配置模块加载的 API 密钥
 client = None
 try:
     logger.info("初始化币安客户端...")
     client = Client(配置.BINANCE_API_KEY, 配置.BINANCE_API_SECRET)
+    _tune_client_session(client)
     # 尝试获取服务器时间以验证 API 连接和密钥
     server_time = client.get_server_time()
     logger.info(f"成功连接到币安服务器，服务器时间：{pd.to_datetime(server_time['serverTime'], unit='ms')}")
@@ -74,59 +103,149 @@ _exchange_info_cache = None # 用于缓存交易所信息
 CACHE_DIR = Path("./kline_cache") # 定义K线缓存目录
 CACHE_DIR.mkdir(parents=True, exist_ok=True) # 确保缓存目录存在
 CACHE_EXPIRY_MINUTES = 60 # K线缓存有效期（分钟），可根据需要调整
+CACHE_EXPIRY_SECONDS = CACHE_EXPIRY_MINUTES * 60
+
+# 进程内短时结果缓存：同一轮分析中多个模块对同一数据的重复请求直接复用，不再访问 API/文件。
+# 有效期很短 (只合并同一时刻的重复请求)，不会让实时数据变旧；按最近使用淘汰，最多 MEMORY_CACHE_MAX_ENTRIES 项。
+KLINE_MEMORY_TTL_SECONDS = 1.0
+PRICE_MEMORY_TTL_SECONDS = 1.0
+MEMORY_CACHE_MAX_ENTRIES = 256
+_memory_cache = OrderedDict() # key -> (time.monotonic() 写入时刻, 结果)
+_memory_cache_lock = threading.Lock()
+
+def _memory_cache_get(key, ttl_seconds):
+    """取未过期的缓存结果 (返回副本，调用方可以随意修改)；没有或已过期时返回 None。"""
+    with _memory_cache_lock:
+        entry = _memory_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at >= ttl_seconds:
+            del _memory_cache[key]
+            return None
+        _memory_cache.move_to_end(key)
+    return value.copy()
+
+def _memory_cache_put(key, value):
+    """写入缓存 (保存副本，不受调用方后续修改影响)，超出容量时淘汰最久未使用的项。"""
+    with _memory_cache_lock:
+        _memory_cache[key] = (time.monotonic(), value.copy())
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_MAX_ENTRIES:
+            _memory_cache.popitem(last=False)
 
 # --- 辅助函数 --- 
 
 # 定义可重试的币安错误代码
 RETRYABLE_ERROR_CODES = [-1003, -1015] # Rate limits
-# 定义最大重试次数和重试间隔（秒）
+# 定义最大重试次数和退避参数（秒）
 MAX_RETRIES = 3
-RETRY_DELAY = 1
+BASE_DELAY = 1.0 # 第一次重试前的基础等待
+MAX_DELAY = 30.0 # 单次等待上限
+JITTER = 0.5 # 随机抖动比例: 等待时间在 [1, 1+JITTER) 倍之间浮动，避免多个调用同时重试
+
+def _compute_backoff(attempt):
+    """第 attempt 次重试 (从 0 开始) 前的等待秒数: 指数退避加随机抖动，不超过 MAX_DELAY。"""
+    return min(MAX_DELAY, BASE_DELAY * (2 ** attempt) * (1 + random.random() * JITTER))
+
+def _retry_after_seconds(e):
+    """从限频错误的响应头 Retry-After 中读取服务器要求的等待秒数；没有或无法解析时返回 None。"""
+    response = getattr(e, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+def _retry_after_failure(func, args, kwargs, error):
+    """
+    重试装饰器的慢路径：处理首次调用抛出的币安异常，按退避策略重试直到成功或放弃。
+    只有调用失败时才会进入这里，成功调用不经过重试循环。
+    """
+    func_name = func.__name__
+    retries = 0
+    while True:
+        if isinstance(error, BinanceRequestException): # 网络相关错误
+            logger.warning(f"函数 {func_name} 遭遇网络错误: {error}. 尝试次数 {retries+1}/{MAX_RETRIES+1}")
+            retries += 1
+            if retries > MAX_RETRIES:
+                logger.error(f"函数 {func_name} 在 {MAX_RETRIES+1} 次尝试后因网络错误最终失败。")
+                return None
+            time.sleep(_compute_backoff(retries - 1))
+        elif error.code in RETRYABLE_ERROR_CODES: # 可重试的 API 错误 (限频)
+            logger.warning(f"函数 {func_name} 遭遇可重试 API 错误 (代码 {error.code}): {error}. 尝试次数 {retries+1}/{MAX_RETRIES+1}")
+            retries += 1
+            if retries > MAX_RETRIES:
+                logger.error(f"函数 {func_name} 在 {MAX_RETRIES+1} 次尝试后因 API 错误 {error.code} 最终失败。")
+                return None
+            retry_after = _retry_after_seconds(error)
+            if retry_after is not None and retry_after > MAX_DELAY:
+                # 服务器要求的等待超过上限 (通常意味着 IP 已被临时封禁)，提前重试只会延长封禁，直接放弃
+                logger.error(f"函数 {func_name} 被要求等待 {retry_after:.0f} 秒 (超过上限 {MAX_DELAY:.0f} 秒)，放弃重试。")
+                return None
+            time.sleep(retry_after if retry_after is not None else _compute_backoff(retries - 1))
+        else:
+            # 对于不可重试的 API 错误，直接记录并失败 (错误信息和代码由 _handle_api_exception 统一记录)
+            _handle_api_exception(error, func_name, symbol=kwargs.get('symbol')) # 尝试传递 symbol
+            return None
+        try:
+            return func(*args, **kwargs)
+        except (BinanceRequestException, BinanceAPIException) as e:
+            error = e
+        except Exception as e:
+            # 捕获其他非预期的异常
+            logger.error(f"函数 {func_name} 执行时发生未知错误: {e}", exc_info=True)
+            return None
 
 def _retry_on_api_error(func):
-    """装饰器：在遇到特定 API 错误时自动重试函数调用。"""
+    """装饰器：在遇到特定 API 错误时自动重试函数调用 (指数退避加抖动；限频错误优先遵循 Retry-After)。"""
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        retries = 0
-        while retries <= MAX_RETRIES:
-            try:
-                return func(*args, **kwargs) # 尝试执行原始函数
-            except BinanceRequestException as e: # 网络相关错误
-                logger.warning(f"函数 {func.__name__} 遭遇网络错误: {e}. 尝试次数 {retries+1}/{MAX_RETRIES+1}")
-                retries += 1
-                if retries > MAX_RETRIES:
-                    logger.error(f"函数 {func.__name__} 在 {MAX_RETRIES+1} 次尝试后因网络错误最终失败。")
-                    # 可以选择是否在这里调用 _handle_api_exception 记录，或者直接返回 None
-                    # _handle_api_exception(e, func.__name__)
-                    return None 
-                time.sleep(RETRY_DELAY)
-            except BinanceAPIException as e: # API 返回的错误
-                if e.code in RETRYABLE_ERROR_CODES:
-                    logger.warning(f"函数 {func.__name__} 遭遇可重试 API 错误 (代码 {e.code}): {e}. 尝试次数 {retries+1}/{MAX_RETRIES+1}")
-                    retries += 1
-                    if retries > MAX_RETRIES:
-                        logger.error(f"函数 {func.__name__} 在 {MAX_RETRIES+1} 次尝试后因 API 错误 {e.code} 最终失败。")
-                        # _handle_api_exception(e, func.__name__)
-                        return None
-                    time.sleep(RETRY_DELAY)
-                else:
-                    # 对于不可重试的 API 错误，直接记录并失败
-                    logger.error(f"函数 {func.__name__} 遭遇不可重试 API 错误 (代码 {e.code}): {e}")
-                    # 可以选择调用 _handle_api_exception 或直接返回
-                    _handle_api_exception(e, func.__name__, symbol=kwargs.get('symbol')) # 尝试传递 symbol
-                    return None
-            except Exception as e:
-                 # 捕获其他非预期的异常
-                 logger.error(f"函数 {func.__name__} 执行时发生未知错误: {e}", exc_info=True)
-                 return None
+        try:
+            return func(*args, **kwargs) # 绝大多数调用在这里直接成功返回
+        except (BinanceRequestException, BinanceAPIException) as e:
+            error = e
+        except Exception as e:
+            # 捕获其他非预期的异常
+            logger.error(f"函数 {func.__name__} 执行时发生未知错误: {e}", exc_info=True)
+            return None
+        # 在 except 块之外重试，避免后续异常的堆栈信息串联上首次失败的异常
+        return _retry_after_failure(func, args, kwargs, error)
     return wrapper
 
 def _to_milliseconds(dt):
     """将 datetime 对象转换为毫秒时间戳"""
     return int(dt.timestamp() * 1000)
 
+# pd.to_datetime(毫秒整数, unit='ms') 在当前 pandas 上返回的类型 (pandas 2.x 为 datetime64[ns]，3.x 为 datetime64[ms])，
+# _ms_to_datetime64 的两个分支都统一为该类型，时间列的精度与直接调用 pd.to_datetime 一致，且不随输入数据变化
+_MS_DATETIME_DTYPE = pd.to_datetime(pd.Series([0], dtype=np.int64), unit='ms').dtype
+
+def _ms_to_datetime64(values, errors='raise'):
+    """
+    将毫秒时间戳列转换为 datetime64 (精度为 _MS_DATETIME_DTYPE)。
+    整数输入直接按 datetime64 转换 (不经过 pd.to_datetime 的逐元素边界检查和时区处理)；
+    其他输入 (含缺失值的浮点列、字符串等) 仍交给 pd.to_datetime(unit='ms') 处理。
+    """
+    arr = np.asarray(values)
+    if arr.dtype.kind in 'iu':
+        return arr.astype('datetime64[ms]').astype(_MS_DATETIME_DTYPE, copy=False)
+    return pd.to_datetime(values, unit='ms', errors=errors).astype(_MS_DATETIME_DTYPE, copy=False)
+
+# 表示当前时刻的相对时间字符串，每次调用结果都不同，不能缓存
+_RELATIVE_TIME_STRINGS = ('now', 'today')
+
+@functools.lru_cache(maxsize=512)
+def _parse_time_string(time_str):
+    """解析时间字符串为毫秒时间戳 (结果缓存，同一字符串只解析一次)"""
+    return _to_milliseconds(pd.Timestamp(time_str).to_pydatetime())
+
 def _parse_time_input(time_input):
     """尝试将多种时间输入格式转换为毫秒时间戳"""
+    if time_input.__class__ is int: # 最常见的情况: 已经是毫秒时间戳
+        return time_input
     if isinstance(time_input, (int, float)):
         return int(time_input) # 假设已经是毫秒时间戳
     elif isinstance(time_input, datetime):
@@ -134,8 +253,9 @@ def _parse_time_input(time_input):
     elif isinstance(time_input, str):
         try:
             # 尝试多种常用格式解析
-            dt = pd.to_datetime(time_input).to_pydatetime()
-            return _to_milliseconds(dt)
+            if time_input.strip().lower() in _RELATIVE_TIME_STRINGS:
+                return _to_milliseconds(pd.Timestamp(time_input).to_pydatetime())
+            return _parse_time_string(time_input)
         except ValueError as e:
             logger.error(f"无法解析时间字符串 '{time_input}': {e}")
             return None
@@ -164,6 +284,8 @@ def _handle_api_exception(e, function_name, symbol=None):
 
 # 币安 API 的 K 线限制（现货和合约通常不同，这里取一个保守的通用值）
 BINANCE_KLINE_LIMIT = 1000
+# 分页获取历史 K 线时的并发请求数，保持较小以免触发请求权重限制
+KLINE_PAGE_WORKERS = 4
 
 INTERVAL_MAP_MILLISECONDS = {
     '1m': 60 * 1000,
@@ -183,6 +305,50 @@ INTERVAL_MAP_MILLISECONDS = {
     '1M': 30 * 24 * 60 * 60 * 1000 # 近似值，币安可能按日历月处理
 }
 
+KLINE_COLUMNS = [
+    'timestamp', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_volume', 'trade_count',
+    'taker_buy_base_volume', 'taker_buy_quote_volume', 'ignore'
+]
+# K 线原始数组中按浮点数解析的列 (下标与 KLINE_COLUMNS 对应)；trade_count 为整数，单独处理
+_KLINE_FLOAT_COLUMNS = [(1, 'open'), (2, 'high'), (3, 'low'), (4, 'close'), (5, 'volume'),
+                        (7, 'quote_volume'), (9, 'taker_buy_base_volume'), (10, 'taker_buy_quote_volume')]
+
+def _klines_to_dataframe(klines):
+    """
+    将币安 K 线原始列表转换为带标准列名和数值类型的 DataFrame。
+    先整体转为二维对象数组，数值列作为一个块一次转换为 float64，不再逐列 pd.to_numeric；
+    数据格式异常 (行长度不一或含无法解析的值) 时退回逐列转换 (无法解析的值记为 NaN)。
+    """
+    try:
+        raw = np.array(klines, dtype=object)
+        values = raw[:, [index for index, _ in _KLINE_FLOAT_COLUMNS]].astype(np.float64)
+        columns = {
+            'timestamp': _ms_to_datetime64(raw[:, 0].astype(np.int64)),
+            **{name: values[:, i] for i, (_, name) in enumerate(_KLINE_FLOAT_COLUMNS[:5])},
+            'close_time': _ms_to_datetime64(raw[:, 6].astype(np.int64)),
+            'quote_volume': values[:, 5],
+            'trade_count': raw[:, 8].astype(np.int64),
+            'taker_buy_base_volume': values[:, 6],
+            'taker_buy_quote_volume': values[:, 7],
+            'ignore': raw[:, 11],
+        }
+        return pd.DataFrame(columns)
+    except Exception as e:
+        logger.debug(f"K 线数据整块转换失败，改为逐列转换: {e}")
+
+    df = pd.DataFrame(klines, columns=KLINE_COLUMNS)
+    try:
+        df['timestamp'] = _ms_to_datetime64(df['timestamp'])
+        df['close_time'] = _ms_to_datetime64(df['close_time'])
+        for col in ['open', 'high', 'low', 'close', 'volume', 'quote_volume', 'trade_count',
+                    'taker_buy_base_volume', 'taker_buy_quote_volume']:
+             df[col] = pd.to_numeric(df[col], errors='coerce')
+    except Exception as e:
+        logger.error(f"转换K线数据类型时出错: {e}", exc_info=True)
+        # 即使转换失败，也返回带有正确列名的 DataFrame，但可能类型不正确
+    return df
+
 @_retry_on_api_error # 应用装饰器
 def 获取K线数据(symbol, interval=配置.DEFAULT_INTERVAL, limit=500, start_time=None, end_time=None, market_type='spot', force_refresh=False): # <--- 添加 force_refresh 参数
     '''获取指定交易对的K线/蜡烛图数据 (支持现货和期货)，并实现文件缓存。
@@ -213,19 +379,29 @@ def 获取K线数据(symbol, interval=配置.DEFAULT_INTERVAL, limit=500, start_
     # --- 缓存逻辑 (仅对非历史数据请求生效) ---
     # 只有当不指定 start_time 时才启用缓存
     use_cache = (start_time is None and end_time is None)
+    memory_key = ('klines', symbol.upper(), market_type, interval, limit)
+    if use_cache and not force_refresh:
+        cached_df = _memory_cache_get(memory_key, KLINE_MEMORY_TTL_SECONDS)
+        if cached_df is not None:
+            logger.debug("复用进程内 K 线结果: %s, %s, limit=%s", symbol, interval, limit)
+            return cached_df
     cache_file_path = None
     if use_cache:
         cache_filename = f"{symbol.upper()}_{market_type}_{interval}.parquet"
         cache_file_path = CACHE_DIR / cache_filename
-        logger.debug(f"检查缓存文件: {cache_file_path}")
+        logger.debug("检查缓存文件: %s", cache_file_path)
 
-        if not force_refresh and cache_file_path.exists():
+        # 一次 os.stat 同时判断缓存文件是否存在并得到文件年龄 (秒)，文件不存在时为 None
+        cache_age = None
+        if not force_refresh:
+            try:
+                cache_age = time.time() - os.stat(cache_file_path).st_mtime
+            except OSError:
+                pass
+        if cache_age is not None:
             try:
                 # 检查文件修改时间是否在有效期内
-                file_mod_time = datetime.fromtimestamp(cache_file_path.stat().st_mtime, tz=timezone.utc)
-                expiry_time = datetime.now(timezone.utc) - timedelta(minutes=CACHE_EXPIRY_MINUTES)
-                
-                if file_mod_time > expiry_time:
+                if cache_age < CACHE_EXPIRY_SECONDS:
                     logger.info(f"从缓存加载 K 线数据: {cache_filename}")
                     df = pd.read_parquet(cache_file_path)
                     # 简单验证数据格式 (可选)
@@ -252,11 +428,6 @@ def 获取K线数据(symbol, interval=配置.DEFAULT_INTERVAL, limit=500, start_
 
     # --- 如果缓存未命中或不使用缓存，则从 API 获取 --- 
     all_klines_data = []
-    standard_columns = [
-        'timestamp', 'open', 'high', 'low', 'close', 'volume',
-        'close_time', 'quote_volume', 'trade_count',
-        'taker_buy_base_volume', 'taker_buy_quote_volume', 'ignore'
-    ]
 
     # 处理时间参数 (这部分逻辑保持不变)
     start_ms = _parse_time_input(start_time) if start_time else None
@@ -297,53 +468,51 @@ def 获取K线数据(symbol, interval=配置.DEFAULT_INTERVAL, limit=500, start_
             logger.error(f"无效的 K 线时间间隔: {interval}。无法进行分页获取。")
             return None
         
-        logger.info(f"开始分页获取K线数据{market_label}: {symbol}, {interval}, 从 {pd.to_datetime(start_ms, unit='ms')} 到 {pd.to_datetime(end_ms, unit='ms')}")
+        if logger.isEnabledFor(logging.INFO): # 时间转换本身有开销，日志级别不够时跳过
+            logger.info("开始分页获取K线数据%s: %s, %s, 从 %s 到 %s", market_label, symbol, interval,
+                        pd.to_datetime(start_ms, unit='ms'), pd.to_datetime(end_ms, unit='ms'))
         
-        current_start_ms = start_ms
-        fetch_count = 0
-        max_fetch_attempts = 100 # 添加一个最大尝试次数以防无限循环
-
-        while current_start_ms < end_ms and fetch_count < max_fetch_attempts:
-            # 计算本次请求的结束时间 (最多请求 BINANCE_KLINE_LIMIT 条)
-            # 注意：币安 endTime 是包含的
-            loop_end_ms = min(current_start_ms + (BINANCE_KLINE_LIMIT * interval_ms) - 1, end_ms)
-            
+        # endTime 已知，按每页最多 BINANCE_KLINE_LIMIT 根 K 线把 [start_ms, end_ms] 切成首尾相接的时间窗口。
+        # 币安按开盘时间落在 [startTime, endTime] 内返回 K 线，窗口互不重叠，每根 K 线只会出现在一个窗口里，
+        # 因此各页互不依赖，可以并发请求，再按窗口顺序拼接。
+        page_span_ms = BINANCE_KLINE_LIMIT * interval_ms
+        windows = [(page_start, min(page_start + page_span_ms - 1, end_ms))
+                   for page_start in range(start_ms, end_ms, page_span_ms)]
+        max_fetch_attempts = 100 # 最大分页数量，防止时间范围过大时请求过多
+        if len(windows) > max_fetch_attempts:
+            logger.warning(f"获取K线数据需要 {len(windows)} 页，超过最大分页数 {max_fetch_attempts}，只获取前 {max_fetch_attempts} 页。")
+            windows = windows[:max_fetch_attempts]
+
+        def _fetch_page(page_index, page_start_ms, page_end_ms):
             params = {
                 'symbol': symbol,
                 'interval': interval,
-                'startTime': current_start_ms,
-                'endTime': loop_end_ms,
+                'startTime': page_start_ms,
+                'endTime': page_end_ms,
                 'limit': BINANCE_KLINE_LIMIT # 即使指定了时间，也传递 limit 确保不超过单次限制
             }
-            logger.debug(f"分页请求 {fetch_count + 1}{market_label}: startTime={current_start_ms}, endTime={loop_end_ms}")
-            
-            try:
-                klines = api_call(**params) # <--- 使用选择的 API 调用
-                if not klines:
-                    logger.info(f"在时间 {pd.to_datetime(current_start_ms, unit='ms')} 之后的请求没有返回数据，获取结束。")
-                    break # 没有更多数据了
-                
+            logger.debug("分页请求 %d%s: startTime=%d, endTime=%d", page_index + 1, market_label, page_start_ms, page_end_ms)
+            return api_call(**params) # <--- 使用选择的 API 调用
+
+        try:
+            if len(windows) == 1:
+                pages = [_fetch_page(0, *windows[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=min(KLINE_PAGE_WORKERS, len(windows))) as executor:
+                    futures = [executor.submit(_fetch_page, i, page_start_ms, page_end_ms)
+                               for i, (page_start_ms, page_end_ms) in enumerate(windows)]
+                    pages = [future.result() for future in futures] # 按窗口顺序收集，保证时间升序
+        except BinanceAPIException as e:
+            logger.error(f"分页获取 K 线时发生 API 错误{market_label}: {e}")
+            _handle_api_exception(e, "获取K线数据(分页)", symbol)
+            return None
+        except Exception as e:
+            logger.error(f"分页获取 K 线时发生未知错误{market_label}: {e}", exc_info=True)
+            return None
+
+        for klines in pages:
+            if klines:
                 all_klines_data.extend(klines)
-                last_kline_close_time = klines[-1][6] # 获取最后一根 K 线的关闭时间
-                
-                # 更新下一次请求的开始时间
-                current_start_ms = last_kline_close_time + 1 # 下一根 K 线的理论开始时间
-                
-                fetch_count += 1
-                # 添加一个小的延时避免触发速率限制 (可选，_retry_on_api_error 会处理)
-                # time.sleep(0.1) 
-                
-            except BinanceAPIException as e:
-                logger.error(f"分页获取 K 线时发生 API 错误{market_label} (尝试 {fetch_count + 1}): {e}")
-                _handle_api_exception(e, "获取K线数据(分页)", symbol)
-                # 遇到错误时可以选择中断或继续 (这里选择中断)
-                return None
-            except Exception as e:
-                logger.error(f"分页获取 K 线时发生未知错误{market_label} (尝试 {fetch_count + 1}): {e}", exc_info=True)
-                return None
-                
-        if fetch_count >= max_fetch_attempts:
-             logger.warning(f"获取K线数据达到最大尝试次数 {max_fetch_attempts}，可能未能获取所有数据。")
 
     # --- 情况二：未指定开始时间，获取最新的 limit 条 --- 
     else:
@@ -370,26 +539,11 @@ def 获取K线数据(symbol, interval=配置.DEFAULT_INTERVAL, limit=500, start_
 
     # --- 整合并返回 DataFrame --- 
     if all_klines_data:
-        # --- 修改：在创建 DataFrame 时指定标准列名 --- 
-        df = pd.DataFrame(all_klines_data, columns=standard_columns) 
-        
-        # --- 修改：转换数据类型 --- 
-        try:
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
-            numeric_cols = ['open', 'high', 'low', 'close', 'volume',
-                            'quote_volume', 'trade_count',
-                            'taker_buy_base_volume', 'taker_buy_quote_volume']
-            for col in numeric_cols:
-                 df[col] = pd.to_numeric(df[col], errors='coerce')
-            # 不需要再删除 'ignore' 列，因为它已经是最后一列且通常无用
-            # df = df.drop(columns=['ignore'], errors='ignore') 
-            logger.info(f"成功获取并处理了 {len(df)} 条 K 线数据{market_label} for {symbol}, {interval}")
-            return df
-        except Exception as e:
-            logger.error(f"转换K线数据类型时出错 for {symbol}, {interval}: {e}", exc_info=True)
-            # 即使转换失败，也尝试返回带有正确列名的 DataFrame，但可能类型不正确
-            return df # 或者返回 None 强制失败
+        df = _klines_to_dataframe(all_klines_data)
+        logger.info(f"成功获取并处理了 {len(df)} 条 K 线数据{market_label} for {symbol}, {interval}")
+        if use_cache:
+            _memory_cache_put(memory_key, df)
+        return df
     else:
         logger.warning(f"未能获取到任何 K 线数据{market_label} for {symbol}, {interval}")
         return None
@@ -400,11 +554,16 @@ def 获取最新价格(symbol=None):
     if not client:
         logger.error("获取最新价格失败：币安客户端未初始化。")
         return None
+    memory_key = ('price', symbol.upper() if symbol else None)
+    cached = _memory_cache_get(memory_key, PRICE_MEMORY_TTL_SECONDS)
+    if cached is not None:
+        return cached
     try:
         if symbol:
-            logger.debug(f"获取最新价格: symbol={symbol}")
+            logger.debug("获取最新价格: symbol=%s", symbol)
             ticker = client.get_symbol_ticker(symbol=symbol)
-            logger.info(f"成功获取 {symbol} 最新价格: {ticker['price']}")
+            logger.info("成功获取 %s 最新价格: %s", symbol, ticker['price'])
+            _memory_cache_put(memory_key, ticker)
             # 对单个 symbol，仍返回字典
             return ticker
         else:
@@ -415,7 +574,8 @@ def 获取最新价格(symbol=None):
                 return pd.DataFrame() # 返回空 DataFrame
             df = pd.DataFrame(tickers)
             df['price'] = pd.to_numeric(df['price'])
-            logger.info(f"成功获取所有 {len(df)} 个交易对的最新价格，并转换为DataFrame。")
+            logger.info("成功获取所有 %d 个交易对的最新价格，并转换为DataFrame。", len(df))
+            _memory_cache_put(memory_key, df)
             return df # 返回 DataFrame
     except (BinanceAPIException, BinanceRequestException) as e:
         return _handle_api_exception(e, "获取最新价格", symbol)
@@ -452,7 +612,7 @@ def 获取24小时价格变化统计(symbol=None):
             time_cols = ['openTime', 'closeTime']
             for col in time_cols:
                  if col in df.columns:
-                    df[col] = pd.to_datetime(df[col], unit='ms')
+                    df[col] = _ms_to_datetime64(df[col])
             logger.info(f"成功获取所有 {len(df)} 个交易对的24小时统计，并转换为DataFrame。")
             return df
     except (BinanceAPIException, BinanceRequestException) as e:
@@ -500,6 +660,39 @@ def 获取合约订单簿深度(symbol, limit=100):
         logger.error(f"处理合约订单簿深度时发生未知错误: {e}", exc_info=True)
         return None
 
+# 聚合交易记录的原始字段名 -> 可读列名
+_AGG_TRADE_RENAMES = {'a': 'agg_trade_id', 'p': 'price', 'q': 'quantity',
+                      'f': 'first_trade_id', 'l': 'last_trade_id',
+                      'T': 'timestamp', 'm': 'is_buyer_maker', 'M': 'is_best_match'}
+
+def _trades_to_dataframe(records, float_columns, time_column, renames=None):
+    """
+    将成交记录 (字典列表) 按列构建为 DataFrame。
+    单次遍历把每个字段收集成一列，价格/数量列直接转为 float64 数组，时间列转为 int64 后按毫秒解析，
+    不再先建对象列再逐列 pd.to_numeric；字段不一致或含无法直接解析的值时退回原来的逐列转换。
+    """
+    try:
+        keys = list(records[0])
+        if any(len(record) != len(keys) for record in records):
+            raise KeyError('成交记录字段不一致')
+        columns = {(renames or {}).get(key, key): [record[key] for record in records] for key in keys}
+        for col in float_columns:
+            if col in columns:
+                columns[col] = np.asarray(columns[col], dtype=np.float64)
+        columns[time_column] = _ms_to_datetime64(np.asarray(columns[time_column], dtype=np.int64))
+        return pd.DataFrame(columns)
+    except (KeyError, TypeError, ValueError) as e:
+        logger.debug(f"成交记录按列构建失败，改为逐列转换: {e}")
+
+    df = pd.DataFrame(records)
+    if renames:
+        df.rename(columns=renames, inplace=True)
+    for col in float_columns:
+        if col in df.columns:
+             df[col] = pd.to_numeric(df[col])
+    df[time_column] = _ms_to_datetime64(df[time_column])
+    return df
+
 @_retry_on_api_error # 应用装饰器
 def 获取近期成交记录(symbol, limit=500):
     '''获取最近的公开成交记录。返回 DataFrame'''
@@ -511,12 +704,7 @@ def 获取近期成交记录(symbol, limit=500):
         if not trades:
             logger.warning(f"未能获取 {symbol} 的近期成交记录。")
             return pd.DataFrame()
-        df = pd.DataFrame(trades)
-        numeric_cols = ['price', 'qty', 'quoteQty']
-        for col in numeric_cols:
-            if col in df.columns:
-                 df[col] = pd.to_numeric(df[col])
-        df['time'] = pd.to_datetime(df['time'], unit='ms')
+        df = _trades_to_dataframe(trades, ['price', 'qty', 'quoteQty'], 'time')
         # 可以设置 time 为索引
         # df.set_index('time', inplace=True)
         logger.info(f"成功获取 {symbol} 的最近 {len(df)} 条成交记录，并转换为DataFrame。")
@@ -546,7 +734,7 @@ def 获取合约近期成交记录(symbol, limit=500):
             if col in df.columns:
                  df[col] = pd.to_numeric(df[col], errors='coerce') # 添加 errors='coerce'
         if 'time' in df.columns:
-            df['time'] = pd.to_datetime(df['time'], unit='ms', errors='coerce') # 添加 errors='coerce'
+            df['time'] = _ms_to_datetime64(df['time'], errors='coerce') # 添加 errors='coerce'
 
         # 清理转换失败的数据
         df = df.dropna(subset=numeric_cols + ['time'] if 'time' in df.columns else numeric_cols)
@@ -579,16 +767,8 @@ def 获取聚合交易记录(symbol, limit=500):
         if not agg_trades:
             logger.warning(f"未能获取 {symbol} 的聚合交易记录。")
             return pd.DataFrame()
-        df = pd.DataFrame(agg_trades)
         # 重命名字段以便理解
-        df.rename(columns={'a': 'agg_trade_id', 'p': 'price', 'q': 'quantity', 
-                           'f': 'first_trade_id', 'l': 'last_trade_id', 
-                           'T': 'timestamp', 'm': 'is_buyer_maker', 'M': 'is_best_match'}, inplace=True)
-        numeric_cols = ['price', 'quantity']
-        for col in numeric_cols:
-            if col in df.columns:
-                 df[col] = pd.to_numeric(df[col])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        df = _trades_to_dataframe(agg_trades, ['price', 'quantity'], 'timestamp', renames=_AGG_TRADE_RENAMES)
         # df.set_index('timestamp', inplace=True)
         logger.info(f"成功获取 {symbol} 的最近 {len(df)} 条聚合交易记录，并转换为DataFrame。")
         return df
@@ -643,7 +823,7 @@ def 获取资金费率历史(symbol, limit=100):
         for col in numeric_cols:
             if col in df.columns:
                  df[col] = pd.to_numeric(df[col])
-        df['fundingTime'] = pd.to_datetime(df['fundingTime'], unit='ms')
+        df['fundingTime'] = _ms_to_datetime64(df['fundingTime'])
         # df.set_index('fundingTime', inplace=True)
         logger.info(f"成功获取 {symbol} 的最近 {len(df)} 条资金费率历史，并转换为DataFrame。")
         return df
@@ -739,7 +919,7 @@ def 获取合约账户余额():
             if col in df.columns:
                  df[col] = pd.to_numeric(df[col])
         if 'updateTime' in df.columns:
-            df['updateTime'] = pd.to_datetime(df['updateTime'], unit='ms')
+            df['updateTime'] = _ms_to_datetime64(df['updateTime'])
         
         df_nonzero = df[df['balance'].astype(float) != 0].copy()
         logger.info(f"成功获取 U 本位合约账户余额信息 ({len(df_nonzero)} 种非零资产)，并转换为DataFrame。")
@@ -778,7 +958,7 @@ def 获取当前挂单(symbol=None):
         time_cols = ['time', 'updateTime']
         for col in time_cols:
              if col in df.columns:
-                 df[col] = pd.to_datetime(df[col], unit='ms')
+                 df[col] = _ms_to_datetime64(df[col])
         logger.info(log_msg + "，并转换为DataFrame。")
         return df
     except (BinanceAPIException, BinanceRequestException) as e:
@@ -815,7 +995,7 @@ def 获取合约当前挂单(symbol=None):
         time_cols = ['time', 'updateTime']
         for col in time_cols:
             if col in df.columns:
-                 df[col] = pd.to_datetime(df[col], unit='ms')
+                 df[col] = _ms_to_datetime64(df[col])
         logger.info(log_msg + "，并转换为DataFrame。")
         return df
     except (BinanceAPIException, BinanceRequestException) as e:
@@ -843,7 +1023,7 @@ def 获取现货所有订单历史(symbol, limit=500):
         time_cols = ['time', 'updateTime']
         for col in time_cols:
              if col in df.columns:
-                 df[col] = pd.to_datetime(df[col], unit='ms')
+                 df[col] = _ms_to_datetime64(df[col])
         logger.info(f"成功获取 {symbol} 的最近 {len(df)} 条订单历史，并转换为DataFrame。")
         return df
     except (BinanceAPIException, BinanceRequestException) as e:
@@ -871,7 +1051,7 @@ def 获取合约所有订单历史(symbol, limit=500):
         time_cols = ['time', 'updateTime']
         for col in time_cols:
             if col in df.columns:
-                 df[col] = pd.to_datetime(df[col], unit='ms')
+                 df[col] = _ms_to_datetime64(df[col])
         logger.info(f"成功获取合约 {symbol} 的最近 {len(df)} 条订单历史，并转换为DataFrame。")
         return df
     except (BinanceAPIException, BinanceRequestException) as e:
@@ -896,7 +1076,7 @@ def 获取成交历史(symbol, limit=500):
         for col in numeric_cols:
             if col in df.columns:
                  df[col] = pd.to_numeric(df[col])
-        df['time'] = pd.to_datetime(df['time'], unit='ms')
+        df['time'] = _ms_to_datetime64(df['time'])
         # df.set_index('time', inplace=True)
         logger.info(f"成功获取 {symbol} 的最近 {len(df)} 条成交历史，并转换为DataFrame。")
         return df
@@ -922,7 +1102,7 @@ def 获取合约成交历史(symbol, limit=500):
         for col in numeric_cols:
             if col in df.columns:
                  df[col] = pd.to_numeric(df[col])
-        df['time'] = pd.to_datetime(df['time'], unit='ms')
+        df['time'] = _ms_to_datetime64(df['time'])
         # df.set_index('time', inplace=True)
         logger.info(f"成功获取合约 {symbol} 的最近 {len(df)} 条成交历史，并转换为DataFrame。")
         return df
@@ -5,6 +5,7 @@
 
 import pandas as pd
 import logging
+from collections.abc import Mapping
 
 logger = logging.getLogger(__name__)
 
@@ -162,7 +163,7 @@ def rsi_sma_strategy(
 
 # --- 新策略：MACD Histogram 穿越零轴 和 EMA 趋势过滤 ---
 def macd_ema_strategy(
-    bar_data: pd.Series,
+    bar_data: Mapping[str, float],
     position: dict | None,
     long_ema_period: int = 120 # 主要用于日志说明
 ) -> dict:
@@ -170,8 +171,10 @@ def macd_ema_strategy(
     结合 MACD Histogram 穿越零轴 和 EMA 趋势过滤的策略。
 
     Args:
-        bar_data: 当前 K 线的数据 (Pandas Series)，需要包含
-                  'close', 'long_ema', 'macd_hist', 'prev_macd_hist' 列。
+        bar_data: 当前 K 线的数据 (列名 -> 数值的映射，回测脚本传入普通 dict)，需要包含
+                  'close', 'long_ema', 'macd_hist', 'prev_macd_hist' 四个键。
+                  只能按键取值 (bar_data[key] / bar_data.get(key))，不要使用 .isna() 等 Series 方法或属性访问；
+                  缺失值以 float NaN 表示，可用 pd.isna(value) 判断。
         position: 当前持仓状态字典，如果空仓则为 None。
         long_ema_period: 长期 EMA 周期 (用于日志)。
 